@@ -0,0 +1,132 @@
+"""Run the benchmark suite: python -m benchmarks --help."""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+from .suite import DEFAULT_THRESHOLD, find_regressions, make_stages, measure
+from .synthetic import MailboxSpec, generate_mbox
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+
+console = Console(stderr=True)
+
+
+@click.command()
+@click.option("-n", "--messages", default=MailboxSpec.messages, show_default=True)
+@click.option("--body-size", default=MailboxSpec.body_size, show_default=True)
+@click.option("--multipart", default=MailboxSpec.multipart_ratio, show_default=True)
+@click.option("--attachments", default=MailboxSpec.attachment_ratio, show_default=True)
+@click.option(
+    "--keyword-density", default=MailboxSpec.keyword_density, show_default=True
+)
+@click.option("--seed", default=MailboxSpec.seed, show_default=True)
+@click.option("--repeat", default=3, show_default=True, help="Timed runs per stage")
+@click.option(
+    "--baseline",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=DEFAULT_BASELINE,
+    show_default=True,
+    help="Report to compare against",
+)
+@click.option(
+    "--save-baseline", is_flag=True, help="Store this run as the new baseline"
+)
+@click.option(
+    "--threshold",
+    default=DEFAULT_THRESHOLD,
+    show_default=True,
+    help="Largest allowed loss of throughput against the baseline, as a fraction",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="File to write the JSON report to (defaults to stdout)",
+)
+def main(
+    messages: int,
+    body_size: int,
+    multipart: float,
+    attachments: float,
+    keyword_density: float,
+    seed: int,
+    repeat: int,
+    baseline: Path,
+    save_baseline: bool,
+    threshold: float,
+    output: Optional[Path],
+) -> None:
+    """Benchmark each stage on a synthetic mailbox and check for regressions.
+
+    Exits with status 1 if a stage is more than --threshold slower than in the
+    baseline, which is only compared if it was made with the same mailbox.
+    """
+    spec = MailboxSpec(
+        messages=messages,
+        body_size=body_size,
+        multipart_ratio=multipart,
+        attachment_ratio=attachments,
+        keyword_density=keyword_density,
+        seed=seed,
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        mbox_path = Path(directory) / "synthetic.mbox"
+        size = generate_mbox(mbox_path, spec)
+        stages = make_stages(mbox_path)
+        results = {name: measure(stage, repeat) for name, stage in stages.items()}
+
+    report = {
+        "spec": spec.to_dict(),
+        "mbox_bytes": size,
+        "stages": {name: result.to_dict() for name, result in results.items()},
+    }
+
+    table = Table(title=f"{messages} messages, {size / 2**20:.1f} MiB")
+    for column in ("stage", "msgs/sec", "seconds", "peak memory"):
+        table.add_column(column, justify="left" if column == "stage" else "right")
+    for name, result in results.items():
+        table.add_row(
+            name,
+            f"{result.messages_per_sec:,.0f}",
+            f"{result.seconds:.3f}",
+            f"{result.peak_memory / 2**20:.1f} MiB",
+        )
+    console.print(table)
+
+    if output:
+        output.write_text(json.dumps(report, indent=2))
+    else:
+        print(json.dumps(report, indent=2))
+
+    if save_baseline:
+        baseline.write_text(json.dumps(report, indent=2))
+        console.print(f"[green]Saved baseline to {baseline}[/green]")
+        return
+
+    if not baseline.exists():
+        console.print("[yellow]No baseline to compare against[/yellow]")
+        return
+    stored = json.loads(baseline.read_text())
+    if stored["spec"] != report["spec"]:
+        console.print(
+            "[yellow]Baseline was made with another mailbox; skipped[/yellow]"
+        )
+        return
+
+    regressions = find_regressions(report, stored, threshold)
+    for regression in regressions:
+        console.print(f"[red]Regression in {regression}[/red]")
+    if regressions:
+        sys.exit(1)
+    console.print("[green]No regressions against the baseline[/green]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Throughput and memory benchmarks of the read, stats, classify and format stages."""
+
+import gc
+import io
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from email_scraper.formatters.json import JsonFormatter
+from email_scraper.processors.classifier import EmailClassifier
+from email_scraper.processors.example import ExampleProcessor
+from email_scraper.readers.mbox import MboxReader
+from email_scraper.wire import (
+    email_from_dict,
+    email_to_dict,
+    iter_records,
+    write_records,
+)
+
+DEFAULT_THRESHOLD = 0.2  # fraction of baseline throughput that may be lost
+
+
+@dataclass
+class StageResult:
+    """Measurements of one benchmark stage."""
+
+    messages: int
+    seconds: float
+    peak_memory: int
+
+    @property
+    def messages_per_sec(self) -> float:
+        """Throughput of the stage."""
+        return self.messages / self.seconds if self.seconds else float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the results as a JSON-serializable dictionary."""
+        return {
+            "messages": self.messages,
+            "seconds": self.seconds,
+            "messages_per_sec": self.messages_per_sec,
+            "peak_memory_bytes": self.peak_memory,
+        }
+
+
+def make_stages(mbox_path: Path) -> Dict[str, Callable[[], int]]:
+    """Build the benchmarked stages, each returning the number of messages it handled.
+
+    Every stage works like the CLI command of the same name: read writes NDJSON,
+    stats and classify decode that NDJSON, and format formats classify's results.
+
+    Args:
+        mbox_path: Mailbox to benchmark on
+
+    Returns:
+        Functions running each stage, by stage name
+    """
+    wire = io.StringIO()
+    write_records(map(email_to_dict, MboxReader().read(mbox_path)), wire)
+    data = wire.getvalue().encode("utf-8")
+    classifications = EmailClassifier().process(
+        [email_from_dict(r) for r in iter_records(io.BytesIO(data))]
+    )
+    count = len(classifications["classifications"])
+
+    def read() -> int:
+        emails = MboxReader().read(mbox_path)
+        write_records(map(email_to_dict, emails), io.StringIO())
+        return count
+
+    def stats() -> int:
+        emails = (email_from_dict(r) for r in iter_records(io.BytesIO(data)))
+        return int(ExampleProcessor().process(emails)["total_messages"])
+
+    def classify() -> int:
+        emails = [email_from_dict(r) for r in iter_records(io.BytesIO(data))]
+        return len(EmailClassifier().process(emails)["classifications"])
+
+    def format() -> int:
+        JsonFormatter().format(classifications)
+        return count
+
+    return {"read": read, "stats": stats, "classify": classify, "format": format}
+
+
+def measure(stage: Callable[[], int], repeat: int = 3) -> StageResult:
+    """Time a stage and measure its peak memory.
+
+    The best of several timed runs is kept, and peak memory is measured in a
+    separate run, since tracing allocations slows the stage down.
+
+    Args:
+        stage: Function running the stage
+        repeat: Number of timed runs
+
+    Returns:
+        Measurements of the stage
+    """
+    best = float("inf")
+    messages = 0
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        messages = stage()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        stage()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return StageResult(messages, best, peak)
+
+
+def find_regressions(
+    report: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Compare the throughput of each stage against a baseline.
+
+    Args:
+        report: Benchmark report, as written by the benchmark command
+        baseline: Earlier report to compare against
+        threshold: Largest allowed loss of throughput, as a fraction
+
+    Returns:
+        Descriptions of the stages whose throughput regressed too much
+    """
+    regressions = []
+    for name, stage in report["stages"].items():
+        if name not in baseline["stages"]:
+            continue
+        expected = baseline["stages"][name]["messages_per_sec"]
+        actual = stage["messages_per_sec"]
+        if actual < expected * (1 - threshold):
+            regressions.append(
+                f"{name}: {actual:,.0f} msgs/sec is {1 - actual / expected:.0%} "
+                f"below the baseline of {expected:,.0f} msgs/sec"
+            )
+    return regressions
@@ -0,0 +1,134 @@
+"""Deterministic generator of synthetic mbox files for benchmarks and tests."""
+
+import random
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from email.generator import BytesGenerator
+from email.message import EmailMessage
+from email.utils import format_datetime
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List
+
+from email_scraper.processors.classifier import EmailClassifier
+
+WORDS = (
+    "the team role your application software engineer we thank you for "
+    "interest position our review process next steps would like update "
+    "time candidate company experience skills project data team week "
+    "schedule please reply regards recruiting from monday friday"
+).split()
+DOMAINS = ["example.com", "corp.example", "jobs.example.org", "mail.example.net"]
+KEYWORDS = [k for keywords in EmailClassifier.CATEGORIES.values() for k in keywords]
+START_DATE = datetime(2023, 1, 1, tzinfo=timezone(timedelta(hours=-8)))
+
+
+@dataclass(frozen=True)
+class MailboxSpec:
+    """Shape of a synthetic mailbox.
+
+    Attributes:
+        messages: Number of messages
+        body_size: Approximate size of each text body in bytes
+        multipart_ratio: Fraction of messages with text and HTML alternatives
+        attachment_ratio: Fraction of messages with a binary attachment
+        attachment_size: Size of each attachment in bytes, before encoding
+        keyword_density: Fraction of messages containing classifier keywords
+        senders: Number of distinct senders
+        seed: Seed of the random generator; equal specs give identical files
+    """
+
+    messages: int = 2000
+    body_size: int = 2000
+    multipart_ratio: float = 0.3
+    attachment_ratio: float = 0.1
+    attachment_size: int = 20000
+    keyword_density: float = 0.3
+    senders: int = 200
+    seed: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the spec as a JSON-serializable dictionary."""
+        return asdict(self)
+
+
+def generate_mbox(path: Path, spec: MailboxSpec) -> int:
+    """Write a synthetic mbox file.
+
+    Args:
+        path: Path of the file to write
+        spec: Shape of the mailbox
+
+    Returns:
+        Size of the written file in bytes
+    """
+    rng = random.Random(spec.seed)
+    senders = [
+        f"{rng.choice(WORDS)}.{i}@{rng.choice(DOMAINS)}" for i in range(spec.senders)
+    ]
+    with open(path, "wb") as f:
+        for i in range(spec.messages):
+            sender = senders[int(rng.paretovariate(1.2)) % len(senders)]
+            date = START_DATE + timedelta(minutes=37 * i + rng.randrange(30))
+            message = _make_message(rng, spec, i, sender, date)
+
+            f.write(f"From {sender} {date.strftime('%a %b %d %H:%M:%S %Y')}\n".encode())
+            buffer = BytesIO()
+            BytesGenerator(buffer, mangle_from_=True).flatten(message)
+            f.write(buffer.getvalue().rstrip(b"\n") + b"\n\n")
+        return f.tell()
+
+
+def _make_message(
+    rng: random.Random, spec: MailboxSpec, index: int, sender: str, date: datetime
+) -> EmailMessage:
+    keywords: List[str] = []
+    if rng.random() < spec.keyword_density:
+        keywords = rng.sample(KEYWORDS, rng.randint(1, 3))
+
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = "candidate@example.com"
+    message["Subject"] = _sentence(rng, 6, keywords[:1]).rstrip(".")
+    message["Date"] = format_datetime(date)
+    message["Message-ID"] = f"<{index}.{spec.seed}@synthetic.example>"
+
+    body = _paragraphs(rng, spec.body_size, keywords)
+    message.set_content(body)
+    if rng.random() < spec.multipart_ratio:
+        html = "".join(f"<p>{p}</p>" for p in body.split("\n\n"))
+        message.add_alternative(f"<html><body>{html}</body></html>", subtype="html")
+    if rng.random() < spec.attachment_ratio:
+        message.add_attachment(
+            rng.randbytes(spec.attachment_size),
+            maintype="application",
+            subtype="octet-stream",
+            filename=f"attachment-{index}.bin",
+        )
+
+    # boundaries are random by default, which would make output differ
+    for position, part in enumerate(message.walk()):
+        if part.is_multipart():
+            part.set_boundary(f"==boundary-{index}-{position}==")
+    return message
+
+
+def _sentence(rng: random.Random, length: int, keywords: List[str]) -> str:
+    words = [rng.choice(WORDS) for _ in range(length)]
+    for keyword in keywords:
+        words.insert(rng.randrange(len(words) + 1), keyword)
+    sentence = " ".join(words)
+    return sentence[0].upper() + sentence[1:] + "."
+
+
+def _paragraphs(rng: random.Random, size: int, keywords: List[str]) -> str:
+    sentences: List[str] = []
+    length = 0
+    while length < size:
+        placed = keywords if not sentences else []
+        sentence = _sentence(rng, rng.randint(6, 14), placed)
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    paragraphs = [" ".join(sentences[i : i + 4]) for i in range(0, len(sentences), 4)]
+    # a line starting with From must be escaped in mbox files
+    return "\n\n".join(paragraphs) + "\nFrom the recruiting team\n"
@@ -0,0 +1,277 @@
+"""On-disk cache of processor results.
+
+Results are stored in one JSON file per (mailbox, processor) pair, named by a
+hash of the mailbox fingerprint and of the processor's name, version and
+config. A changed mailbox or processor therefore never matches a stale entry,
+and unused entries are evicted least recently used first once the cache
+grows past its size limit.
+
+Processors can also memoize per-email results across mailboxes and runs in a
+MemoCache, a single JSON file per processor config living in the same
+directory, and evicted along with the other entries.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from . import __version__
+from .processors import EmailProcessor
+
+CACHE_DIR_ENV = "SWECC_EMAIL_SCRAPER_CACHE_DIR"
+DEFAULT_MAX_BYTES = 256 << 20
+SAMPLE_SIZE = 1 << 16  # bytes hashed at each sampled offset of a mailbox
+SAMPLE_COUNT = 16  # evenly spaced samples, including the start and the end
+ENTRY_SUFFIX = ".json"
+MEMO_PREFIX = "memo-"
+DEFAULT_MAX_MEMO_ENTRIES = 50_000
+
+
+def default_cache_dir() -> Path:
+    """Directory of the result cache, from the environment or the user cache dir."""
+    if directory := os.environ.get(CACHE_DIR_ENV):
+        return Path(directory)
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "swecc-email-scraper"
+
+
+def mbox_fingerprint(path: Path) -> str:
+    """Fingerprint a mailbox by its size, modification time and sampled contents.
+
+    Hashing evenly spaced samples instead of the whole file keeps this fast on
+    huge archives, while still catching in-place rewrites that preserve the
+    size and modification time. Directories such as Maildirs are fingerprinted
+    by the names, sizes and modification times of the files they contain.
+
+    Args:
+        path: Path of the mailbox
+
+    Returns:
+        Hex digest identifying the current contents of the mailbox
+    """
+    if path.is_dir():
+        return _directory_fingerprint(path)
+
+    stat = path.stat()
+    digest = hashlib.blake2b(
+        f"{stat.st_size}:{stat.st_mtime_ns}".encode(), digest_size=16
+    )
+    with open(path, "rb") as f:
+        last = max(stat.st_size - SAMPLE_SIZE, 0)
+        for i in range(SAMPLE_COUNT):
+            f.seek(last * i // (SAMPLE_COUNT - 1))
+            digest.update(f.read(SAMPLE_SIZE))
+    return digest.hexdigest()
+
+
+def _directory_fingerprint(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for file in sorted(p for p in path.rglob("*") if p.is_file()):
+        stat = file.stat()
+        name = file.relative_to(path).as_posix()
+        digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def processor_key(processor: EmailProcessor) -> str:
+    """Describe everything about a processor that its results depend on."""
+    cls = type(processor)
+    return json.dumps(
+        {
+            "name": processor.name,
+            "class": f"{cls.__module__}.{cls.__qualname__}",
+            "version": processor.version,
+            "package": __version__,
+            "config": processor.config(),
+        },
+        sort_keys=True,
+        default=str,
+    )
+
+
+class ResultCache:
+    """Size-capped, least recently used cache of processor results."""
+
+    def __init__(
+        self,
+        directory: Optional[Union[str, Path]] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        """Initialize the cache.
+
+        Args:
+            directory: Directory holding the cache entries (see default_cache_dir)
+            max_bytes: Total size of entries above which old entries are evicted
+        """
+        self.directory = Path(directory) if directory else default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def fingerprint(self, mbox_path: Path) -> str:
+        """Fingerprint the current contents of a mailbox (see mbox_fingerprint)."""
+        return mbox_fingerprint(mbox_path)
+
+    def path_for(self, fingerprint: str, processor: EmailProcessor) -> Path:
+        """Path of the entry holding a processor's results for a mailbox."""
+        key = hashlib.blake2b(
+            f"{fingerprint}\n{processor_key(processor)}".encode(), digest_size=20
+        ).hexdigest()
+        return self.directory / f"{key}{ENTRY_SUFFIX}"
+
+    def get(
+        self, fingerprint: str, processor: EmailProcessor
+    ) -> Optional[Dict[str, Any]]:
+        """Look up the cached results of a processor.
+
+        Args:
+            fingerprint: Fingerprint of the processed mailbox
+            processor: Processor whose results to look up
+
+        Returns:
+            Cached results, or None if there are none or they can't be read
+        """
+        path = self.path_for(fingerprint, processor)
+        try:
+            with open(path, encoding="utf-8") as f:
+                results: Dict[str, Any] = json.load(f)
+            _touch(path)  # mark the entry as recently used
+        except (OSError, ValueError):
+            return None
+        return results
+
+    def put(
+        self, fingerprint: str, processor: EmailProcessor, results: Dict[str, Any]
+    ) -> None:
+        """Store the results of a processor, evicting old entries if needed.
+
+        Failing to write to the cache is not an error, since results can
+        always be recomputed.
+
+        Args:
+            fingerprint: Fingerprint of the processed mailbox
+            processor: Processor that produced the results
+            results: JSON-serializable results to store
+        """
+        path = self.path_for(fingerprint, processor)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(results, f)
+            os.replace(tmp_path, path)
+            _touch(path)
+            self.evict()
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for path in self.directory.glob(f"*{ENTRY_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # evicted concurrently
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+class MemoCache:
+    """Persistent memo of a processor's results for individual texts.
+
+    Entries map a hash of a text (see text_key) to a JSON-serializable result.
+    They are loaded from and saved to a file named by a hash of the
+    processor's name, version and config, so a changed config never reuses
+    stale results. When saved, only the max_entries most recently used
+    entries are kept. Concurrent runs don't merge their entries: the last one
+    to save wins.
+    """
+
+    def __init__(
+        self,
+        processor: EmailProcessor,
+        directory: Optional[Union[str, Path]] = None,
+        max_entries: int = DEFAULT_MAX_MEMO_ENTRIES,
+    ):
+        """Initialize the memo, loading the entries saved by previous runs.
+
+        Args:
+            processor: Processor whose results are memoized
+            directory: Directory holding the memo file (see default_cache_dir)
+            max_entries: Number of entries kept when saving
+        """
+        directory = Path(directory) if directory else default_cache_dir()
+        key = hashlib.blake2b(
+            processor_key(processor).encode(), digest_size=20
+        ).hexdigest()
+        self.path = directory / f"{MEMO_PREFIX}{key}{ENTRY_SUFFIX}"
+        self.max_entries = max_entries
+        self.entries: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        self._changed = False
+
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(entries, dict):
+            self.entries = entries
+
+    @staticmethod
+    def text_key(text: str) -> str:
+        """Hash a (normalized) text into a memo key."""
+        data = text.encode("utf-8", "surrogatepass")
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Look up the memoized result for a key, or None if there is none."""
+        result = self.entries.pop(key, None)
+        if result is None:
+            self.misses += 1
+            return None
+        # reinsert, so entries stay ordered from least to most recently used
+        self.entries[key] = result
+        self.hits += 1
+        self._changed = True
+        return result
+
+    def put(self, key: str, result: Any) -> None:
+        """Memoize the result for a key."""
+        self.entries.pop(key, None)
+        self.entries[key] = result
+        self._changed = True
+
+    def save(self) -> None:
+        """Write the most recently used entries to the memo file, if changed.
+
+        Like ResultCache.put, failing to write is not an error.
+        """
+        if not self._changed:
+            return
+        keys = list(self.entries)[-self.max_entries :]
+        entries = {key: self.entries[key] for key in keys}
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+            self._changed = False
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+
+
+def _touch(path: Path) -> None:
+    # file timestamps can be coarser than the clock, which would tie entries
+    now = time.time_ns()
+    os.utime(path, ns=(now, now))
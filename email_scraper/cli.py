@@ -1,23 +1,267 @@
+import functools
 import json
+import re
 import sys
+import time
+from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Tuple
 
 import click
-from rich.console import Console
 
 from . import __version__
-from .formatters import FORMATTERS
-from .formatters.json import JsonFormatter
-from .processors import PROCESSORS, EmailData, Pipeline
-from .processors.classifier import EmailClassifier
-from .processors.example import ExampleProcessor
+from .plugins import FORMATTERS, PROCESSORS, READERS, Registry
+from .processors.body import DEFAULT_MAX_CONTENT_BYTES, ContentOptions
+from .wire import BINARY_FORMAT, WIRE_FORMATS
 
-# register built-in processors and formatters
-PROCESSORS["statistics"] = ExampleProcessor
-PROCESSORS["classifier"] = EmailClassifier
-FORMATTERS["json"] = JsonFormatter
+if TYPE_CHECKING:
+    from click.shell_completion import CompletionItem
+    from rich.console import Console
 
-console = Console(stderr=True)  # use stderr for status messages
+    from .readers import MailboxReader
+    from .readers.filters import HeaderFilter
+    from .timings import Timings
+
+# Everything else is imported inside the commands that use it, so that short
+# invocations such as --help or list-processors start quickly.
+
+# fields decoded from binary input by commands that don't need every field
+STATS_FIELDS = ("sender", "subject", "date")
+CLASSIFY_FIELDS = ("subject", "content")
+WINDOW_FIELDS = ("sender", "subject", "date", "content")
+
+# accepted by --since and --until, as dates or times without a timezone (UTC)
+DATE_FORMATS = ["%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S"]
+
+
+@functools.lru_cache(maxsize=None)
+def get_console() -> "Console":
+    """Console for status messages on stderr, created on first use."""
+    from rich.console import Console  # noqa: PLC0415 slow to import
+
+    return Console(stderr=True)
+
+
+class RegistryChoice(click.ParamType):  # type: ignore[type-arg]
+    """Choice among the components of a registry, without importing them.
+
+    Unlike click.Choice, the names are only listed when needed (for help or
+    an invalid value), so installed packages are only scanned for plugins then.
+    """
+
+    name = "choice"
+
+    def __init__(self, registry: Registry[Any]):
+        """Initialize the parameter type.
+
+        Args:
+            registry: Registry whose component names are accepted
+        """
+        self.registry = registry
+
+    def get_metavar(
+        self, param: click.Parameter, ctx: Optional[click.Context] = None
+    ) -> str:
+        """Show the accepted names in help."""
+        return f"[{'|'.join(self.registry)}]"
+
+    def convert(
+        self, value: Any, param: Optional[click.Parameter], ctx: Optional[click.Context]
+    ) -> Any:
+        """Check that a name is in the registry."""
+        if value in self.registry:
+            return value
+        choices = ", ".join(repr(name) for name in self.registry)
+        self.fail(f"{value!r} is not one of {choices}.", param, ctx)
+
+    def shell_complete(
+        self, ctx: click.Context, param: click.Parameter, incomplete: str
+    ) -> List["CompletionItem"]:
+        """Complete the names starting with the incomplete value."""
+        from click.shell_completion import CompletionItem  # noqa: PLC0415
+
+        return [CompletionItem(n) for n in self.registry if n.startswith(incomplete)]
+
+
+def list_components(title: str, registry: Registry[Any]) -> None:
+    """Print the names and descriptions of the components of a registry to stderr.
+
+    Uses click rather than rich, which would take longer to import than
+    listing takes, to print the same styled output.
+    """
+    click.secho(f"\n{title}:\n", bold=True, err=True)
+    for name in registry:
+        styled = click.style(name, fg="green")
+        click.echo(f"{styled}: {registry.describe(name)}", err=True)
+
+
+def make_reader(
+    name: str,
+    workers: int = 1,
+    compact: bool = False,
+    content_options: Optional[ContentOptions] = None,
+    header_filter: Optional["HeaderFilter"] = None,
+) -> "MailboxReader":
+    """Instantiate a registered reader, using the parallel one for several workers.
+
+    Only mbox files are split between workers. Other readers, such as the
+    compressed one, read their mailbox in a single process whatever the number
+    of workers.
+
+    Raises:
+        click.UsageError: If several workers are asked of the indexed reader,
+            which must read appended messages in order to update its index
+    """
+    from .readers.maildir import MaildirReader  # noqa: PLC0415
+    from .readers.parallel import ParallelMboxReader  # noqa: PLC0415
+    from .readers.sources import AutoReader  # noqa: PLC0415
+
+    options = content_options or ContentOptions()
+    if name == "auto":
+        return AutoReader(workers, compact, options, header_filter)
+    if name == "maildir":
+        return MaildirReader(workers, compact, options, header_filter)
+    if name == "parallel" or (workers > 1 and name in ("mbox", "mmap")):
+        return ParallelMboxReader(workers, compact, options, header_filter)
+    if name == "indexed" and workers > 1:
+        raise click.UsageError(
+            "--reader indexed can't be used with --workers, as it updates its index "
+            "in a single pass"
+        )
+    return READERS[name](
+        compact=compact, content_options=options, header_filter=header_filter
+    )
+
+
+def body_options(command: Callable[..., None]) -> Callable[..., None]:
+    """Add options controlling body extraction to a command, passing it ContentOptions."""
+
+    @click.option(
+        "--max-content-bytes",
+        type=click.IntRange(min=0),
+        default=DEFAULT_MAX_CONTENT_BYTES,
+        show_default=True,
+        help="Maximum decoded bytes of body text kept per message (0 for no limit)",
+    )
+    @click.option(
+        "--no-html-fallback",
+        is_flag=True,
+        help="Leave the body empty for HTML-only messages instead of converting the HTML",
+    )
+    @functools.wraps(command)
+    def wrapper(max_content_bytes: int, no_html_fallback: bool, **kwargs: Any) -> None:
+        options = ContentOptions(max_content_bytes or None, not no_html_fallback)
+        command(content_options=options, **kwargs)
+
+    return wrapper
+
+
+def filter_options(command: Callable[..., None]) -> Callable[..., None]:
+    """Add options selecting messages by their headers, passing a HeaderFilter or None.
+
+    Filters are applied to the headers of each message before its body is
+    parsed, so the bodies of messages filtered out are never decoded.
+    """
+
+    @click.option(
+        "--since",
+        type=click.DateTime(DATE_FORMATS),
+        help="Only read messages sent at or after this date (UTC unless stated)",
+    )
+    @click.option(
+        "--until",
+        type=click.DateTime(DATE_FORMATS),
+        help="Only read messages sent before this date (UTC unless stated)",
+    )
+    @click.option(
+        "--from",
+        "senders",
+        multiple=True,
+        help="Only read messages whose sender contains this text, ignoring case "
+        "(repeat to accept several senders)",
+    )
+    @click.option(
+        "--subject-match",
+        help="Only read messages whose subject matches this regular expression, "
+        "ignoring case",
+    )
+    @functools.wraps(command)
+    def wrapper(
+        since: Optional[datetime],
+        until: Optional[datetime],
+        senders: Tuple[str, ...],
+        subject_match: Optional[str],
+        **kwargs: Any,
+    ) -> None:
+        header_filter = None
+        if since or until or senders or subject_match is not None:
+            from .readers.filters import HeaderFilter  # noqa: PLC0415
+
+            try:
+                header_filter = HeaderFilter(since, until, senders, subject_match)
+            except re.error as e:
+                raise click.BadParameter(str(e), param_hint="--subject-match") from e
+        command(header_filter=header_filter, **kwargs)
+
+    return wrapper
+
+
+def timing_options(command: Callable[..., None]) -> Callable[..., None]:
+    """Add --timings and --profile options to a command, passing it a Timings object.
+
+    The timings report is written when the command ends, even if it fails,
+    since slow or failing runs are the ones worth looking into.
+    """
+
+    @click.option(
+        "--timings",
+        "timings_path",
+        is_flag=False,
+        flag_value="-",
+        default=None,
+        type=click.Path(dir_okay=False, allow_dash=True),
+        help="Report per-stage timings as JSON to stderr, or to the given file",
+    )
+    @click.option(
+        "--profile",
+        "profile_stage",
+        metavar="STAGE",
+        help="Profile a single stage (such as read or process) with cProfile",
+    )
+    @click.option(
+        "--profile-output",
+        type=click.Path(dir_okay=False, path_type=Path),
+        help="File to write the profile to (defaults to <command>-<stage>.prof)",
+    )
+    @functools.wraps(command)
+    def wrapper(
+        timings_path: Optional[str],
+        profile_stage: Optional[str],
+        profile_output: Optional[Path],
+        **kwargs: Any,
+    ) -> None:
+        name = command.__name__.replace("_", "-")
+        from .timings import Timings  # noqa: PLC0415
+
+        timings = Timings(name, timings_path is not None, profile_stage)
+        try:
+            command(timings=timings, **kwargs)
+        finally:
+            if timings_path is not None:
+                timings.write(timings_path)
+            if profile_stage is not None:
+                path = profile_output or Path(f"{name}-{profile_stage}.prof")
+                if timings.dump_profile(path):
+                    get_console().print(
+                        f"[green]Profile of {profile_stage} saved to {path}[/green]"
+                    )
+                else:
+                    get_console().print(
+                        f"[yellow]No stage named {profile_stage} ran; "
+                        f"stages were: {', '.join(timings.stages)}[/yellow]"
+                    )
+
+    return wrapper
 
 
 @click.group()
@@ -33,59 +277,207 @@ def main() -> None:
 
 
 @main.command()
-@click.argument("mbox_path", type=click.Path(exists=True, path_type=str))
-def read(mbox_path: str) -> None:
-    """Read emails from an mbox file and output as JSON.
+@click.argument("sources", nargs=-1, required=True)
+@click.option(
+    "-o",
+    "--output-format",
+    type=click.Choice([*WIRE_FORMATS, BINARY_FORMAT]),
+    default="json",
+    help="Wire format: a JSON array, NDJSON with one email per line, or binary",
+)
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes used to parse the mbox file, or mailboxes read at once",
+)
+@click.option(
+    "-r",
+    "--reader",
+    "reader_name",
+    type=RegistryChoice(READERS),
+    default="auto",
+    help="Engine used to read mailboxes (auto picks one from the path, and "
+    "--workers > 1 implies parallel for mbox files)",
+)
+@click.option(
+    "--by-date",
+    is_flag=True,
+    help="Merge several mailboxes in date order instead of one after the other",
+)
+@body_options
+@filter_options
+@timing_options
+def read(
+    sources: Tuple[str, ...],
+    output_format: str,
+    workers: int,
+    reader_name: str,
+    by_date: bool,
+    content_options: ContentOptions,
+    header_filter: Optional["HeaderFilter"],
+    timings: "Timings",
+) -> None:
+    """Read emails from mbox files and output as JSON.
 
     Outputs a JSON array of email objects to stdout, which can be piped to other commands.
+    Emails are written as they are parsed, so downstream commands can start right away.
+    The binary format is smaller and faster to read back than JSON.
+
+    SOURCES are mbox files, directories searched recursively for mbox files, or
+    glob patterns. Several mailboxes are read as a single stream, with up to
+    --workers of them parsed at the same time.
+
+    --since, --until, --from and --subject-match only parse the headers of
+    messages that don't match, so selective filters make reading much faster.
     """
+    from .processors import Pipeline  # noqa: PLC0415
+    from .readers.index import IndexedMboxReader  # noqa: PLC0415
+    from .readers.sources import expand_sources  # noqa: PLC0415
+    from .timings import input_size  # noqa: PLC0415
+    from .wire import email_to_dict, write_binary_emails, write_records  # noqa: PLC0415
+
     try:
-        pipeline = Pipeline([])
-        emails = pipeline.load_emails(Path(mbox_path))
-
-        email_dicts = [
-            {
-                "sender": e.sender,
-                "subject": e.subject,
-                "date": e.date,
-                "content": e.content,
-                "headers": e.headers,
-            }
-            for e in emails
-        ]
-        json.dump(email_dicts, sys.stdout, ensure_ascii=False)
+        paths = expand_sources(sources)
+        if len(paths) == 1:
+            reader = make_reader(
+                reader_name,
+                workers,
+                content_options=content_options,
+                header_filter=header_filter,
+            )
+            emails = Pipeline([], reader=reader).iter_emails(paths[0])
+        else:
+            # mailboxes are parsed concurrently, each one in a single process
+            name = "mbox" if reader_name == "parallel" else reader_name
+            reader = make_reader(
+                name, content_options=content_options, header_filter=header_filter
+            )
+            pipeline = Pipeline([], reader=reader)
+            emails = pipeline.iter_emails(paths, workers, by_date)
+
+        if timings.enabled:
+            timings.get("read").bytes_read = sum(map(input_size, paths))
+        emails = timings.iterate("read", emails)
+        with timings.stage("write"):
+            if output_format == BINARY_FORMAT:
+                sys.stdout.flush()
+                write_binary_emails(emails, sys.stdout.buffer)
+            else:
+                records = (email_to_dict(e) for e in emails)
+                write_records(records, sys.stdout, output_format)
+        if isinstance(reader, IndexedMboxReader) and reader.rebuilt:
+            get_console().print(
+                "[yellow]mbox was truncated or rewritten; index rebuilt[/yellow]"
+            )
+    except click.UsageError:
+        raise
     except Exception as e:
-        console.print(f"[red]Error reading mbox: {e}[/red]")
+        get_console().print(f"[red]Error reading mbox: {e}[/red]")
         raise click.Abort() from e
 
 
 @main.command()
-def stats() -> None:
+@click.option(
+    "--approximate",
+    is_flag=True,
+    help="Use fixed-size sketches for sender and subject counts on huge archives",
+)
+@timing_options
+def stats(approximate: bool, timings: "Timings") -> None:
     """Process emails from stdin and output statistics.
 
-    Reads JSON email data from stdin (piped from 'read' command),
+    Reads JSON, NDJSON or binary email data from stdin (piped from 'read' command),
     processes it using the statistics processor, and outputs results as JSON to stdout.
     """
+    from .processors.example import ExampleProcessor  # noqa: PLC0415
+    from .wire import read_emails  # noqa: PLC0415
+
     try:
-        data = json.load(sys.stdin)
-
-        emails = [
-            EmailData(
-                sender=e["sender"],
-                subject=e["subject"],
-                date=e["date"],
-                content=e["content"],
-                headers=e["headers"],
-            )
-            for e in data
-        ]
+        stdin = timings.count_bytes("decode", sys.stdin.buffer)
+        emails = timings.iterate("decode", read_emails(stdin, STATS_FIELDS))
+
+        processor = ExampleProcessor(approximate=approximate)
+        with timings.processor(processor.name) as timing:
+            results = processor.process(emails)
+            timing.messages += results["total_messages"]
+
+        with timings.stage("write"):
+            json.dump(results, sys.stdout)
+    except Exception as e:
+        get_console().print(f"[red]Error processing emails: {e}[/red]")
+        raise click.Abort() from e
+
 
-        processor = ExampleProcessor()
-        results = processor.process(emails)
+@main.command()
+@click.option(
+    "--window",
+    "window_size",
+    default="1d",
+    show_default=True,
+    help="Size of each window, as a number and a unit of s, m, h, d or w (like 1w)",
+)
+@click.option(
+    "--rolling",
+    type=click.IntRange(min=0),
+    default=7,
+    show_default=True,
+    help="Consecutive windows summed into each rolling window (0 for none)",
+)
+@click.option(
+    "--retention",
+    type=click.IntRange(min=0),
+    default=366,
+    show_default=True,
+    help="Number of most recent windows with messages kept (0 to keep every window)",
+)
+@click.option(
+    "--no-categories",
+    is_flag=True,
+    help="Count messages per sender only, without classifying them",
+)
+@timing_options
+def windows(
+    window_size: str,
+    rolling: int,
+    retention: int,
+    no_categories: bool,
+    timings: "Timings",
+) -> None:
+    """Process emails from stdin and output counts per time window.
+
+    Reads JSON, NDJSON or binary email data from stdin (piped from 'read' command)
+    and counts messages per tumbling window of their date, per sender and per
+    category, and over rolling windows of several consecutive windows. Only
+    counts per window are kept, not dates, so memory stays bounded on
+    archives of any length. Messages may be in any date order, but those of
+    windows older than the retained ones are only counted as expired.
+    """
+    from .processors.windows import WindowProcessor, parse_duration  # noqa: PLC0415
+    from .wire import read_emails  # noqa: PLC0415
+
+    try:
+        window = parse_duration(window_size)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--window") from e
 
-        json.dump(results, sys.stdout)
+    try:
+        processor = WindowProcessor(
+            window, rolling or None, retention or None, categories=not no_categories
+        )
+        fields = STATS_FIELDS if no_categories else WINDOW_FIELDS
+        stdin = timings.count_bytes("decode", sys.stdin.buffer)
+        emails = timings.iterate("decode", read_emails(stdin, fields))
+
+        with timings.processor(processor.name) as timing:
+            results = processor.process(emails)
+            timing.messages += results["total_messages"]
+
+        with timings.stage("write"):
+            json.dump(results, sys.stdout)
     except Exception as e:
-        console.print(f"[red]Error processing emails: {e}[/red]")
+        get_console().print(f"[red]Error processing emails: {e}[/red]")
         raise click.Abort() from e
 
 
@@ -94,68 +486,348 @@ def stats() -> None:
     "-f",
     "--format",
     "format_name",
-    type=click.Choice(list(FORMATTERS.keys())),
+    type=RegistryChoice(FORMATTERS),
     default="json",
     help="Output format",
 )
-def format(format_name: str) -> None:
+@timing_options
+def format(format_name: str, timings: "Timings") -> None:
     """Format JSON data from stdin using the specified formatter.
 
     Reads JSON data from stdin and formats it according to the specified format.
+    NDJSON and binary input is formatted record by record as it arrives, and
+    output is written as it is rendered. The csv and ndjson formats write one
+    row per email of classifier results, such as the records streamed by
+    'classify -o ndjson'.
     """
+    from .wire import read_values  # noqa: PLC0415
+
     try:
-        data = json.load(sys.stdin)
+        formatter = FORMATTERS[format_name]()
+        stdin = timings.count_bytes("decode", sys.stdin.buffer)
+        values = timings.iterate("decode", read_values(stdin))
+        with timings.stage("format"):
+            formatter.write_values(values, sys.stdout)
+    except Exception as e:
+        get_console().print(f"[red]Error formatting data: {e}[/red]")
+        raise click.Abort() from e
+
+
+@main.command()
+@click.argument("mbox_path", type=click.Path(exists=True, path_type=str))
+@click.option(
+    "-p",
+    "--processor",
+    "processor_names",
+    type=RegistryChoice(PROCESSORS),
+    multiple=True,
+    default=["statistics"],
+    show_default=True,
+    help="Processor to run (repeat to run several over the same pass)",
+)
+@click.option(
+    "-f",
+    "--format",
+    "format_name",
+    type=RegistryChoice(FORMATTERS),
+    default="json",
+    help="Output format",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, path_type=str),
+    help="File to save the formatted results to (defaults to stdout)",
+)
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes used to parse and process the mbox file",
+)
+@click.option(
+    "-r",
+    "--reader",
+    "reader_name",
+    type=RegistryChoice(READERS),
+    default="auto",
+    help="Engine used to read mailboxes (auto picks one from the path, and "
+    "--workers > 1 implies parallel for mbox files)",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Recompute results instead of reusing cached results for an unchanged mbox",
+)
+@body_options
+@filter_options
+@timing_options
+def run(
+    mbox_path: str,
+    processor_names: Tuple[str, ...],
+    format_name: str,
+    output: Optional[str],
+    workers: int,
+    reader_name: str,
+    no_cache: bool,
+    content_options: ContentOptions,
+    header_filter: Optional["HeaderFilter"],
+    timings: "Timings",
+) -> None:
+    """Read, process and format an mbox file in a single process.
+
+    Equivalent to piping 'read' into processor commands and 'format', but the
+    mbox is parsed once for all processors and no JSON is exchanged between
+    stages. Results are cached per processor, so rerunning a processor over an
+    unchanged mbox returns immediately. For example:
+
+    email-scraper run input.mbox -p statistics -p classifier -f json
+    """
+    from .cache import ResultCache  # noqa: PLC0415
+    from .processors import Pipeline  # noqa: PLC0415
+
+    try:
+        processors = [PROCESSORS[name]() for name in dict.fromkeys(processor_names)]
+        # emails stay in this process, so only decode what processors use
+        reader = make_reader(reader_name, workers, True, content_options, header_filter)
+        cache = None if no_cache else ResultCache()
+        pipeline = Pipeline(processors, reader=reader, cache=cache, timings=timings)
+        results = pipeline.process(Path(mbox_path))
 
         formatter = FORMATTERS[format_name]()
-        formatted = formatter.format(data)
+        with timings.stage("format"):
+            if output:
+                formatter.save(results, Path(output))
+            else:
+                formatter.write_values([results], sys.stdout)
+    except click.UsageError:
+        raise
+    except Exception as e:
+        get_console().print(f"[red]Error running pipeline: {e}[/red]")
+        raise click.Abort() from e
 
-        print(formatted)
+
+@main.command()
+@click.argument(
+    "mbox_path", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@click.option(
+    "-p",
+    "--processor",
+    "processor_names",
+    type=RegistryChoice(PROCESSORS),
+    multiple=True,
+    default=["statistics", "classifier"],
+    show_default=True,
+    help="Processor to update (repeat to run several)",
+)
+@click.option(
+    "-i",
+    "--interval",
+    type=click.FloatRange(min=0),
+    default=1.0,
+    show_default=True,
+    help="Seconds between checks of the mbox for new mail",
+)
+@body_options
+@filter_options
+@timing_options
+def watch(
+    mbox_path: Path,
+    processor_names: Tuple[str, ...],
+    interval: float,
+    content_options: ContentOptions,
+    header_filter: Optional["HeaderFilter"],
+    timings: "Timings",
+) -> None:
+    """Follow an mbox file as mail arrives, streaming updated results as NDJSON.
+
+    Only messages appended since the last check are parsed and processed.
+    Each line holds the results of an update keyed by processor name, like
+    'run', and an "update" entry counting the new messages. The classifier
+    only reports the new emails, while statistics cover every email so far.
+    Stops on Ctrl-C. For example:
+
+    email-scraper watch inbox.mbox | email-scraper format -f csv
+    """
+    from .processors import Pipeline  # noqa: PLC0415
+    from .readers.index import IndexedMboxReader  # noqa: PLC0415
+    from .wire import write_records  # noqa: PLC0415
+
+    processors = [PROCESSORS[name]() for name in dict.fromkeys(processor_names)]
+    reader = IndexedMboxReader(None, True, content_options, header_filter)
+    pipeline = Pipeline(processors, reader=reader, timings=timings)
+    try:
+        for results in pipeline.watch(mbox_path, interval):
+            with timings.stage("write"):
+                write_records([results], sys.stdout)
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
-        console.print(f"[red]Error formatting data: {e}[/red]")
+        get_console().print(f"[red]Error watching mbox: {e}[/red]")
         raise click.Abort() from e
 
 
 @main.command()
-def list_processors() -> None:
+@click.argument(
+    "mbox_path", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@click.option(
+    "--host", default="127.0.0.1", show_default=True, help="Address to listen on"
+)
+@click.option(
+    "--port",
+    type=click.IntRange(min=0, max=65535),
+    default=8642,
+    show_default=True,
+    help="TCP port to listen on",
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Listen on a Unix socket at this path instead of TCP",
+)
+@click.option(
+    "--approximate",
+    is_flag=True,
+    help="Use fixed-size sketches for sender and subject counts on huge archives",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Classify every email instead of reusing classifications of identical texts",
+)
+@body_options
+@timing_options
+def serve(
+    mbox_path: Path,
+    host: str,
+    port: int,
+    socket_path: Optional[Path],
+    approximate: bool,
+    no_cache: bool,
+    content_options: ContentOptions,
+    timings: "Timings",
+) -> None:
+    """Keep an mbox file parsed in memory and answer queries about it over HTTP.
+
+    The mbox is parsed once, and messages appended to it are parsed as they
+    arrive, so each request is answered in milliseconds. GET /stats, /classify
+    and /query (paged with offset and limit) accept since, until, from and
+    subject query parameters like the filters of 'read'; /status describes the
+    mailbox. For example:
+
+    curl 'http://127.0.0.1:8642/stats?since=2024-01-01&from=example.com'
+    """
+    from .cache import MemoCache  # noqa: PLC0415
+    from .processors.classifier import EmailClassifier  # noqa: PLC0415
+    from .server import MailboxService, make_server  # noqa: PLC0415
+
+    memo = None if no_cache else MemoCache(EmailClassifier())
+    service = MailboxService(mbox_path, content_options, approximate, memo, timings)
+    try:
+        start = time.perf_counter()
+        messages = service.refresh()
+        server = make_server(service, host, port, socket_path)
+    except Exception as e:
+        get_console().print(f"[red]Error starting server: {e}[/red]")
+        raise click.Abort() from e
+
+    address = socket_path or "http://{}:{}".format(*server.socket.getsockname()[:2])
+    get_console().print(
+        f"[green]Loaded {messages} messages in {time.perf_counter() - start:.1f}s, "
+        f"listening on {address}[/green]"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if memo is not None:
+            memo.save()
+
+
+@main.command()
+@timing_options
+def list_processors(timings: "Timings") -> None:
     """List available email processors."""
-    console.print("\n[bold]Available Processors:[/bold]\n")
-    for name, processor_cls in PROCESSORS.items():
-        console.print(f"[green]{name}[/green]: {processor_cls.description}")
+    with timings.stage("list"):
+        list_components("Available Processors", PROCESSORS)
 
 
 @main.command()
-def list_formats() -> None:
+@timing_options
+def list_formats(timings: "Timings") -> None:
     """List available output formats."""
-    console.print("\n[bold]Available Output Formats:[/bold]\n")
-    for name, formatter_cls in FORMATTERS.items():
-        console.print(f"[green]{name}[/green]: {formatter_cls.description}")
+    with timings.stage("list"):
+        list_components("Available Output Formats", FORMATTERS)
 
 
 @main.command()
-def classify() -> None:
+@click.option(
+    "-o",
+    "--output-format",
+    type=click.Choice(WIRE_FORMATS),
+    default="json",
+    help="Output a JSON document, or stream NDJSON with one classification per line",
+)
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes classifying chunks of emails",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Classify every email instead of reusing classifications of identical texts",
+)
+@timing_options
+def classify(
+    output_format: str, workers: int, no_cache: bool, timings: "Timings"
+) -> None:
     """Classify emails read from stdin and output results to stdout.
 
-    Reads JSON email data from stdin (piped from 'read' command),
+    Reads JSON, NDJSON or binary email data from stdin (piped from 'read' command),
     classifies it using the email classifier, and outputs results as JSON to stdout.
+
+    Classifications are memoized by the normalized subject and content of
+    each email, so templated emails seen before, in this run or a previous
+    one, are not classified again.
     """
+    from .cache import MemoCache  # noqa: PLC0415
+    from .processors.classifier import EmailClassifier  # noqa: PLC0415
+    from .wire import read_emails, write_records  # noqa: PLC0415
+
     try:
-        data = json.load(sys.stdin)
-
-        emails = [
-            EmailData(
-                sender=e["sender"],
-                subject=e["subject"],
-                date=e["date"],
-                content=e["content"],
-                headers=e["headers"],
-            )
-            for e in data
-        ]
+        stdin = timings.count_bytes("decode", sys.stdin.buffer)
+        emails = timings.iterate("decode", read_emails(stdin, CLASSIFY_FIELDS))
 
         classifier = EmailClassifier()
-        results = classifier.process(emails)
-        json.dump(results, sys.stdout, indent=4)
-        sys.stdout.write("\n")  # Ensure a newline is written
+        memo = None if no_cache else MemoCache(classifier)
+        classifications = classifier.iter_classifications(emails, workers, memo)
+        if output_format == "ndjson":
+            with timings.stage("write"):
+                write_records(timings.iterate("process", classifications), sys.stdout)
+            if timings.enabled:
+                seconds = timings.get("process").seconds
+                timings.add_processor_time(classifier.name, seconds)
+            if memo is not None:
+                memo.save()
+            return
+
+        with timings.processor(classifier.name) as timing:
+            results = classifier.finalize(list(classifications))
+            timing.messages += len(results["classifications"])
+        if memo is not None:
+            memo.save()
+        with timings.stage("write"):
+            json.dump(results, sys.stdout, indent=4)
+            sys.stdout.write("\n")  # Ensure a newline is written
     except Exception as e:
         click.echo(f"Error processing emails: {e}", err=True)
         sys.exit(1)
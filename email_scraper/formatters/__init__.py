@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Any, Dict, Type
+from typing import IO, Any, Dict, Iterable, Iterator, List
+
+from ..plugins import FORMATTERS as FORMATTERS  # registry of formatters
+
+WRITE_BUFFER_SIZE = 1 << 16  # characters of output buffered before each write
 
 
 class OutputFormatter(ABC):
@@ -26,6 +30,31 @@ class OutputFormatter(ABC):
         """
         pass
 
+    def write(self, results: Dict[str, Any], stream: IO[str]) -> None:
+        """Write formatted results to a text stream.
+
+        Args:
+            results: Dictionary of processing results to format
+            stream: Text stream to write to
+        """
+        stream.write(self.format(results))
+
+    def write_values(self, values: Iterable[Dict[str, Any]], stream: IO[str]) -> None:
+        """Write a stream of results, such as the records piped to the format command.
+
+        Each value is formatted on its own and followed by a newline, and
+        written out before the next value is read, so results streamed by a
+        long-running command such as watch show up as they arrive.
+
+        Args:
+            values: Results to format, in order
+            stream: Text stream to write to
+        """
+        for results in values:
+            self.write(results, stream)
+            stream.write("\n")
+            stream.flush()
+
     def save(self, results: Dict[str, Any], output_path: Path) -> None:
         """Save formatted results to a file.
 
@@ -33,10 +62,62 @@ class OutputFormatter(ABC):
             results: Dictionary of processing results to format
             output_path: Path where to save the formatted output
         """
-        formatted = self.format(results)
         with open(output_path, "w") as f:
-            f.write(formatted)
+            self.write(results, f)
+
+
+class StreamingFormatter(OutputFormatter):
+    """Base class for formatters that render their output in chunks.
+
+    Chunks are written as they are produced (in buffered writes), so the
+    rendered document is never held in memory all at once. The output of
+    streaming formatters ends with a newline.
+    """
+
+    @abstractmethod
+    def iter_chunks(self, results: Dict[str, Any]) -> Iterator[str]:
+        """Render processing results piece by piece.
+
+        Args:
+            results: Dictionary of processing results to format
+
+        Yields:
+            Consecutive pieces of the formatted output
+        """
+        pass
+
+    def format(self, results: Dict[str, Any]) -> str:
+        """Format processing results as a string, joining every chunk."""
+        return "".join(self.iter_chunks(results))
+
+    def write(self, results: Dict[str, Any], stream: IO[str]) -> None:
+        """Write formatted results to a text stream as they are rendered."""
+        write_chunks(self.iter_chunks(results), stream)
+
+    def write_values(self, values: Iterable[Dict[str, Any]], stream: IO[str]) -> None:
+        """Write a stream of results, each of them ending with a newline.
+
+        Each value is written out before the next one is read.
+        """
+        for results in values:
+            write_chunks(self.iter_chunks(results), stream)
 
 
-# registry of formatters
-FORMATTERS: Dict[str, Type[OutputFormatter]] = {}
+def write_chunks(chunks: Iterable[str], stream: IO[str]) -> None:
+    """Write chunks of text, batching small chunks into fewer writes.
+
+    Args:
+        chunks: Pieces of text to write, in order
+        stream: Text stream to write to
+    """
+    buffer: List[str] = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= WRITE_BUFFER_SIZE:
+            stream.write("".join(buffer))
+            buffer.clear()
+            size = 0
+    stream.write("".join(buffer))
+    stream.flush()
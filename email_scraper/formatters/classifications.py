@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+from abc import abstractmethod
+from typing import IO, Any, Dict, Iterable, Iterator
+
+from . import StreamingFormatter, write_chunks
+
+CSV_COLUMNS = ("subject", "category", "confidence", "matched_keywords")
+KEYWORD_SEPARATOR = ";"  # joins matched keywords in a single CSV cell
+
+
+class ClassificationFormatter(StreamingFormatter):
+    """Base class for formatters writing one row per classified email.
+
+    These accept the classifier's results (from the classify or run
+    commands), or the individual classification records streamed by
+    classify -o ndjson, and render the classifications as a table.
+    """
+
+    @abstractmethod
+    def iter_table(
+        self, classifications: Iterable[Dict[str, Any]], header: bool = True
+    ) -> Iterator[str]:
+        """Render classifications as a table, piece by piece.
+
+        Args:
+            classifications: Classification records, one per email
+            header: Whether to start with the header of the table, if it has one
+
+        Yields:
+            Consecutive pieces of the table
+        """
+        pass
+
+    def iter_chunks(self, results: Dict[str, Any]) -> Iterator[str]:
+        """Render the classifications found in processing results."""
+        return self.iter_table(find_classifications(results))
+
+    def write_values(self, values: Iterable[Dict[str, Any]], stream: IO[str]) -> None:
+        """Write the classifications of a stream of results as a single table.
+
+        The rows of each value are written out before the next one is read.
+        """
+        header = True
+        for results in values:
+            write_chunks(self.iter_table(find_classifications(results), header), stream)
+            header = False
+        if header:
+            write_chunks(self.iter_table([]), stream)
+
+
+class CsvClassificationFormatter(ClassificationFormatter):
+    """Formats classifications as CSV, with one row per email."""
+
+    name = "csv"
+    description = "Format classifier results as CSV, one row per email"
+    file_extension = "csv"
+
+    def iter_table(
+        self, classifications: Iterable[Dict[str, Any]], header: bool = True
+    ) -> Iterator[str]:
+        """Render classifications as CSV rows, after a header row.
+
+        Matched keywords are joined with semicolons in a single column.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if header:
+            writer.writerow(CSV_COLUMNS)
+        for classification in classifications:
+            writer.writerow(
+                [
+                    classification.get("subject", ""),
+                    classification["category"],
+                    classification["confidence"],
+                    KEYWORD_SEPARATOR.join(classification["matched_keywords"]),
+                ]
+            )
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+
+class NdjsonClassificationFormatter(ClassificationFormatter):
+    """Formats classifications as NDJSON, with one object per line."""
+
+    name = "ndjson"
+    description = "Format classifier results as NDJSON, one object per email"
+    file_extension = "ndjson"
+
+    def iter_table(
+        self, classifications: Iterable[Dict[str, Any]], header: bool = True
+    ) -> Iterator[str]:
+        """Render each classification as a line of JSON, without a header."""
+        for classification in classifications:
+            yield json.dumps(classification) + "\n"
+
+
+def find_classifications(results: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    """Find the per-email classifications in processing results.
+
+    Args:
+        results: Results of the classifier, results of several processors
+            keyed by processor name, or a single classification record
+
+    Returns:
+        Classification records, one per email
+
+    Raises:
+        ValueError: If the results contain no classifications
+    """
+    if "category" in results:
+        return [results]
+    if "classifications" in results:
+        classifications: Iterable[Dict[str, Any]] = results["classifications"]
+        return classifications
+    for value in results.values():
+        if isinstance(value, dict) and "classifications" in value:
+            return find_classifications(value)
+    raise ValueError("No classifier results to format (run the classifier first)")
@@ -1,23 +1,25 @@
 import json
-from typing import Any, Dict
+from typing import Any, Dict, Iterator
 
-from . import OutputFormatter
+from . import StreamingFormatter
 
 
-class JsonFormatter(OutputFormatter):
+class JsonFormatter(StreamingFormatter):
     """Formats results as JSON."""
 
     name = "json"
     description = "Format results as JSON"
     file_extension = "json"
 
-    def format(self, results: Dict[str, Any]) -> str:
-        """Format results as a JSON string.
+    def iter_chunks(self, results: Dict[str, Any]) -> Iterator[str]:
+        """Encode results as indented JSON, piece by piece.
 
         Args:
             results: Dictionary of results to format
 
-        Returns:
-            JSON-formatted string
+        Yields:
+            Consecutive pieces of the JSON document
         """
-        return json.dumps(results, indent=2)
+        # json.dumps with indent encodes in Python anyway, so this costs nothing
+        yield from json.JSONEncoder(indent=2).iterencode(results)
+        yield "\n"
@@ -0,0 +1,275 @@
+"""Lazily loaded registries of processors, formatters and readers.
+
+Registries only hold the name, import path and description of each
+component up front. The module implementing a component is imported the
+first time its class is looked up, so commands only pay for the
+components they use. Components of other packages are discovered through
+entry points, in the group of each registry, for example in pyproject.toml:
+
+    [project.entry-points."email_scraper.processors"]
+    domains = "my_package.domains:DomainCounter"
+"""
+
+import importlib
+import importlib.util
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Generic,
+    Iterator,
+    MutableMapping,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+if TYPE_CHECKING:
+    from .formatters import OutputFormatter
+    from .processors import EmailProcessor
+    from .readers import MailboxReader
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class PluginSpec:
+    """Where to find a component, without importing it.
+
+    Attributes:
+        target: Import path of the class, as "module:qualified.name"
+        description: Description of the component, or None to read it from
+            the class once it is loaded
+        requires: Modules the component depends on, which may not be
+            installed (such as optional dependencies)
+    """
+
+    target: str
+    description: Optional[str] = None
+    requires: Tuple[str, ...] = ()
+
+    def is_available(self) -> bool:
+        """Whether the modules the component requires are installed."""
+        return all(importlib.util.find_spec(name) for name in self.requires)
+
+    def load(self) -> Any:
+        """Import the module of the component and get its class.
+
+        Raises:
+            ImportError: If the module or one of its dependencies is missing
+            AttributeError: If the module has no such class
+        """
+        module_name, _, qualname = self.target.partition(":")
+        value: Any = importlib.import_module(module_name)
+        for attr in qualname.split("."):
+            value = getattr(value, attr)
+        return value
+
+
+class Registry(MutableMapping[str, T], Generic[T]):
+    """Maps names to component classes, importing each class on first use.
+
+    Components are added lazily with add, or registered as classes by
+    assignment like a dictionary. Entry points of the registry's group are
+    only scanned when a name isn't known otherwise, or when listing every
+    name, since reading package metadata is slow. Components whose
+    requirements aren't installed are left out.
+    """
+
+    def __init__(self, group: str):
+        """Initialize an empty registry.
+
+        Args:
+            group: Entry point group in which other packages declare components
+        """
+        self.group = group
+        self._specs: Dict[str, PluginSpec] = {}
+        self._loaded: Dict[str, T] = {}
+        self._discovered = False
+
+    def add(self, name: str, spec: PluginSpec) -> None:
+        """Add a component without importing it.
+
+        Args:
+            name: Name of the component
+            spec: Where to find the component
+        """
+        self._loaded.pop(name, None)
+        self._specs[name] = spec
+
+    def describe(self, name: str) -> str:
+        """Get the description of a component, importing it only if needed.
+
+        Raises:
+            KeyError: If there is no such component
+        """
+        spec = self._spec(name)
+        if spec.description is not None:
+            return spec.description
+        return str(getattr(self[name], "description", ""))
+
+    def discover(self) -> None:
+        """Add the components declared as entry points by installed packages.
+
+        Components added or registered explicitly take precedence.
+        """
+        if self._discovered:
+            return
+        self._discovered = True
+
+        from importlib.metadata import entry_points  # noqa: PLC0415 slow import
+
+        for entry_point in entry_points(group=self.group):
+            self._specs.setdefault(entry_point.name, PluginSpec(entry_point.value))
+
+    def _spec(self, name: str) -> PluginSpec:
+        if name not in self._specs:
+            self.discover()
+        spec = self._specs.get(name)
+        if spec is None or not spec.is_available():
+            raise KeyError(name)
+        return spec
+
+    def __getitem__(self, name: str) -> T:
+        """Get the class of a component, importing its module the first time."""
+        if name not in self._loaded:
+            self._loaded[name] = self._spec(name).load()
+        return self._loaded[name]
+
+    def __setitem__(self, name: str, cls: T) -> None:
+        """Register an already imported class."""
+        target = f"{getattr(cls, '__module__', '')}:{getattr(cls, '__qualname__', '')}"
+        self._specs[name] = PluginSpec(target, getattr(cls, "description", None))
+        self._loaded[name] = cls
+
+    def __delitem__(self, name: str) -> None:
+        """Remove a component."""
+        del self._specs[name]
+        self._loaded.pop(name, None)
+
+    def __contains__(self, name: object) -> bool:
+        """Whether a component is available, without importing it."""
+        if not isinstance(name, str):
+            return False
+        try:
+            self._spec(name)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the names of the available components, in order of addition."""
+        self.discover()
+        return iter([name for name, spec in self._specs.items() if spec.is_available()])
+
+    def __len__(self) -> int:
+        """Number of available components."""
+        return sum(1 for _ in self)
+
+
+# registry of processors, imported when first used
+PROCESSORS: Registry[Type["EmailProcessor"]] = Registry("email_scraper.processors")
+PROCESSORS.add(
+    "statistics",
+    PluginSpec(
+        "email_scraper.processors.example:ExampleProcessor",
+        "Example processor that generates basic email statistics.",
+    ),
+)
+PROCESSORS.add(
+    "classifier",
+    PluginSpec(
+        "email_scraper.processors.classifier:EmailClassifier",
+        "Classifies emails into categories based on keywords.",
+    ),
+)
+PROCESSORS.add(
+    "activity",
+    PluginSpec(
+        "email_scraper.processors.activity:ActivityProcessor",
+        "Count messages per sender, per day and per hour of the day.",
+        requires=("numpy",),  # optional dependency
+    ),
+)
+PROCESSORS.add(
+    "windows",
+    PluginSpec(
+        "email_scraper.processors.windows:WindowProcessor",
+        "Count messages per time window, per sender and per category.",
+    ),
+)
+
+# registry of formatters, imported when first used
+FORMATTERS: Registry[Type["OutputFormatter"]] = Registry("email_scraper.formatters")
+FORMATTERS.add(
+    "json",
+    PluginSpec("email_scraper.formatters.json:JsonFormatter", "Format results as JSON"),
+)
+FORMATTERS.add(
+    "csv",
+    PluginSpec(
+        "email_scraper.formatters.classifications:CsvClassificationFormatter",
+        "Format classifier results as CSV, one row per email",
+    ),
+)
+FORMATTERS.add(
+    "ndjson",
+    PluginSpec(
+        "email_scraper.formatters.classifications:NdjsonClassificationFormatter",
+        "Format classifier results as NDJSON, one object per email",
+    ),
+)
+
+# registry of readers, imported when first used
+READERS: Registry[Type["MailboxReader"]] = Registry("email_scraper.readers")
+READERS.add(
+    "mbox",
+    PluginSpec(
+        "email_scraper.readers.mbox:MboxReader",
+        "Read an mbox file one message at a time with mailbox.mbox",
+    ),
+)
+READERS.add(
+    "mmap",
+    PluginSpec(
+        "email_scraper.readers.mapped:MmapMboxReader",
+        "Scan a memory-mapped mbox file for message boundaries",
+    ),
+)
+READERS.add(
+    "parallel",
+    PluginSpec(
+        "email_scraper.readers.parallel:ParallelMboxReader",
+        "Parse an mbox file in a process pool, split on From line boundaries",
+    ),
+)
+READERS.add(
+    "indexed",
+    PluginSpec(
+        "email_scraper.readers.index:IndexedMboxReader",
+        "Read messages appended since the last run, using a sidecar index",
+    ),
+)
+READERS.add(
+    "compressed",
+    PluginSpec(
+        "email_scraper.readers.compressed:CompressedMboxReader",
+        "Stream-decompress a .gz, .zst, .bz2 or .xz mbox file",
+    ),
+)
+READERS.add(
+    "maildir",
+    PluginSpec(
+        "email_scraper.readers.maildir:MaildirReader",
+        "Read the message files of a Maildir directory",
+    ),
+)
+READERS.add(
+    "auto",
+    PluginSpec(
+        "email_scraper.readers.sources:AutoReader",
+        "Pick the maildir, compressed or mbox reader from the path",
+    ),
+)
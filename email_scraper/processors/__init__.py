@@ -1,14 +1,57 @@
-import mailbox
+import os
+import time
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from collections import deque
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 from datetime import datetime
-from email.message import Message
-from email.utils import parsedate_to_datetime
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Type
-
-
-@dataclass
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    ClassVar,
+    ContextManager,
+    Deque,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from ..plugins import PROCESSORS as PROCESSORS  # registry of processors
+from .body import DEFAULT_CONTENT_OPTIONS, ContentOptions, extract_body
+from .dates import parse_date
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+    from email.message import Message
+
+    from ..cache import ResultCache
+    from ..readers import MailboxReader
+    from ..timings import Timings
+    from .columnar import EmailBatch
+
+T = TypeVar("T")
+R = TypeVar("R")
+StateT = TypeVar("StateT")
+
+DEFAULT_CHUNK_SIZE = 1000  # emails per chunk when streaming through processors
+DEFAULT_WATCH_INTERVAL = 1.0  # seconds between checks of a watched mailbox
+
+# one or more mailbox files, directories or glob patterns
+Sources = Union[str, Path, Sequence[Union[str, Path]]]
+
+
+@dataclass(slots=True)
 class EmailData:
     """parsed email data."""
 
@@ -17,7 +60,11 @@ class EmailData:
     date: str
     content: str
     headers: Dict[str, str]
-    raw_message: Message | None = None
+    raw_message: Optional["Message"] = None
+    # (date string, parsed value), so the date is parsed at most once
+    _parsed_date: Optional[Tuple[str, Optional[datetime]]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     @property
     def parsed_date(self) -> Optional[datetime]:
@@ -26,50 +73,61 @@ class EmailData:
         Returns:
             datetime object if date can be parsed, None otherwise
         """
-        if not self.date:
-            return None
-        try:
-            return parsedate_to_datetime(self.date)
-        except (TypeError, ValueError):
-            return None
+        cached = self._parsed_date
+        if cached is None or cached[0] is not self.date:
+            cached = (self.date, parse_date(str(self.date)) if self.date else None)
+            self._parsed_date = cached
+        return cached[1]
 
     @classmethod
-    def from_message(cls, message: Message) -> "EmailData":
+    def from_message(
+        cls,
+        message: "Message",
+        keep_raw: bool = True,
+        content_options: ContentOptions = DEFAULT_CONTENT_OPTIONS,
+    ) -> "EmailData":
         """Create EmailData from an email.message.Message.
 
         Args:
             message: Email message to parse
+            keep_raw: Whether to keep a reference to the message as raw_message
+            content_options: How to extract the body of the message
 
         Returns:
             EmailData object containing parsed message data
         """
-        date = message.get("date", "")
-        if isinstance(date, bytes):
-            date = date.decode("utf-8")
-
-        content = message.get_payload()
-        text_content = ""
-
-        if isinstance(content, list):
-            # handle multipart messages by concatenating text parts
-            parts = [
-                part.get_payload() for part in content if isinstance(part, Message)
-            ]
-            text_content = "\n".join(str(part) for part in parts)
-        elif isinstance(content, bytes):
-            text_content = content.decode("utf-8")
-        else:
-            text_content = str(content)
-
         return cls(
             sender=message.get("from", ""),
             subject=message.get("subject", ""),
-            date=date,
-            content=text_content,
+            date=cls.extract_date(message),
+            content=cls.extract_content(message, content_options),
             headers={k: str(v) for k, v in message.items()},
-            raw_message=message,
+            raw_message=message if keep_raw else None,
         )
 
+    @staticmethod
+    def extract_date(message: "Message") -> str:
+        """Get the raw Date header of a message as a string."""
+        date = message.get("date", "")
+        if isinstance(date, bytes):
+            date = date.decode("utf-8")
+        return str(date)
+
+    @staticmethod
+    def extract_content(
+        message: "Message", options: ContentOptions = DEFAULT_CONTENT_OPTIONS
+    ) -> str:
+        """Get the text content of a message.
+
+        Args:
+            message: Email message to extract the content of
+            options: Byte limit and HTML fallback setting (see processors.body)
+
+        Returns:
+            Decoded text parts of the message, without attachments
+        """
+        return extract_body(message, options)
+
 
 class EmailProcessor(ABC):
     """Base class for email processors.
@@ -80,6 +138,7 @@ class EmailProcessor(ABC):
 
     name: str  # must be overridden in subclasses
     description: str  # must be overridden in subclasses
+    version: int = 1  # bump when a change to the processor changes its results
 
     @abstractmethod
     def process(self, emails: List[EmailData]) -> Dict[str, Any]:
@@ -93,6 +152,138 @@ class EmailProcessor(ABC):
         """
         pass
 
+    def config(self) -> Dict[str, Any]:
+        """Settings of the processor that affect its results.
+
+        Cached results are only reused by processors with the same name,
+        version and config.
+
+        Returns:
+            JSON-serializable dictionary of settings
+        """
+        return {}
+
+
+class IncrementalProcessor(EmailProcessor, Generic[StateT]):
+    """Base class for processors that can consume emails incrementally.
+
+    Processing is split into four steps: create an empty state, update it
+    with emails one at a time or in batches, merge partial states computed
+    over consecutive shards of a mailbox, and finalize a state into results.
+    This lets a pipeline stream emails in constant memory and combine results
+    computed by separate workers. process() is implemented in terms of these
+    steps, so subclasses only need to implement them.
+    """
+
+    # whether results hold one record per email, so that results over new
+    # emails alone are worth reporting on their own (see Pipeline.watch)
+    per_email: ClassVar[bool] = False
+
+    @abstractmethod
+    def create_state(self) -> StateT:
+        """Create an empty state.
+
+        Returns:
+            State representing zero processed emails
+        """
+        pass
+
+    @abstractmethod
+    def update(self, state: StateT, email: EmailData) -> StateT:
+        """Add a single email to a state.
+
+        Args:
+            state: State to update, which may be modified in place
+            email: Email to add
+
+        Returns:
+            Updated state
+        """
+        pass
+
+    def update_batch(self, state: StateT, emails: Iterable[EmailData]) -> StateT:
+        """Add a batch of emails to a state.
+
+        Args:
+            state: State to update, which may be modified in place
+            emails: Emails to add, in mailbox order
+
+        Returns:
+            Updated state
+        """
+        for email in emails:
+            state = self.update(state, email)
+        return state
+
+    @abstractmethod
+    def merge(self, state: StateT, other: StateT) -> StateT:
+        """Combine two partial states.
+
+        Args:
+            state: State covering earlier emails, which may be modified in place
+            other: State covering the emails that follow
+
+        Returns:
+            State covering the emails of both
+        """
+        pass
+
+    @abstractmethod
+    def finalize(self, state: StateT) -> Dict[str, Any]:
+        """Turn a state into processing results.
+
+        Args:
+            state: State covering every processed email
+
+        Returns:
+            Dictionary containing processing results
+        """
+        pass
+
+    def process(self, emails: Iterable[EmailData]) -> Dict[str, Any]:
+        """Process emails in a single pass and return results.
+
+        Args:
+            emails: Emails to process
+
+        Returns:
+            Dictionary containing processing results
+        """
+        return self.finalize(self.update_batch(self.create_state(), emails))
+
+
+class ColumnarProcessor(IncrementalProcessor[StateT]):
+    """Base class for incremental processors that work on columns of emails.
+
+    Instead of walking emails one by one, these processors receive each batch
+    as an EmailBatch of NumPy arrays and aggregate it with vectorized
+    operations. A pipeline builds the batch once per chunk and shares it
+    between every columnar processor. Requires the optional numpy dependency.
+    """
+
+    @abstractmethod
+    def update_columns(self, state: StateT, batch: "EmailBatch") -> StateT:
+        """Add a columnar batch of emails to a state.
+
+        Args:
+            state: State to update, which may be modified in place
+            batch: Emails to add, in mailbox order
+
+        Returns:
+            Updated state
+        """
+        pass
+
+    def update(self, state: StateT, email: EmailData) -> StateT:
+        """Add a single email to a state."""
+        return self.update_batch(state, [email])
+
+    def update_batch(self, state: StateT, emails: Iterable[EmailData]) -> StateT:
+        """Add a batch of emails to a state, converted to columns first."""
+        from .columnar import EmailBatch  # noqa: PLC0415 numpy is optional
+
+        return self.update_columns(state, EmailBatch.from_emails(emails))
+
 
 class Pipeline:
     """Email processing pipeline.
@@ -101,39 +292,406 @@ class Pipeline:
     Results from each processor are merged into the final output.
     """
 
-    def __init__(self, processors: List[EmailProcessor]):
-        """Initialize the pipeline with a list of processors."""
+    def __init__(
+        self,
+        processors: List[EmailProcessor],
+        reader: Optional["MailboxReader"] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        cache: Optional["ResultCache"] = None,
+        timings: Optional["Timings"] = None,
+    ):
+        """Initialize the pipeline with a list of processors.
+
+        Args:
+            processors: Processors to run over the loaded emails
+            reader: Reader used to load mailboxes (defaults to a sequential mbox reader)
+            chunk_size: Number of emails fed at a time to incremental processors
+            cache: Cache of results to reuse for unchanged mailboxes, if any
+            timings: Timings recording the read and process stages, if any
+        """
+        # imported here because readers depend on EmailData from this module
+        from ..readers.mbox import MboxReader  # noqa: PLC0415
+
         self.processors = processors
+        self.reader = reader if reader is not None else MboxReader()
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.timings = timings if timings is not None and timings.enabled else None
 
     def process(self, mbox_path: Path) -> Dict[str, Any]:
         """Process an mbox file through all processors.
 
+        If every processor is incremental, emails are streamed through them in
+        chunks and never held in memory all at once. Readers that parse in
+        parallel update partial states in their workers, which are then
+        merged in mailbox order.
+
+        With a cache, processors whose results are cached for the current
+        contents of the mailbox are skipped, and the mailbox is not read at
+        all if every result is cached. Incremental readers (such as the
+        indexed one) bypass the cache, as their results also depend on what
+        they read before.
+
         Args:
             mbox_path: Path to the mbox file to process
 
         Returns:
             Combined results from all processors
         """
-        mbox = mailbox.mbox(str(mbox_path))
-        emails = [EmailData.from_message(msg) for msg in mbox]
-
-        results = {}
+        if self.cache is None or self.reader.incremental:
+            return self._process(mbox_path, self.processors)
+
+        # results also depend on which messages the reader keeps and how it
+        # extracts their bodies
+        fingerprint = (
+            f"{self.cache.fingerprint(mbox_path)}:{self.reader.content_options}"
+            f":{self.reader.header_filter}"
+        )
+        cached = {}
         for processor in self.processors:
-            results[processor.name] = processor.process(emails)
+            hit = self.cache.get(fingerprint, processor)
+            if hit is not None:
+                cached[processor.name] = hit
 
-        return results
+        missing = [p for p in self.processors if p.name not in cached]
+        results = self._process(mbox_path, missing) if missing else {}
+        for processor in missing:
+            self.cache.put(fingerprint, processor, results[processor.name])
+
+        return {
+            p.name: cached[p.name] if p.name in cached else results[p.name]
+            for p in self.processors
+        }
 
-    def load_emails(self, mbox_path: Path) -> List[EmailData]:
-        """Load emails from an mbox file.
+    def load_emails(
+        self, sources: Sources, workers: int = 1, by_date: bool = False
+    ) -> List[EmailData]:
+        """Load emails from one or more mailboxes.
 
         Args:
-            mbox_path: Path to the mbox file to load
+            sources: Mailbox file, directory or glob pattern, or a list of them
+            workers: Number of mailboxes parsed concurrently
+            by_date: Merge the emails of several mailboxes in date order
 
         Returns:
             List of EmailData objects
         """
-        mbox = mailbox.mbox(str(mbox_path))
-        return [EmailData.from_message(msg) for msg in mbox]
+        return list(self.iter_emails(sources, workers, by_date))
+
+    def iter_emails(
+        self, sources: Sources, workers: int = 1, by_date: bool = False
+    ) -> Iterator[EmailData]:
+        """Lazily load emails from one or more mailboxes, one message at a time.
+
+        Directories are searched recursively for mailboxes, and the emails of
+        several mailboxes are streamed as one, either mailbox by mailbox or
+        merged in date order (see readers.sources.read_sources).
+
+        Args:
+            sources: Mailbox file, directory or glob pattern, or a list of them
+            workers: Number of mailboxes parsed concurrently
+            by_date: Merge the emails of several mailboxes in date order
+
+        Yields:
+            EmailData objects in mailbox order, or in date order
+        """
+        if isinstance(sources, Path) and sources.is_file():
+            yield from self.reader.read(sources)
+            return
+
+        from ..readers.sources import (  # noqa: PLC0415
+            expand_sources,
+            read_sources,
+        )
+
+        paths = expand_sources(
+            [sources] if isinstance(sources, (str, Path)) else sources
+        )
+        yield from read_sources(self.reader, paths, workers, by_date)
+
+    def watch(
+        self, mbox_path: Path, interval: float = DEFAULT_WATCH_INTERVAL
+    ) -> Iterator[Dict[str, Any]]:
+        """Follow an mbox file as mail is appended, yielding updated results.
+
+        The file is checked every interval seconds, and only messages
+        appended since the previous check are parsed and fed to the
+        processors, so the cost of an update depends on the new mail, not on
+        the size of the mailbox. The first update covers the messages already
+        in the file. A last message that doesn't end with a newline is left
+        for a later check, as it may still be being written. If the file is
+        truncated or rewritten, processing starts over. With timings, only
+        the reading and processing of new mail is timed, not the waits.
+
+        Args:
+            mbox_path: Path to the mbox file to follow
+            interval: Seconds between checks of the file
+
+        Yields:
+            For each check that found new messages, results keyed by processor
+            name, like process, and an "update" entry with the number of new
+            messages, the total number of messages and whether processing
+            started over. Per-email processors (such as the classifier) only
+            report the new emails; other processors report totals.
+
+        Raises:
+            ValueError: If a processor is not incremental
+        """
+        # imported here because readers depend on EmailData from this module
+        from ..readers.index import IndexedMboxReader, MboxIndex  # noqa: PLC0415
+
+        processors = []
+        for p in self.processors:
+            if not isinstance(p, IncrementalProcessor):
+                raise ValueError(f"Processor {p.name} can't be updated incrementally")
+            processors.append(p)
+
+        reader = self.reader
+        if not isinstance(reader, IndexedMboxReader):
+            reader = IndexedMboxReader(
+                None, reader.compact, reader.content_options, reader.header_filter
+            )
+
+        index = MboxIndex()
+        states = [p.create_state() for p in processors]
+        total = 0
+        checked = None
+        while True:
+            stat = mbox_path.stat()
+            if (stat.st_size, stat.st_mtime_ns) == checked:
+                time.sleep(interval)
+                continue
+            checked = (stat.st_size, stat.st_mtime_ns)
+
+            indexed = index.size
+            emails = reader.read_appended(mbox_path, index, hold_partial=True)
+            new, messages = self._update_shards(processors, emails)
+            if self.timings is not None:
+                read = self.timings.get("read")
+                appended = index.size - (0 if reader.rebuilt else indexed)
+                read.bytes_read = (read.bytes_read or 0) + appended
+            if not messages and not reader.rebuilt:
+                continue
+
+            if reader.rebuilt:
+                states = [p.create_state() for p in processors]
+                total = 0
+            total += messages
+            results: Dict[str, Any] = {}
+            for i, processor in enumerate(processors):
+                with self._timed(processor):
+                    if processor.per_email:
+                        # earlier records were already reported, so aren't kept
+                        results[processor.name] = processor.finalize(new[i])
+                    else:
+                        states[i] = processor.merge(states[i], new[i])
+                        results[processor.name] = processor.finalize(states[i])
+            results["update"] = {
+                "messages": messages,
+                "total_messages": total,
+                "rebuilt": reader.rebuilt,
+            }
+            yield results
+
+    def _update_shards(
+        self, processors: List[IncrementalProcessor[Any]], emails: Iterable[EmailData]
+    ) -> Tuple[List[Any], int]:
+        """Compute each processor's partial state over emails, chunk by chunk.
+
+        Returns:
+            One partial state per processor, and the number of emails
+        """
+        timings = self.timings
+        if timings is not None:
+            emails = timings.iterate("read", emails)
+        states = [p.create_state() for p in processors]
+        messages = 0
+        for chunk in chunked(emails, self.chunk_size):
+            partials, seconds, _, _ = timed_update_shard(processors, chunk)
+            states = [p.merge(s, o) for p, s, o in zip(processors, states, partials)]
+            messages += len(chunk)
+            if timings is not None:
+                process = timings.get("process")
+                process.seconds += sum(seconds)
+                process.messages += len(chunk)
+                for processor, elapsed in zip(processors, seconds):
+                    timings.add_processor_time(processor.name, elapsed)
+        return states, messages
+
+    def _timed(self, processor: EmailProcessor) -> ContextManager[Any]:
+        # time a processor, if timings are enabled
+        if self.timings is None:
+            return nullcontext()
+        return self.timings.processor(processor.name)
+
+    def _process(
+        self, mbox_path: Path, processors: List[EmailProcessor]
+    ) -> Dict[str, Any]:
+        incremental = [p for p in processors if isinstance(p, IncrementalProcessor)]
+        if len(incremental) == len(processors):
+            if self.timings is not None:
+                return self._process_timed(mbox_path, incremental, self.timings)
+            return self._process_incremental(mbox_path, incremental)
+
+        if self.timings is None:
+            emails = self.load_emails(mbox_path)
+            return {p.name: p.process(emails) for p in processors}
+
+        from ..timings import input_size  # noqa: PLC0415
+
+        timings = self.timings
+        timings.get("read").bytes_read = input_size(mbox_path)
+        emails = list(timings.iterate("read", self.iter_emails(mbox_path)))
+
+        results = {}
+        for processor in processors:
+            with timings.processor(processor.name):
+                results[processor.name] = processor.process(emails)
+        timings.get("process").messages = len(emails)
+        return results
+
+    def _process_incremental(
+        self, mbox_path: Path, processors: List[IncrementalProcessor[Any]]
+    ) -> Dict[str, Any]:
+        states = [p.create_state() for p in processors]
+        shard = partial(update_shard, processors)
+        for partials in self.reader.map_chunks(mbox_path, shard, self.chunk_size):
+            states = [p.merge(s, o) for p, s, o in zip(processors, states, partials)]
+
+        return {p.name: p.finalize(s) for p, s in zip(processors, states)}
+
+    def _process_timed(
+        self,
+        mbox_path: Path,
+        processors: List[IncrementalProcessor[Any]],
+        timings: "Timings",
+    ) -> Dict[str, Any]:
+        """Like _process_incremental, but timing the read and process stages.
+
+        Readers may update shards while reading, in this process or in their
+        workers. Time spent on shards in this process is moved from the read
+        stage to the process stage; processor times measured in workers are
+        added to the per-processor times only, since they overlap the read.
+        """
+        from ..timings import input_size  # noqa: PLC0415
+
+        read = timings.get("read")
+        process = timings.get("process")
+        read.bytes_read = input_size(mbox_path)
+
+        states = [p.create_state() for p in processors]
+        shard = partial(timed_update_shard, processors)
+        shards = self.reader.map_chunks(mbox_path, shard, self.chunk_size)
+        for partials, seconds, messages, pid in timings.iterate(
+            "read", shards, size=lambda shard: shard[2]
+        ):
+            process.messages += messages
+            for processor, elapsed in zip(processors, seconds):
+                timings.add_processor_time(processor.name, elapsed)
+            if pid == os.getpid():
+                read.seconds -= sum(seconds)
+                process.seconds += sum(seconds)
+
+            for i, processor in enumerate(processors):
+                with timings.processor(processor.name):
+                    states[i] = processor.merge(states[i], partials[i])
+
+        results = {}
+        for processor, state in zip(processors, states):
+            with timings.processor(processor.name):
+                results[processor.name] = processor.finalize(state)
+        return results
+
+
+def update_shard(
+    processors: List[IncrementalProcessor[Any]], emails: List[EmailData]
+) -> List[Any]:
+    """Compute each processor's partial state over a shard of emails.
 
+    This is a module-level function so it can be sent to worker processes.
 
-PROCESSORS: Dict[str, Type[EmailProcessor]] = {}
+    Args:
+        processors: Incremental processors to run
+        emails: Consecutive emails making up the shard
+
+    Returns:
+        One partial state per processor
+    """
+    return timed_update_shard(processors, emails)[0]
+
+
+def timed_update_shard(
+    processors: List[IncrementalProcessor[Any]], emails: List[EmailData]
+) -> Tuple[List[Any], List[float], int, int]:
+    """Compute each processor's partial state over a shard, timing each processor.
+
+    Args:
+        processors: Incremental processors to run
+        emails: Consecutive emails making up the shard
+
+    Returns:
+        One partial state and the seconds spent per processor, the number of
+        emails in the shard, and the ID of the process the shard was run in
+    """
+    batch = None
+    states = []
+    seconds = []
+    for p in processors:
+        start = time.perf_counter()
+        if not isinstance(p, ColumnarProcessor):
+            states.append(p.update_batch(p.create_state(), emails))
+        else:
+            if batch is None:
+                from .columnar import EmailBatch  # noqa: PLC0415 numpy is optional
+
+                batch = EmailBatch.from_emails(emails)
+            states.append(p.update_columns(p.create_state(), batch))
+        seconds.append(time.perf_counter() - start)
+    return states, seconds, len(emails), os.getpid()
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Split an iterable into lists of at most size items."""
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def map_in_order(
+    func: Callable[[T], R], items: Iterable[T], workers: int = 1
+) -> Iterator[R]:
+    """Apply a function to items in a process pool, yielding results in order.
+
+    Only a bounded window of items is in flight at a time, so a slow consumer
+    doesn't cause every result to pile up in memory, and items are only
+    pulled from the iterable as the window frees up.
+
+    Args:
+        func: Picklable function applied to each item
+        items: Picklable items, such as chunks of emails
+        workers: Number of worker processes (1 applies func in this process)
+
+    Yields:
+        Result of func for each item, in the order of the items
+    """
+    if workers == 1:
+        yield from map(func, items)
+        return
+
+    # slow to import, and only needed with several workers
+    from concurrent.futures import ProcessPoolExecutor  # noqa: PLC0415
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Future[R]] = deque()
+        remaining = iter(items)
+        for item in remaining:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= workers * 2:
+                break
+
+        while pending:
+            result = pending.popleft().result()
+            for item in remaining:
+                pending.append(executor.submit(func, item))
+                break
+            yield result
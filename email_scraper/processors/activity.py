@@ -0,0 +1,99 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from . import ColumnarProcessor
+from .columnar import (
+    SECONDS_PER_DAY,
+    EmailBatch,
+    bucket_counts,
+    hour_of_day_counts,
+)
+
+HOURS_PER_DAY = 24
+
+
+@dataclass
+class ActivityState:
+    """Running message counts of the activity processor."""
+
+    total: int = 0
+    senders: Counter[str] = field(default_factory=Counter)
+    days: Counter[int] = field(default_factory=Counter)
+    hours: npt.NDArray[np.int64] = field(
+        default_factory=lambda: np.zeros(HOURS_PER_DAY, dtype=np.int64)
+    )
+
+
+class ActivityProcessor(ColumnarProcessor[ActivityState]):
+    """Counts messages per sender, per day and per hour of the day."""
+
+    name = "activity"
+    description = "Count messages per sender, per day and per hour of the day."
+
+    def __init__(self, top: Optional[int] = None):
+        """Initialize the processor.
+
+        Args:
+            top: Only report this many of the most active senders (all if None)
+        """
+        self.top = top
+
+    def config(self) -> Dict[str, Any]:
+        """Settings that affect the counts."""
+        return {"top": self.top}
+
+    def create_state(self) -> ActivityState:
+        """Create empty counts."""
+        return ActivityState()
+
+    def update_columns(self, state: ActivityState, batch: EmailBatch) -> ActivityState:
+        """Add a batch of emails to the counts."""
+        state.total += len(batch)
+        state.senders.update(batch.senders.counts())
+        state.senders.pop("", None)
+
+        timestamps = batch.timestamps[batch.dated]
+        state.days.update(bucket_counts(timestamps, SECONDS_PER_DAY))
+        state.hours += hour_of_day_counts(timestamps)
+        return state
+
+    def merge(self, state: ActivityState, other: ActivityState) -> ActivityState:
+        """Combine counts over consecutive shards of emails."""
+        state.total += other.total
+        state.senders.update(other.senders)
+        state.days.update(other.days)
+        state.hours += other.hours
+        return state
+
+    def finalize(self, state: ActivityState) -> Dict[str, Any]:
+        """Generate activity counts.
+
+        Args:
+            state: Counts over every processed email
+
+        Returns:
+            Dictionary containing:
+            - total_messages: Total number of emails
+            - messages_per_sender: Message count of each sender, most active first
+            - messages_per_day: Message count of each UTC day with messages
+            - messages_per_hour: Message count of each UTC hour of the day
+        """
+        days = sorted(state.days.items())
+        return {
+            "total_messages": state.total,
+            "messages_per_sender": dict(state.senders.most_common(self.top)),
+            "messages_per_day": {
+                datetime.fromtimestamp(day * SECONDS_PER_DAY, timezone.utc)
+                .date()
+                .isoformat(): count
+                for day, count in days
+            },
+            "messages_per_hour": {
+                f"{hour:02d}": int(count) for hour, count in enumerate(state.hours)
+            },
+        }
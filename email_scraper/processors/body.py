@@ -0,0 +1,167 @@
+"""MIME-aware extraction of the text body of email messages."""
+
+import codecs
+import copy
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from email.message import Message
+
+DEFAULT_MAX_CONTENT_BYTES = 1 << 20
+# quoted-printable encodes a byte in at most 3 characters, base64 in fewer
+MAX_ENCODED_RATIO = 3
+# superset of us-ascii, and what unlabeled 8-bit text usually is
+DEFAULT_CHARSET = "utf-8"
+
+# tags whose text is not displayed, and tags that start a new line of text
+HTML_HIDDEN_TAGS = frozenset({"script", "style", "head", "title"})
+HTML_BLOCK_TAGS = frozenset(
+    "p br div li tr h1 h2 h3 h4 h5 h6 blockquote pre table ul ol hr".split()
+)
+
+
+@dataclass(frozen=True)
+class ContentOptions:
+    """How the body of a message is extracted.
+
+    Attributes:
+        max_bytes: Maximum number of decoded bytes of body text kept per
+            message, or None for no limit
+        html_fallback: Whether to convert HTML parts to text for messages
+            without a text/plain part
+    """
+
+    max_bytes: Optional[int] = DEFAULT_MAX_CONTENT_BYTES
+    html_fallback: bool = True
+
+
+DEFAULT_CONTENT_OPTIONS = ContentOptions()
+
+
+def extract_body(
+    message: "Message", options: ContentOptions = DEFAULT_CONTENT_OPTIONS
+) -> str:
+    """Get the text body of a message.
+
+    Walks the MIME tree and decodes text/plain parts according to their
+    transfer encoding and charset, or text/html parts converted to text if
+    there are no text/plain parts. Attachments (and any other non-text part)
+    are never decoded. With a byte limit, only as much of each part's encoded
+    payload as needed to fill the limit is decoded.
+
+    Args:
+        message: Message to extract the body of
+        options: Byte limit and HTML fallback setting
+
+    Returns:
+        Decoded text parts, separated by newlines
+    """
+    plain: List[Message] = []
+    html: List[Message] = []
+    for part in _text_parts(message):
+        subtype = part.get_content_subtype()
+        if subtype == "plain":
+            plain.append(part)
+        elif subtype == "html":
+            html.append(part)
+
+    is_html = not plain and options.html_fallback
+    parts = html if is_html else plain
+    texts = []
+    remaining = options.max_bytes
+    for part in parts:
+        if remaining is not None and remaining <= 0:
+            break
+        text, size = decode_text(part, remaining)
+        texts.append(html_to_text(text) if is_html else text)
+        if remaining is not None:
+            remaining -= size
+    return "\n".join(texts)
+
+
+def decode_text(part: "Message", limit: Optional[int] = None) -> Tuple[str, int]:
+    """Decode a text part using its transfer encoding and charset.
+
+    Args:
+        part: Non-multipart message part
+        limit: Maximum number of decoded bytes to keep, or None for no limit
+
+    Returns:
+        Decoded text, and the number of bytes it was decoded from
+    """
+    data = _payload_bytes(part, limit)
+    truncated = limit is not None and len(data) > limit
+    if truncated:
+        data = data[:limit]
+
+    charset = part.get_content_charset() or DEFAULT_CHARSET
+    try:
+        decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder(DEFAULT_CHARSET)(errors="replace")
+    # a truncated part may end in the middle of a character, which is dropped
+    return decoder.decode(data, final=not truncated), len(data)
+
+
+def html_to_text(html: str) -> str:
+    """Convert HTML to plain text, keeping line breaks between blocks."""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    lines = (" ".join(line.split()) for line in "".join(parser.text).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _text_parts(part: "Message") -> Iterator["Message"]:
+    # unlike Message.walk, never descends into attachments such as attached emails
+    from email.message import Message  # noqa: PLC0415 loaded by the parser
+
+    if part.get_content_disposition() == "attachment":
+        return
+    payload = part.get_payload()
+    if isinstance(payload, list):
+        for subpart in payload:
+            if isinstance(subpart, Message):
+                yield from _text_parts(subpart)
+    elif part.get_content_maintype() == "text":
+        yield part
+
+
+def _payload_bytes(part: "Message", limit: Optional[int]) -> bytes:
+    payload = part.get_payload()
+    if not isinstance(payload, str):
+        return b""
+
+    encoded_limit = None if limit is None else MAX_ENCODED_RATIO * limit + 4
+    if encoded_limit is not None and len(payload) > encoded_limit:
+        # decode a prefix large enough to fill the limit, not the whole payload
+        part = copy.copy(part)
+        part.set_payload(payload[:encoded_limit])
+
+    data = part.get_payload(decode=True)
+    return data if isinstance(data, bytes) else b""
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.text: List[str] = []
+        self._hidden = 0
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in HTML_HIDDEN_TAGS:
+            self._hidden += 1
+        elif tag in HTML_BLOCK_TAGS:
+            self.text.append("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in HTML_HIDDEN_TAGS:
+            self._hidden = max(self._hidden - 1, 0)
+        elif tag in HTML_BLOCK_TAGS:
+            self.text.append("\n")
+
+    def handle_data(self, data: str) -> None:
+        if not self._hidden:
+            self.text.append(data)
@@ -1,11 +1,29 @@
-import re
-from collections import defaultdict
-from typing import Any, ClassVar, Dict, List
+from collections import defaultdict, deque
+from functools import partial
+from typing import (
+    Any,
+    ClassVar,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
-from . import EmailData, EmailProcessor
+from ..cache import MemoCache
+from . import (
+    DEFAULT_CHUNK_SIZE,
+    EmailData,
+    IncrementalProcessor,
+    chunked,
+    map_in_order,
+)
+from .keywords import KeywordMatcher
 
 
-class EmailClassifier(EmailProcessor):
+class EmailClassifier(IncrementalProcessor[List[Dict[str, Any]]]):
     name = "classifier"
     description = "Classifies emails into categories based on keywords."
 
@@ -47,6 +65,21 @@ class EmailClassifier(EmailProcessor):
 
     CONFIDENCE_THRESHOLD: ClassVar[float] = 0.05
 
+    per_email: ClassVar[bool] = True
+
+    def __init__(self) -> None:
+        """Initialize the classifier, compiling its keywords into one matcher."""
+        self.matcher = KeywordMatcher(
+            keyword for keywords in self.CATEGORIES.values() for keyword in keywords
+        )
+
+    def config(self) -> Dict[str, Any]:
+        """Keywords and threshold the classifications depend on."""
+        return {
+            "categories": self.CATEGORIES,
+            "confidence_threshold": self.CONFIDENCE_THRESHOLD,
+        }
+
     def classify_email(self, email: EmailData) -> Dict[str, Any]:
         """Classify an email and return category, confidence score, and matched keywords."""
         scores: defaultdict[str, int] = defaultdict(int)
@@ -56,10 +89,10 @@ class EmailClassifier(EmailProcessor):
 
         try:
             content = f"{email.subject} {email.content}"
+            found = self.matcher.find(content)
             for category, keywords in self.CATEGORIES.items():
                 for keyword in keywords:
-                    pattern = rf"{re.escape(keyword)}"
-                    if re.search(pattern, content, re.IGNORECASE):
+                    if keyword in found:
                         scores[category] += 1
                         matched_keywords.append(keyword)
 
@@ -94,20 +127,123 @@ class EmailClassifier(EmailProcessor):
             "matched_keywords": matched_keywords,
         }
 
-    def process(self, emails: List[EmailData]) -> Dict[str, Any]:
-        """Process a list of emails and classify them with
-        confidence scores and matched keywords."""
-        classifications = []
-
-        for email in emails:
-            classification = self.classify_email(email)
-            classifications.append(
-                {
-                    "subject": email.subject,
-                    "category": classification["category"],
-                    "confidence": classification["confidence"],
-                    "matched_keywords": classification["matched_keywords"],
-                }
-            )
-
-        return {"classifications": classifications}
+    def memo_key(self, email: EmailData) -> str:
+        """Key of an email in a MemoCache of classifications.
+
+        Emails with the same key have the same subject and content once
+        normalized, so they always get the same classification.
+        """
+        text = self.matcher.normalize(f"{email.subject} {email.content}")
+        return MemoCache.text_key(text)
+
+    def iter_classifications(
+        self,
+        emails: Iterable[EmailData],
+        workers: int = 1,
+        memo: Optional[MemoCache] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Lazily classify emails, yielding one result record per email.
+
+        With several workers, chunks of emails are classified in a process
+        pool and yielded in order. With a memo, emails whose text was
+        classified before, in this run or a previous one, are not classified
+        again, and only the first email of each new text is sent to workers.
+
+        Args:
+            emails: Emails to classify
+            workers: Number of worker processes
+            memo: Memoized classifications to use and extend, if any
+
+        Yields:
+            Classification records, in the order of the emails
+        """
+        if workers == 1 and memo is None:
+            for email in emails:
+                yield _record(email, self.classify_email(email))
+            return
+
+        # chunks whose new texts are being classified, with the keys of their
+        # emails, known classifications and new keys in order of appearance
+        pending: Deque[Tuple[List[EmailData], List[str], Dict[str, Any], List[str]]] = (
+            deque()
+        )
+
+        def unknown() -> Iterator[List[EmailData]]:
+            for chunk in chunked(emails, DEFAULT_CHUNK_SIZE):
+                if memo is None:
+                    pending.append((chunk, [], {}, []))
+                    yield chunk
+                    continue
+
+                keys = [self.memo_key(email) for email in chunk]
+                known: Dict[str, Any] = {}
+                new: Dict[str, EmailData] = {}
+                for key, email in zip(keys, chunk):
+                    if key in known or key in new:
+                        continue
+                    hit = memo.get(key)
+                    if hit is None:
+                        new[key] = email
+                    else:
+                        known[key] = hit
+                pending.append((chunk, keys, known, list(new)))
+                yield list(new.values())
+
+        classify = partial(_classify_all, self)
+        for classifications in map_in_order(classify, unknown(), workers):
+            chunk, keys, known, new_keys = pending.popleft()
+            if memo is None:
+                for email, classification in zip(chunk, classifications):
+                    yield _record(email, classification)
+                continue
+
+            for key, classification in zip(new_keys, classifications):
+                memo.put(key, classification)
+                known[key] = classification
+            for email, key in zip(chunk, keys):
+                yield _record(email, known[key])
+
+    def create_state(self) -> List[Dict[str, Any]]:
+        """Create an empty list of classifications."""
+        return []
+
+    def update(
+        self, state: List[Dict[str, Any]], email: EmailData
+    ) -> List[Dict[str, Any]]:
+        """Classify an email and append the result."""
+        state.extend(self.iter_classifications([email]))
+        return state
+
+    def update_batch(
+        self, state: List[Dict[str, Any]], emails: Iterable[EmailData]
+    ) -> List[Dict[str, Any]]:
+        """Classify a batch of emails and append the results in order."""
+        state.extend(self.iter_classifications(emails))
+        return state
+
+    def merge(
+        self, state: List[Dict[str, Any]], other: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Concatenate classifications of consecutive shards of emails."""
+        state.extend(other)
+        return state
+
+    def finalize(self, state: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Wrap the classifications of every processed email."""
+        return {"classifications": state}
+
+
+def _classify_all(
+    classifier: EmailClassifier, emails: List[EmailData]
+) -> List[Dict[str, Any]]:
+    # module-level so it can be sent to worker processes
+    return [classifier.classify_email(email) for email in emails]
+
+
+def _record(email: EmailData, classification: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "subject": email.subject,
+        "category": classification["category"],
+        "confidence": classification["confidence"],
+        "matched_keywords": list(classification["matched_keywords"]),
+    }
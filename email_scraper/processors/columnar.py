@@ -0,0 +1,149 @@
+"""Columnar batches of emails for vectorized processing.
+
+Requires the optional numpy dependency (pip install swecc-email-scraper[columnar]).
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List
+
+import numpy as np
+import numpy.typing as npt
+
+from . import EmailData
+
+MISSING_TIMESTAMP = np.iinfo(np.int64).min  # timestamp of emails without a valid date
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86400
+
+
+@dataclass
+class StringColumn:
+    """Dictionary-encoded column of strings.
+
+    Each distinct string is stored once in values, and codes holds the index
+    of every row's string in values.
+    """
+
+    values: List[str]
+    codes: npt.NDArray[np.int64]
+
+    @classmethod
+    def encode(cls, items: Iterable[str]) -> "StringColumn":
+        """Dictionary-encode a sequence of strings.
+
+        Args:
+            items: Strings to encode, one per row
+
+        Returns:
+            StringColumn whose values are in order of first appearance
+        """
+        lookup: Dict[str, int] = {}
+        codes = [lookup.setdefault(item, len(lookup)) for item in items]
+        return cls(list(lookup), np.array(codes, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def counts(self) -> Dict[str, int]:
+        """Count the rows holding each distinct string."""
+        totals = np.bincount(self.codes, minlength=len(self.values))
+        return {value: int(n) for value, n in zip(self.values, totals) if n}
+
+
+@dataclass
+class EmailBatch:
+    """Senders, subjects and dates of a batch of emails, stored as columns.
+
+    Timestamps are seconds since the epoch, with dates that have no timezone
+    taken as UTC and MISSING_TIMESTAMP for emails whose date can't be parsed.
+    Offsets hold the UTC offset each date was written with, in seconds.
+    """
+
+    senders: StringColumn
+    subjects: StringColumn
+    timestamps: npt.NDArray[np.int64]
+    offsets: npt.NDArray[np.int32]
+
+    @classmethod
+    def from_emails(cls, emails: Iterable[EmailData]) -> "EmailBatch":
+        """Pack emails into columns.
+
+        Args:
+            emails: Emails to pack, in mailbox order
+
+        Returns:
+            EmailBatch with one row per email
+        """
+        senders: List[str] = []
+        subjects: List[str] = []
+        timestamps: List[int] = []
+        offsets: List[int] = []
+        for email in emails:
+            senders.append(str(email.sender or ""))
+            subjects.append(str(email.subject or ""))
+            parsed = email.parsed_date
+            if parsed is None:
+                timestamps.append(MISSING_TIMESTAMP)
+                offsets.append(0)
+                continue
+            offset = parsed.utcoffset()
+            if offset is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+                offset = timedelta(0)
+            timestamps.append(int(parsed.timestamp()))
+            offsets.append(int(offset.total_seconds()))
+
+        return cls(
+            senders=StringColumn.encode(senders),
+            subjects=StringColumn.encode(subjects),
+            timestamps=np.array(timestamps, dtype=np.int64),
+            offsets=np.array(offsets, dtype=np.int32),
+        )
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def dated(self) -> npt.NDArray[np.bool_]:
+        """Mask of the rows with a valid date."""
+        mask: npt.NDArray[np.bool_] = self.timestamps != MISSING_TIMESTAMP
+        return mask
+
+    def datetime_at(self, row: int) -> datetime:
+        """Rebuild the date of a row, in the timezone it was written with.
+
+        Raises:
+            ValueError: If the row has no valid date
+        """
+        if self.timestamps[row] == MISSING_TIMESTAMP:
+            raise ValueError(f"row {row} has no date")
+        tz = timezone(timedelta(seconds=int(self.offsets[row])))
+        return datetime.fromtimestamp(int(self.timestamps[row]), tz)
+
+
+def bucket_counts(timestamps: npt.NDArray[np.int64], width: int) -> Dict[int, int]:
+    """Count timestamps per bucket of a fixed width.
+
+    Args:
+        timestamps: Epoch timestamps, without missing values
+        width: Bucket width in seconds
+
+    Returns:
+        Number of timestamps per bucket, keyed by bucket start // width
+    """
+    buckets, totals = np.unique(timestamps // width, return_counts=True)
+    return {int(b): int(n) for b, n in zip(buckets, totals)}
+
+
+def hour_of_day_counts(timestamps: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+    """Count timestamps per UTC hour of the day.
+
+    Args:
+        timestamps: Epoch timestamps, without missing values
+
+    Returns:
+        Array of 24 counts, indexed by hour
+    """
+    hours = (timestamps % SECONDS_PER_DAY) // SECONDS_PER_HOUR
+    return np.bincount(hours, minlength=24).astype(np.int64)
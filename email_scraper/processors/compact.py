@@ -0,0 +1,146 @@
+import sys
+from email.message import Message
+from typing import Any, Dict, Optional
+
+from . import EmailData
+from .body import DEFAULT_CONTENT_OPTIONS, ContentOptions
+
+
+def _intern(value: Any) -> Any:
+    # header values may be str subclasses, which can't be interned
+    return sys.intern(str(value)) if isinstance(value, str) else value
+
+
+class CompactEmailData(EmailData):
+    """Memory-compact EmailData that decodes its body and headers lazily.
+
+    Sender strings and header names are interned, so repeated values are
+    stored once. The message body and the headers dict are only built the
+    first time they are accessed, which means processors that only look at
+    sender, subject and date never pay for them. Unless keep_raw is set, the
+    source message is released once both have been extracted.
+    """
+
+    __slots__ = ("_content", "_content_options", "_headers", "_keep_raw", "_source")
+
+    def __init__(
+        self,
+        sender: str,
+        subject: str,
+        date: str,
+        *,
+        source: Optional[Message] = None,
+        keep_raw: bool = False,
+    ):
+        """Initialize the email.
+
+        Args:
+            sender: Sender of the email
+            subject: Subject of the email
+            date: Raw Date header of the email
+            source: Message the body and headers are extracted from on access
+            keep_raw: Whether to keep source available as raw_message
+        """
+        self.sender = _intern(sender)
+        self.subject = subject
+        self.date = date
+        self._parsed_date = None
+        self._content: Optional[str] = None
+        self._headers: Optional[Dict[str, str]] = None
+        self._source = source
+        self._keep_raw = keep_raw
+        self._content_options = DEFAULT_CONTENT_OPTIONS
+
+    @classmethod
+    def from_message(
+        cls,
+        message: Message,
+        keep_raw: bool = False,
+        content_options: ContentOptions = DEFAULT_CONTENT_OPTIONS,
+    ) -> "CompactEmailData":
+        """Create a lazily decoded email from an email.message.Message.
+
+        Args:
+            message: Email message to parse
+            keep_raw: Whether to keep a reference to the message as raw_message
+            content_options: How to extract the body of the message on access
+
+        Returns:
+            CompactEmailData object backed by the message
+        """
+        email = cls(
+            sender=message.get("from", ""),
+            subject=message.get("subject", ""),
+            date=cls.extract_date(message),
+            source=message,
+            keep_raw=keep_raw,
+        )
+        email._content_options = content_options
+        return email
+
+    @classmethod
+    def from_email(cls, email: EmailData) -> "CompactEmailData":
+        """Create a compact copy of an already decoded email.
+
+        Args:
+            email: Email to copy
+
+        Returns:
+            CompactEmailData object with interned sender and header names
+        """
+        compact = cls(
+            sender=email.sender,
+            subject=email.subject,
+            date=email.date,
+            source=email.raw_message,
+            keep_raw=email.raw_message is not None,
+        )
+        compact._content = email.content
+        compact._headers = {_intern(k): v for k, v in email.headers.items()}
+        return compact
+
+    @property
+    def content(self) -> str:
+        """Message body, decoded on first access."""
+        if self._content is None:
+            if self._source is None:
+                raise AttributeError("content")
+            self._content = self.extract_content(self._source, self._content_options)
+            self._release_source()
+        return self._content
+
+    @content.setter
+    def content(self, value: str) -> None:
+        self._content = value
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Message headers, built on first access."""
+        if self._headers is None:
+            if self._source is None:
+                raise AttributeError("headers")
+            self._headers = {_intern(k): str(v) for k, v in self._source.items()}
+            self._release_source()
+        return self._headers
+
+    @headers.setter
+    def headers(self, value: Dict[str, str]) -> None:
+        self._headers = value
+
+    @property
+    def raw_message(self) -> Optional[Message]:
+        """Source message, if it is being kept."""
+        return self._source if self._keep_raw else None
+
+    @raw_message.setter
+    def raw_message(self, value: Optional[Message]) -> None:
+        self._source = value
+        self._keep_raw = value is not None
+
+    def _release_source(self) -> None:
+        if (
+            not self._keep_raw
+            and self._content is not None
+            and self._headers is not None
+        ):
+            self._source = None
@@ -0,0 +1,75 @@
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+
+DATE_CACHE_SIZE = 4096  # distinct raw Date headers remembered by parse_date
+
+# the common RFC 2822 form: "Mon, 02 Jan 2023 10:00:00 +0000 (UTC)"
+_RFC2822_DATE = re.compile(
+    r"\s*(?:[A-Za-z]{3},\s*)?"
+    r"(\d{1,2})\s+([A-Za-z]{3})\s+([1-9]\d{3})\s+"
+    r"(\d{1,2}):(\d{2})(?::(\d{2}))?\s+"
+    r"([+-])(\d{2})(\d{2})(?:\s.*)?",
+    re.DOTALL,
+)
+_MONTHS = {
+    name: number
+    for number, name in enumerate(
+        "jan feb mar apr may jun jul aug sep oct nov dec".split(), start=1
+    )
+}
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date(value: str) -> Optional[datetime]:
+    """Parse the value of a Date header.
+
+    Common RFC 2822 dates with a numeric timezone are parsed directly, and
+    anything else goes through email.utils.parsedate_to_datetime, with the
+    same results in both cases. Results are cached, since archives tend to
+    repeat the same Date values.
+
+    Args:
+        value: Raw Date header value
+
+    Returns:
+        datetime object if the date can be parsed, None otherwise
+    """
+    if not value:
+        return None
+
+    match = _RFC2822_DATE.fullmatch(value)
+    if match:
+        try:
+            return _from_match(match)
+        except (KeyError, ValueError):
+            pass  # let the standard parser decide
+
+    # slow to import, and rarely needed
+    from email.utils import parsedate_to_datetime  # noqa: PLC0415
+
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _from_match(match: "re.Match[str]") -> Optional[datetime]:
+    day, month, year, hour, minute, second, sign, tz_hours, tz_minutes = match.groups()
+    offset = int(tz_hours) * 3600 + int(tz_minutes) * 60
+
+    # -0000 means the local offset is unknown, which parses as a naive datetime
+    tzinfo = None
+    if sign == "+" or offset:
+        tzinfo = timezone(timedelta(seconds=-offset if sign == "-" else offset))
+
+    return datetime(
+        int(year),
+        _MONTHS[month.lower()],
+        int(day),
+        int(hour),
+        int(minute),
+        int(second or 0),
+        tzinfo=tzinfo,
+    )
@@ -1,21 +1,136 @@
 from collections import Counter
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, Optional
 
-from . import EmailData, EmailProcessor
+from . import EmailData, IncrementalProcessor
+from .sketches import HyperLogLog, SpaceSaving
 
 
-class ExampleProcessor(EmailProcessor):
+@dataclass
+class StatisticsSketch:
+    """Bounded-memory summaries used by the approximate mode."""
+
+    distinct_senders: HyperLogLog
+    senders: SpaceSaving
+    subjects: SpaceSaving
+
+    def merge(self, other: "StatisticsSketch") -> None:
+        """Merge the sketches of another shard into these."""
+        self.distinct_senders.merge(other.distinct_senders)
+        self.senders.merge(other.senders)
+        self.subjects.merge(other.subjects)
+
+
+@dataclass
+class StatisticsState:
+    """Running totals of the example processor.
+
+    In approximate mode the sender and subject counters stay empty and the
+    sketch is updated instead.
+    """
+
+    total: int = 0
+    senders: Counter[str] = field(default_factory=Counter)
+    subjects: Counter[str] = field(default_factory=Counter)
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    sketch: Optional[StatisticsSketch] = None
+
+
+class ExampleProcessor(IncrementalProcessor[StatisticsState]):
     """Example processor that generates basic email statistics."""
 
     name = "example"
     description = "Example processor that generates basic email statistics."
 
-    def process(self, emails: List[EmailData]) -> Dict[str, Any]:
-        """Process emails and generate example statistics.
+    def __init__(
+        self,
+        approximate: bool = False,
+        precision: int = 14,
+        capacity: int = 1000,
+    ):
+        """Initialize the processor.
+
+        Args:
+            approximate: Use fixed-size sketches instead of exact counters, so
+                memory does not grow with the number of distinct senders and
+                subjects
+            precision: HyperLogLog precision used for the distinct sender count
+            capacity: Number of senders and subjects tracked for the top lists
+        """
+        self.approximate = approximate
+        self.precision = precision
+        self.capacity = capacity
+
+    def config(self) -> Dict[str, Any]:
+        """Settings that affect the statistics."""
+        if not self.approximate:
+            return {"approximate": False}
+        return {
+            "approximate": True,
+            "precision": self.precision,
+            "capacity": self.capacity,
+        }
+
+    def create_state(self) -> StatisticsState:
+        """Create empty statistics."""
+        if not self.approximate:
+            return StatisticsState()
+        return StatisticsState(
+            sketch=StatisticsSketch(
+                distinct_senders=HyperLogLog(self.precision),
+                senders=SpaceSaving(self.capacity),
+                subjects=SpaceSaving(self.capacity),
+            )
+        )
+
+    def update(self, state: StatisticsState, email: EmailData) -> StatisticsState:
+        """Add an email to the statistics."""
+        state.total += 1
+        sketch = state.sketch
+        if email.sender:
+            if sketch is None:
+                state.senders[email.sender] += 1
+            else:
+                sender = str(email.sender)
+                sketch.distinct_senders.add(sender)
+                sketch.senders.add(sender)
+
+        if parsed_date := email.parsed_date:
+            # keep the first of equal dates, like min() and max() would
+            if state.start is None or parsed_date < state.start:
+                state.start = parsed_date
+            if state.end is None or parsed_date > state.end:
+                state.end = parsed_date
+
+        if email.subject:
+            if sketch is None:
+                state.subjects[email.subject] += 1
+            else:
+                sketch.subjects.add(str(email.subject))
+        return state
+
+    def merge(self, state: StatisticsState, other: StatisticsState) -> StatisticsState:
+        """Combine statistics over consecutive shards of emails."""
+        state.total += other.total
+        state.senders.update(other.senders)
+        state.subjects.update(other.subjects)
+        if state.sketch is not None and other.sketch is not None:
+            state.sketch.merge(other.sketch)
+        if other.start is not None and (
+            state.start is None or other.start < state.start
+        ):
+            state.start = other.start
+        if other.end is not None and (state.end is None or other.end > state.end):
+            state.end = other.end
+        return state
+
+    def finalize(self, state: StatisticsState) -> Dict[str, Any]:
+        """Generate example statistics.
 
         Args:
-            emails: List of emails to analyze
+            state: Statistics over every processed email
 
         Returns:
             Dictionary containing email statistics including:
@@ -24,33 +139,47 @@ class ExampleProcessor(EmailProcessor):
             - top_senders: Most frequent senders with counts
             - date_range: Start and end dates of the email range
             - top_subjects: Most frequent subject lines with counts
-        """
-        senders: Counter[str] = Counter()
-        dates: list[datetime] = []
-        subjects: Counter[str] = Counter()
-
-        for email in emails:
-            if email.sender:
-                senders[email.sender] += 1
-
-            if parsed_date := email.parsed_date:
-                dates.append(parsed_date)
-
-            if email.subject:
-                subjects[email.subject] += 1
 
+            In approximate mode, counts are estimates and an error_bounds entry
+            gives the relative standard error of unique_senders and the largest
+            possible overcount in top_senders and top_subjects.
+        """
         date_range: dict[str, Any] = {
             "start": None,
             "end": None,
         }
-        if dates:
-            date_range["start"] = min(dates).isoformat()
-            date_range["end"] = max(dates).isoformat()
+        if state.start is not None and state.end is not None:
+            date_range["start"] = state.start.isoformat()
+            date_range["end"] = state.end.isoformat()
+
+        if state.sketch is not None:
+            return self._finalize_sketch(state, state.sketch, date_range)
+
+        return {
+            "total_messages": state.total,
+            "unique_senders": len(state.senders),
+            "top_senders": dict(state.senders.most_common(10)),
+            "date_range": date_range,
+            "top_subjects": dict(state.subjects.most_common(10)),
+        }
 
+    def _finalize_sketch(
+        self,
+        state: StatisticsState,
+        sketch: StatisticsSketch,
+        date_range: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        top_senders = sketch.senders.most_common(10)
+        top_subjects = sketch.subjects.most_common(10)
         return {
-            "total_messages": len(emails),
-            "unique_senders": len(senders),
-            "top_senders": dict(senders.most_common(10)),
+            "total_messages": state.total,
+            "unique_senders": sketch.distinct_senders.count(),
+            "top_senders": dict(top_senders),
             "date_range": date_range,
-            "top_subjects": dict(subjects.most_common(10)),
+            "top_subjects": dict(top_subjects),
+            "error_bounds": {
+                "unique_senders": sketch.distinct_senders.relative_error,
+                "top_senders": sketch.senders.max_error([s for s, _ in top_senders]),
+                "top_subjects": sketch.subjects.max_error([s for s, _ in top_subjects]),
+            },
         }
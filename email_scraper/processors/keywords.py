@@ -0,0 +1,139 @@
+import re
+import string
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Pattern, Set, Tuple
+
+# highest code point that can be case-equivalent to an ASCII letter
+_BMP_END = 0x10000
+
+
+class KeywordMatcher:
+    """Finds which of a set of keywords occur in a text, ignoring case.
+
+    All ASCII keywords are compiled into a single prefix-factored regex (a
+    trie of alternations) wrapped in a lookahead, so one scan over the text
+    reports every keyword, including overlapping ones. Results are the same as
+    calling re.search(re.escape(keyword), text, re.IGNORECASE) per keyword.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        """Build the matcher.
+
+        Args:
+            keywords: Keywords to search for
+        """
+        self.keywords: List[str] = list(dict.fromkeys(keywords))
+
+        # folded keyword -> every original spelling of it
+        self._spellings: Dict[str, List[str]] = {}
+        # non-ASCII keywords have no exact case folding into the scanned text,
+        # so they are matched on their own
+        self._fallback: List[Tuple[str, Pattern[str]]] = []
+        for keyword in self.keywords:
+            if keyword.isascii():
+                self._spellings.setdefault(keyword.lower(), []).append(keyword)
+            else:
+                self._fallback.append((keyword, re.compile(re.escape(keyword), re.I)))
+
+        # a scan only reports the longest keyword starting at each position,
+        # so shorter keywords that are prefixes of it are implied by it
+        self._implied: Dict[str, FrozenSet[str]] = {
+            folded: frozenset(p for p in self._spellings if folded.startswith(p))
+            for folded in self._spellings
+        }
+
+        self._pattern = (
+            re.compile(f"(?=({_trie_pattern(self._spellings)}))")
+            if self._spellings
+            else None
+        )
+
+    def find(self, text: str) -> Set[str]:
+        """Find the keywords occurring in a text.
+
+        Args:
+            text: Text to search
+
+        Returns:
+            Set of keywords (in their original spelling) found in the text
+        """
+        hits: Set[str] = set()
+
+        if self._pattern is not None:
+            folded = _fold(text)
+            for match in self._pattern.finditer(folded):
+                implied = self._implied[match.group(1)]
+                if not implied <= hits:
+                    hits |= implied
+                    if len(hits) == len(self._spellings):
+                        break
+
+        found = {spelling for folded in hits for spelling in self._spellings[folded]}
+        for keyword, pattern in self._fallback:
+            if pattern.search(text):
+                found.add(keyword)
+
+        return found
+
+    def normalize(self, text: str) -> str:
+        """Normalize a text without changing which keywords it contains.
+
+        Texts with the same normal form have the same keywords, which makes
+        the normal form a suitable key for memoizing results of find.
+
+        Args:
+            text: Text to normalize
+
+        Returns:
+            The text folded the way find folds it before scanning, or the
+            text itself if non-ASCII keywords must be matched against it
+        """
+        return text if self._fallback else _fold(text)
+
+
+def _fold(text: str) -> str:
+    return text.lower() if text.isascii() else text.translate(_fold_table())
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Compile words into a regex alternation factored by common prefixes."""
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [
+            re.escape(char) + build(child) for char, child in node.items() if char
+        ]
+        if not branches:
+            return ""
+        alternation = "|".join(branches)
+        if "" in node:
+            # greedy, so the longest keyword at a position is preferred
+            return f"(?:{alternation})?"
+        return branches[0] if len(branches) == 1 else f"(?:{alternation})"
+
+    return build(trie)
+
+
+@lru_cache(maxsize=None)
+def _fold_table() -> Dict[int, int]:
+    """Translation table folding text so ASCII keywords match case-sensitively.
+
+    Besides lowercasing ASCII letters, this maps the few non-ASCII characters
+    that re.IGNORECASE treats as equivalent to an ASCII letter (such as the
+    Kelvin sign or the long s) onto that letter. Every other character is left
+    alone, which keeps the folded text aligned with the original.
+    """
+    table = {ord(upper): ord(upper.lower()) for upper in string.ascii_uppercase}
+    candidates = "".join(map(chr, range(0x80, _BMP_END)))
+    for match in re.finditer("[a-z]", candidates, re.I):
+        char = match.group()
+        for letter in string.ascii_lowercase:
+            if re.fullmatch(letter, char, re.I):
+                table[ord(char)] = ord(letter)
+                break
+    return table
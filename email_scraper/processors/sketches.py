@@ -0,0 +1,164 @@
+"""Mergeable probabilistic summaries with bounded memory.
+
+Both sketches hash or count items deterministically, so partial sketches
+built in different processes can be merged.
+"""
+
+import hashlib
+import heapq
+import math
+from typing import Dict, List, Tuple
+
+_HASH_BITS = 64
+MIN_PRECISION = 4
+MAX_PRECISION = 18
+
+
+def _hash(item: str) -> int:
+    digest = hashlib.blake2b(
+        item.encode("utf-8", "surrogatepass"), digest_size=_HASH_BITS // 8
+    ).digest()
+    return int.from_bytes(digest, "big")
+
+
+class HyperLogLog:
+    """Estimates the number of distinct items using 2**precision registers."""
+
+    def __init__(self, precision: int = 14):
+        """Initialize an empty sketch.
+
+        Args:
+            precision: Number of index bits; memory is 2**precision bytes
+
+        Raises:
+            ValueError: If precision is outside MIN_PRECISION..MAX_PRECISION
+        """
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(
+                f"precision must be between {MIN_PRECISION} and {MAX_PRECISION}"
+            )
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @property
+    def relative_error(self) -> float:
+        """Standard error of the estimate, relative to the true count."""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, item: str) -> None:
+        """Add an item to the sketch."""
+        value = _hash(item)
+        index = value >> (_HASH_BITS - self.precision)
+        remaining = value & ((1 << (_HASH_BITS - self.precision)) - 1)
+        rank = _HASH_BITS - self.precision - remaining.bit_length() + 1
+        self.registers[index] = max(self.registers[index], rank)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """Merge another sketch of the same precision into this one.
+
+        Raises:
+            ValueError: If the precisions differ
+        """
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        """Estimate the number of distinct items added."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0**-r for r in self.registers)
+
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+class SpaceSaving:
+    """Tracks the most frequent items using at most capacity counters.
+
+    Each reported count is an overestimate of the true count by at most the
+    item's error, and any item occurring more than total / capacity times is
+    guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        """Initialize an empty summary.
+
+        Args:
+            capacity: Maximum number of tracked items
+        """
+        self.capacity = capacity
+        self.total = 0
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        # min-heap with one (possibly stale) entry per tracked item
+        self._heap: List[Tuple[int, str]] = []
+
+    def add(self, item: str, count: int = 1) -> None:
+        """Count occurrences of an item."""
+        self.total += count
+        if item in self.counts:
+            self.counts[item] += count
+            return
+
+        error = 0
+        if len(self.counts) >= self.capacity:
+            error = self._evict_min()
+        self.counts[item] = error + count
+        self.errors[item] = error
+        heapq.heappush(self._heap, (error + count, item))
+
+    def _evict_min(self) -> int:
+        """Drop the least frequent item and return its count."""
+        while True:
+            count, item = heapq.heappop(self._heap)
+            current = self.counts[item]
+            if current == count:
+                del self.counts[item]
+                del self.errors[item]
+                return count
+            # the item was incremented since it was pushed
+            heapq.heappush(self._heap, (current, item))
+
+    def min_count(self) -> int:
+        """Smallest tracked count if the summary is full, 0 otherwise."""
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def merge(self, other: "SpaceSaving") -> None:
+        """Merge a summary of other items into this one.
+
+        Items missing from one summary may have occurred up to its minimum
+        count times, so that count is added to their estimate and error.
+        """
+        own_min, other_min = self.min_count(), other.min_count()
+        counts: Dict[str, int] = {}
+        errors: Dict[str, int] = {}
+        # iterate in a deterministic order so ties are broken the same way
+        new_items = [item for item in other.counts if item not in self.counts]
+        for item in [*self.counts, *new_items]:
+            counts[item] = self.counts.get(item, own_min) + other.counts.get(
+                item, other_min
+            )
+            errors[item] = self.errors.get(item, own_min) + other.errors.get(
+                item, other_min
+            )
+
+        kept = heapq.nlargest(self.capacity, counts, key=counts.__getitem__)
+        self.total += other.total
+        self.counts = {item: counts[item] for item in kept}
+        self.errors = {item: errors[item] for item in kept}
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def most_common(self, n: int) -> List[Tuple[str, int]]:
+        """Get the n items with the highest estimated counts."""
+        return heapq.nlargest(n, self.counts.items(), key=lambda entry: entry[1])
+
+    def max_error(self, items: List[str]) -> int:
+        """Largest possible overestimate among the given tracked items."""
+        return max((self.errors[item] for item in items), default=0)
@@ -0,0 +1,289 @@
+import heapq
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from . import EmailData, IncrementalProcessor
+from .classifier import EmailClassifier
+from .sketches import SpaceSaving
+
+DEFAULT_WINDOW = timedelta(days=1)
+DEFAULT_ROLLING = 7  # windows per rolling window, so a week of daily windows
+DEFAULT_RETENTION = 366  # most recent windows with messages kept
+DEFAULT_SENDER_CAPACITY = 100  # senders tracked per window
+TOP_SENDERS = 10  # senders reported per window
+
+# a Monday, so that weekly windows start on Mondays (at midnight UTC)
+WINDOW_ORIGIN = datetime(1970, 1, 5, tzinfo=timezone.utc)
+
+_DURATION = re.compile(r"\s*(\d+)\s*([smhdw])\s*", re.IGNORECASE)
+_DURATION_UNITS = {
+    "s": "seconds",
+    "m": "minutes",
+    "h": "hours",
+    "d": "days",
+    "w": "weeks",
+}
+
+
+def parse_duration(text: str) -> timedelta:
+    """Parse a duration such as "90m", "12h", "1d" or "2w".
+
+    Raises:
+        ValueError: If the text is not a positive number followed by a unit
+    """
+    match = _DURATION.fullmatch(text)
+    if match is None or int(match[1]) == 0:
+        raise ValueError(
+            f"Invalid duration {text!r}: expected a positive number followed by "
+            "s, m, h, d or w, such as 1d"
+        )
+    return timedelta(**{_DURATION_UNITS[match[2].lower()]: int(match[1])})
+
+
+@dataclass
+class Window:
+    """Counts of the messages sent during one window."""
+
+    messages: int
+    senders: SpaceSaving
+    categories: Counter[str] = field(default_factory=Counter)
+
+    def merge(self, other: "Window") -> None:
+        """Add the counts of another shard over the same window."""
+        self.messages += other.messages
+        self.senders.merge(other.senders)
+        self.categories.update(other.categories)
+
+
+@dataclass
+class WindowState:
+    """Per-window counts of the window processor.
+
+    Windows are keyed by their number of window sizes since WINDOW_ORIGIN,
+    and only the retained most recent windows are kept.
+    """
+
+    windows: Dict[int, Window] = field(default_factory=dict)
+    horizon: Optional[int] = None  # key of the oldest window that may be kept
+    total: int = 0
+    undated: int = 0
+    expired: int = 0  # messages of windows older than the retained ones
+
+
+class WindowProcessor(IncrementalProcessor[WindowState]):
+    """Counts messages per time window, per sender and per category.
+
+    Messages are counted in tumbling windows of a fixed size, aligned to
+    midnight UTC on a Monday, and the counts of consecutive windows are
+    summed into rolling windows. State holds counts per window rather than
+    dates, and only the retention most recent windows with messages are kept,
+    so memory stays bounded however long the archive. Retention counts
+    windows rather than time since the latest date, so a message with a date
+    far in the future takes up a single window instead of expiring every
+    other one. Dates may arrive in any order: a message counts toward its
+    window as long as that window is still retained. Messages of older
+    windows are only counted as expired.
+
+    Sender counts use a SpaceSaving summary per window. They are exact unless
+    a window has more distinct senders than capacity, in which case they may
+    be overestimated.
+    """
+
+    name = "windows"
+    version = 2
+    description = "Count messages per time window, per sender and per category."
+
+    def __init__(
+        self,
+        window: timedelta = DEFAULT_WINDOW,
+        rolling: Optional[int] = DEFAULT_ROLLING,
+        retention: Optional[int] = DEFAULT_RETENTION,
+        capacity: int = DEFAULT_SENDER_CAPACITY,
+        categories: bool = True,
+    ):
+        """Initialize the processor.
+
+        Args:
+            window: Size of the tumbling windows
+            rolling: Number of consecutive windows summed into each rolling
+                window, or None for no rolling windows
+            retention: Number of most recent windows with messages kept, or
+                None to keep every window
+            capacity: Number of senders tracked per window
+            categories: Whether to classify emails (see EmailClassifier) and
+                count them per category
+
+        Raises:
+            ValueError: If the window is shorter than a second, or rolling or
+                retention is not positive
+        """
+        if window < timedelta(seconds=1):
+            raise ValueError("Windows must last at least a second")
+        if rolling is not None and rolling < 1:
+            raise ValueError("Rolling windows must span at least one window")
+        if retention is not None and retention < 1:
+            raise ValueError("At least one window must be retained")
+        self.window = window
+        self.rolling = rolling
+        self.retention = retention
+        self.capacity = capacity
+        self.classifier = EmailClassifier() if categories else None
+
+    def config(self) -> Dict[str, Any]:
+        """Settings that affect the counts."""
+        return {
+            "window_seconds": self.window.total_seconds(),
+            "rolling": self.rolling,
+            "retention": self.retention,
+            "capacity": self.capacity,
+            "classifier": self.classifier and self.classifier.config(),
+        }
+
+    def create_state(self) -> WindowState:
+        """Create empty counts."""
+        return WindowState()
+
+    def update(self, state: WindowState, email: EmailData) -> WindowState:
+        """Count an email in the window of its date."""
+        state.total += 1
+        date = email.parsed_date
+        if date is None:
+            state.undated += 1
+            return state
+
+        key = self._key(date)
+        if state.horizon is not None and key < state.horizon:
+            state.expired += 1
+            return state
+
+        window = state.windows.get(key)
+        if window is None:
+            window = state.windows[key] = Window(0, SpaceSaving(self.capacity))
+        window.messages += 1
+        if email.sender:
+            window.senders.add(str(email.sender))
+        if self.classifier is not None:
+            window.categories[self.classifier.classify_email(email)["category"]] += 1
+
+        if window.messages == 1:
+            self._expire(state)
+        return state
+
+    def merge(self, state: WindowState, other: WindowState) -> WindowState:
+        """Combine counts over shards of emails, in any order."""
+        for key, window in other.windows.items():
+            if key in state.windows:
+                state.windows[key].merge(window)
+            else:
+                state.windows[key] = window
+        state.total += other.total
+        state.undated += other.undated
+        state.expired += other.expired
+        # a shard only expires windows once it retains as many newer ones
+        if other.horizon is not None and (
+            state.horizon is None or other.horizon > state.horizon
+        ):
+            state.horizon = other.horizon
+        if state.horizon is not None:
+            for key in [key for key in state.windows if key < state.horizon]:
+                state.expired += state.windows.pop(key).messages
+        self._expire(state)
+        return state
+
+    def finalize(self, state: WindowState) -> Dict[str, Any]:
+        """Generate per-window counts.
+
+        Args:
+            state: Counts over every processed email
+
+        Returns:
+            Dictionary containing:
+            - window_seconds: Size of each window
+            - total_messages: Total number of emails
+            - undated_messages: Number of emails without a valid date
+            - expired_messages: Number of emails of windows older than the
+              retained ones
+            - windows: Counts of each retained window with messages, oldest
+              first, with its start and end, its number of messages, its top
+              senders and (unless disabled) its message count per category
+            - rolling: Counts of each rolling window made of rolling
+              consecutive windows, in the same form, for every rolling window
+              with messages that only covers retained windows
+        """
+        results: Dict[str, Any] = {
+            "window_seconds": self.window.total_seconds(),
+            "total_messages": state.total,
+            "undated_messages": state.undated,
+            "expired_messages": state.expired,
+            "windows": [
+                self._describe(key, 1, [window])
+                for key, window in sorted(state.windows.items())
+            ],
+        }
+        if self.rolling is not None:
+            results["rolling"] = self._rolling(state, self.rolling)
+        return results
+
+    def _key(self, date: datetime) -> int:
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        return (date - WINDOW_ORIGIN) // self.window
+
+    def _expire(self, state: WindowState) -> None:
+        # keep the retention most recent windows, moving the horizon past the
+        # others so that their late messages are counted as expired
+        if self.retention is None or len(state.windows) <= self.retention:
+            return
+        excess = len(state.windows) - self.retention
+        for key in heapq.nsmallest(excess, state.windows):
+            state.expired += state.windows.pop(key).messages
+            state.horizon = key + 1
+
+    def _rolling(self, state: WindowState, length: int) -> List[Dict[str, Any]]:
+        if not state.windows:
+            return []
+        # rolling windows reaching before the horizon would miss expired counts
+        horizon = state.horizon
+        first = min(state.windows) if horizon is None else horizon + length - 1
+        latest = max(state.windows)
+        ends = sorted(
+            {
+                end
+                for key in state.windows
+                for end in range(max(key, first), key + length)
+                if end <= latest
+            }
+        )
+        return [
+            self._describe(
+                end - length + 1,
+                length,
+                [
+                    state.windows[k]
+                    for k in range(end - length + 1, end + 1)
+                    if k in state.windows
+                ],
+            )
+            for end in ends
+        ]
+
+    def _describe(self, key: int, length: int, windows: List[Window]) -> Dict[str, Any]:
+        start = WINDOW_ORIGIN + key * self.window
+        senders: Counter[str] = Counter()
+        categories: Counter[str] = Counter()
+        for window in windows:
+            senders.update(window.senders.counts)
+            categories.update(window.categories)
+
+        described: Dict[str, Any] = {
+            "start": start.isoformat(),
+            "end": (start + length * self.window).isoformat(),
+            "messages": sum(window.messages for window in windows),
+            "top_senders": dict(senders.most_common(TOP_SENDERS)),
+        }
+        if self.classifier is not None:
+            described["categories"] = dict(sorted(categories.items()))
+        return described
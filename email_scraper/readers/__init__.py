@@ -0,0 +1,192 @@
+from abc import ABC, abstractmethod
+from email.message import Message
+from email.parser import BytesParser
+from email.policy import compat32
+from functools import partial
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    ClassVar,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+
+from ..plugins import READERS as READERS  # registry of readers
+from ..processors import EmailData, chunked
+from ..processors.body import DEFAULT_CONTENT_OPTIONS, ContentOptions
+from ..processors.compact import CompactEmailData
+
+if TYPE_CHECKING:
+    from .filters import HeaderFilter
+
+T = TypeVar("T")
+
+
+class MailboxReader(ABC):
+    """Base class for mailbox readers.
+
+    Readers are responsible for locating the messages stored in a mailbox
+    and parsing them into EmailData objects, in mailbox order.
+    """
+
+    name: str  # override in subclasses
+    description: str  # description of how the reader loads messages
+
+    # whether read() only yields messages it didn't yield before, so that its
+    # results depend on more than the contents of the mailbox
+    incremental: ClassVar[bool] = False
+
+    def __init__(
+        self,
+        compact: bool = False,
+        content_options: ContentOptions = DEFAULT_CONTENT_OPTIONS,
+        header_filter: Optional["HeaderFilter"] = None,
+    ):
+        """Initialize the reader.
+
+        Args:
+            compact: Whether to produce lazily decoded CompactEmailData objects
+            content_options: How to extract the body of each message
+            header_filter: Filter selecting messages by their headers, if any
+        """
+        self.compact = compact
+        self.content_options = content_options
+        self.header_filter = header_filter
+
+    def make_email(self, message: Message) -> EmailData:
+        """Build the EmailData object for a parsed message.
+
+        Args:
+            message: Parsed email message
+
+        Returns:
+            CompactEmailData if the reader is compact, EmailData otherwise
+        """
+        if self.compact:
+            return CompactEmailData.from_message(
+                message, content_options=self.content_options
+            )
+        return EmailData.from_message(message, content_options=self.content_options)
+
+    def parse(self, data: bytes) -> Optional[EmailData]:
+        """Parse the raw bytes of a message, unless the header filter rejects it.
+
+        Args:
+            data: Raw message bytes, without the mbox From line
+
+        Returns:
+            Email built by make_email, or None if the message is filtered out
+        """
+        if self.header_filter is not None and not self.header_filter.accepts(data):
+            return None
+        return self.make_email(parse_message(data))
+
+    def message_parser(self) -> Callable[[List[bytes]], List[EmailData]]:
+        """Get a picklable function parsing raw messages like this reader would.
+
+        Used by readers that parse messages in worker processes. Emails are
+        built without their raw_message, which is not worth pickling.
+        """
+        return partial(
+            parse_messages,
+            content_options=self.content_options,
+            header_filter=self.header_filter,
+        )
+
+    @abstractmethod
+    def read(self, path: Path) -> Iterator[EmailData]:
+        """Lazily read the emails stored at a path.
+
+        Args:
+            path: Path of the mailbox to read
+
+        Yields:
+            EmailData objects in mailbox order
+        """
+        pass
+
+    def map_chunks(
+        self, path: Path, func: Callable[[List[EmailData]], T], chunk_size: int
+    ) -> Iterator[T]:
+        """Apply a function to consecutive chunks of the emails at a path.
+
+        Readers that parse parts of a mailbox in parallel override this to run
+        func in their workers. func must then be picklable.
+
+        Args:
+            path: Path of the mailbox to read
+            func: Function applied to each chunk
+            chunk_size: Maximum number of emails per chunk
+
+        Yields:
+            Result of func for each chunk, in mailbox order
+        """
+        for chunk in chunked(self.read(path), chunk_size):
+            yield func(chunk)
+
+    def split(self, path: Path) -> List[Callable[[], List[EmailData]]]:
+        """Split reading a mailbox into tasks that can run in worker processes.
+
+        Used to read several mailboxes in a process pool a bounded part at a
+        time, rather than sending each one back whole. Readers that can
+        locate messages without reading from the start override this; the
+        default is a single task reading the whole mailbox, as for
+        compressed mailboxes, which can only be decompressed in order.
+
+        Args:
+            path: Path of the mailbox to read
+
+        Returns:
+            Picklable tasks, each returning the emails of a consecutive part of
+            the mailbox in mailbox order, without their raw_message
+        """
+        return [partial(_read_all, self, path)]
+
+
+def parse_message(data: bytes) -> Message:
+    """Parse the raw bytes of a single message (without its mbox From line).
+
+    Args:
+        data: Raw message bytes
+
+    Returns:
+        Parsed email message
+    """
+    return BytesParser(policy=compat32).parsebytes(data)
+
+
+def parse_messages(
+    chunks: List[bytes],
+    content_options: ContentOptions = DEFAULT_CONTENT_OPTIONS,
+    header_filter: Optional["HeaderFilter"] = None,
+) -> List[EmailData]:
+    """Parse raw messages into EmailData objects, dropping raw_message.
+
+    Args:
+        chunks: Raw bytes of each message
+        content_options: How to extract the body of each message
+        header_filter: Filter selecting messages by their headers, if any
+
+    Returns:
+        Emails of the messages that pass the filter, in order
+    """
+    return [
+        EmailData.from_message(parse_message(chunk), False, content_options)
+        for chunk in chunks
+        if header_filter is None or header_filter.accepts(chunk)
+    ]
+
+
+def run_task(task: Callable[[], T]) -> T:
+    """Run a task of MailboxReader.split (picklable, unlike a lambda)."""
+    return task()
+
+
+def _read_all(reader: MailboxReader, path: Path) -> List[EmailData]:
+    emails = list(reader.read(path))
+    for email in emails:
+        email.raw_message = None  # not worth pickling back to the parent
+    return emails
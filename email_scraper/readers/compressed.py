@@ -0,0 +1,109 @@
+import bz2
+import gzip
+import lzma
+from io import BufferedIOBase
+from pathlib import Path
+from typing import Iterator
+
+from ..processors import EmailData
+from . import MailboxReader
+from .mbox import SEPARATOR, split_messages
+
+STREAM_BLOCK_SIZE = 1 << 20  # decompressed bytes scanned at a time
+COMPRESSED_SUFFIXES = (".gz", ".zst", ".bz2", ".xz")
+
+
+class CompressedMboxReader(MailboxReader):
+    """Reads a compressed mbox file without decompressing it to disk.
+
+    The file is decompressed as a stream and split into messages on the fly,
+    so only the message being parsed is held in memory. gzip, bzip2 and xz
+    are supported out of the box, and zstandard with the zstandard package.
+    Files without a compression suffix are read as plain mbox files.
+    """
+
+    name = "compressed"
+    description = "Stream-decompress a .gz, .zst, .bz2 or .xz mbox file"
+
+    def read(self, path: Path) -> Iterator[EmailData]:
+        """Lazily read the emails stored in a compressed mbox file.
+
+        Args:
+            path: Path of the mbox file to read
+
+        Yields:
+            EmailData objects in mailbox order
+        """
+        with open_decompressed(path) as stream:
+            for data in iter_stream_messages(stream):
+                email = self.parse(data)
+                if email is not None:
+                    yield email
+
+
+def is_compressed(path: Path) -> bool:
+    """Whether a path names a compressed file, judging by its suffix."""
+    return path.suffix in COMPRESSED_SUFFIXES
+
+
+def open_decompressed(path: Path) -> BufferedIOBase:
+    """Open a possibly compressed file for streaming reads of its contents.
+
+    Args:
+        path: Path of the file, compressed according to its suffix
+
+    Returns:
+        Binary stream of the decompressed contents
+
+    Raises:
+        ImportError: If the file is zstandard compressed and the zstandard
+            package is not installed
+    """
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    if path.suffix == ".bz2":
+        return bz2.open(path, "rb")
+    if path.suffix == ".xz":
+        return lzma.open(path, "rb")
+    if path.suffix == ".zst":
+        try:
+            import zstandard  # noqa: PLC0415
+        except ImportError as e:
+            raise ImportError(
+                "Reading .zst files requires the zstandard package "
+                "(pip install swecc-email-scraper[zstd])"
+            ) from e
+        stream: BufferedIOBase = zstandard.open(path, "rb")
+        return stream
+    return open(path, "rb")
+
+
+def iter_stream_messages(
+    stream: BufferedIOBase, block_size: int = STREAM_BLOCK_SIZE
+) -> Iterator[bytes]:
+    """Split a stream of mbox data into raw messages as it is read.
+
+    Gives the same messages as split_messages over the whole data, but only
+    buffers the messages of the current block.
+
+    Args:
+        stream: Binary stream of mbox data
+        block_size: Number of bytes read from the stream at a time
+
+    Yields:
+        Raw bytes of each message, without its From line
+    """
+    buffer = bytearray()
+    while block := stream.read(block_size):
+        # only the new bytes (and a separator straddling them) need scanning
+        scan_from = max(len(buffer) - len(SEPARATOR) + 1, 0)
+        buffer += block
+        cut = buffer.rfind(SEPARATOR, scan_from)
+        if cut == -1:
+            continue
+
+        # every message before the last From line is complete
+        yield from split_messages(bytes(buffer[: cut + 1]))
+        del buffer[: cut + 1]
+
+    yield from split_messages(bytes(buffer))
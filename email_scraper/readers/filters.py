@@ -0,0 +1,161 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.header import decode_header, make_header
+from email.message import Message
+from email.parser import BytesParser
+from email.policy import compat32
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
+
+from ..processors.dates import parse_date
+from .mbox import BytesLike
+
+if TYPE_CHECKING:
+    from ..processors import EmailData
+
+HEADER_ENDS = (b"\n\n", b"\n\r\n")  # blank line after the headers, LF or CRLF
+
+
+@dataclass(frozen=True)
+class HeaderFilter:
+    """Selects messages by their headers, before their bodies are parsed.
+
+    Only the header block of each message is parsed to apply the filter, so
+    readers never decode the bodies of messages that don't match. Naive
+    dates, both in messages and in since and until, are taken to be UTC.
+
+    Attributes:
+        since: Only keep messages sent at or after this time
+        until: Only keep messages sent before this time
+        senders: Only keep messages whose From header contains one of these,
+            ignoring case
+        subject_pattern: Only keep messages whose subject matches this
+            regular expression, ignoring case
+    """
+
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    senders: Tuple[str, ...] = ()
+    subject_pattern: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        """Normalize the filter and check that the subject pattern compiles.
+
+        Raises:
+            re.error: If subject_pattern is not a valid regular expression
+        """
+        object.__setattr__(self, "since", _utc(self.since))
+        object.__setattr__(self, "until", _utc(self.until))
+        object.__setattr__(self, "senders", tuple(s.lower() for s in self.senders))
+        if self.subject_pattern is not None:
+            re.compile(self.subject_pattern)
+
+    def matches(self, message: Message) -> bool:
+        """Whether the headers of a message pass the filter.
+
+        Messages without a valid Date header never pass a date filter.
+
+        Args:
+            message: Message, which may have been parsed for its headers only
+
+        Returns:
+            True if the message should be kept
+        """
+        return self._check(
+            str(message.get("from", "")),
+            _header_text(message.get("subject", "")),
+            lambda: parse_date(str(message.get("date", ""))),
+        )
+
+    def selects(self, email: "EmailData") -> bool:
+        """Whether an already parsed email passes the filter.
+
+        Args:
+            email: Email, such as one held in memory by a long-running command
+
+        Returns:
+            True if the email should be kept
+        """
+        return self._check(
+            str(email.sender),
+            _header_text(email.subject),
+            lambda: email.parsed_date,
+        )
+
+    def selects_sender(self, sender: str) -> bool:
+        """Whether a sender passes the sender filter, ignoring the other filters.
+
+        Args:
+            sender: From header of a message
+
+        Returns:
+            True if the filter has no senders or the sender contains one of them
+        """
+        if not self.senders:
+            return True
+        sender = _header_text(sender).lower()
+        return any(s in sender for s in self.senders)
+
+    def accepts(
+        self, data: BytesLike, start: int = 0, end: Optional[int] = None
+    ) -> bool:
+        """Whether a raw message passes the filter, parsing its headers only.
+
+        Args:
+            data: Raw mbox data or message bytes (bytes or a memory-mapped file)
+            start: Offset of the first byte of the message
+            end: Offset just past the last byte of the message
+
+        Returns:
+            True if the message should be kept
+        """
+        end = len(data) if end is None else end
+        header_end = end
+        for blank_line in HEADER_ENDS:
+            found = data.find(blank_line, start, end)
+            if found != -1:
+                header_end = found + 1
+                break
+        headers = BytesParser(policy=compat32).parsebytes(
+            bytes(data[start:header_end]), headersonly=True
+        )
+        return self.matches(headers)
+
+    def _check(
+        self, sender: str, subject: str, date: Callable[[], Optional[datetime]]
+    ) -> bool:
+        # the date is only parsed if the filter has bounds
+        if not self.selects_sender(sender):
+            return False
+
+        if self.subject_pattern is not None:
+            # re caches compiled patterns
+            if not re.search(self.subject_pattern, subject, re.IGNORECASE):
+                return False
+
+        if self.since is not None or self.until is not None:
+            parsed = _utc(date())
+            if parsed is None:
+                return False
+            if self.since is not None and parsed < self.since:
+                return False
+            if self.until is not None and parsed >= self.until:
+                return False
+        return True
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+def _header_text(value: object) -> str:
+    # decode RFC 2047 encoded words, such as =?utf-8?q?...?=
+    text = str(value)
+    if "=?" not in text:
+        return text
+    try:
+        return str(make_header(decode_header(text)))
+    except (LookupError, UnicodeError, ValueError):
+        return text
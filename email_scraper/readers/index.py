@@ -0,0 +1,241 @@
+import hashlib
+import mmap
+import os
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Iterator, List, Optional
+
+from ..processors import EmailData
+from ..processors.body import DEFAULT_CONTENT_OPTIONS, ContentOptions
+from . import MailboxReader
+from .mapped import parse_mapped_message
+from .mbox import FROM_LINE, SEPARATOR, iter_message_spans
+
+if TYPE_CHECKING:
+    from .filters import HeaderFilter
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"ESIX"
+INDEX_VERSION = 1
+
+_HEADER = struct.Struct("<4sIQQ")  # magic, version, indexed size, entry count
+_ENTRY = struct.Struct("<QQ8s")  # offset, length, fingerprint
+
+FINGERPRINT_SIZE = 8
+VERIFY_SAMPLES = 8  # number of indexed messages re-hashed to detect rewrites
+
+
+def fingerprint(data: "bytes | memoryview") -> bytes:
+    """Compute the content fingerprint of a message."""
+    return hashlib.blake2b(data, digest_size=FINGERPRINT_SIZE).digest()
+
+
+@dataclass
+class IndexEntry:
+    """Location and fingerprint of one indexed message."""
+
+    offset: int
+    length: int
+    fingerprint: bytes
+
+
+@dataclass
+class MboxIndex:
+    """Sidecar index of the messages in an append-only mbox file.
+
+    The index records where each message lives and a fingerprint of its
+    content, along with how many bytes of the mbox have been indexed.
+    """
+
+    size: int = 0
+    entries: List[IndexEntry] = field(default_factory=list)
+
+    @staticmethod
+    def path_for(mbox_path: Path) -> Path:
+        """Get the path of the sidecar index for an mbox file."""
+        return mbox_path.with_name(mbox_path.name + INDEX_SUFFIX)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["MboxIndex"]:
+        """Load an index file.
+
+        Args:
+            path: Path of the index file
+
+        Returns:
+            The index, or None if it is missing, unreadable or of another version
+        """
+        try:
+            with open(path, "rb") as f:
+                header = f.read(_HEADER.size)
+                if len(header) != _HEADER.size:
+                    return None
+                magic, version, size, count = _HEADER.unpack(header)
+                if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                    return None
+
+                data = f.read(count * _ENTRY.size)
+                if len(data) != count * _ENTRY.size:
+                    return None
+        except OSError:
+            return None
+
+        entries = [IndexEntry(*fields) for fields in _ENTRY.iter_unpack(data)]
+        return cls(size=size, entries=entries)
+
+    def save(self, path: Path) -> None:
+        """Atomically write the index to a file.
+
+        Args:
+            path: Path of the index file
+        """
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(
+                _HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.size, len(self.entries))
+            )
+            for entry in self.entries:
+                f.write(_ENTRY.pack(entry.offset, entry.length, entry.fingerprint))
+        os.replace(tmp_path, path)
+
+    def is_valid_for(self, mapped: "mmap.mmap | bytes") -> bool:
+        """Check that the indexed prefix of an mbox file is unchanged.
+
+        The file must not have shrunk, a sample of indexed messages (always
+        including the first and last) must still have the same fingerprints,
+        and the first unindexed byte must start a new message.
+
+        Args:
+            mapped: Contents of the mbox file
+
+        Returns:
+            True if the index can be used to resume scanning the file
+        """
+        if len(mapped) < self.size:
+            return False
+
+        if self.entries:
+            step = max(1, len(self.entries) // VERIFY_SAMPLES)
+            samples = [*self.entries[::step], self.entries[-1]]
+            for entry in samples:
+                end = entry.offset + entry.length
+                if end > self.size:
+                    return False
+                with memoryview(mapped) as view, view[entry.offset : end] as data:
+                    if fingerprint(data) != entry.fingerprint:
+                        return False
+
+        if len(mapped) == self.size:
+            return True
+        start = self.size
+        if self.size > 0 and mapped[start : start + 1] == b"\n":
+            # the appended data may begin with the newline ending the last line
+            return mapped[start : start + len(SEPARATOR)] == SEPARATOR
+        return mapped[start : start + len(FROM_LINE)] == FROM_LINE
+
+
+class IndexedMboxReader(MailboxReader):
+    """Reads only the messages appended to an mbox file since the last run.
+
+    A sidecar index next to the mbox records the offset, length and
+    fingerprint of every message seen so far. Each read resumes scanning
+    where the previous one stopped. If the file was truncated or rewritten,
+    the index is discarded and the whole file is read again.
+    """
+
+    name = "indexed"
+    description = "Read messages appended since the last run, using a sidecar index"
+    incremental = True
+
+    def __init__(
+        self,
+        index_path: Optional[Path] = None,
+        compact: bool = False,
+        content_options: ContentOptions = DEFAULT_CONTENT_OPTIONS,
+        header_filter: Optional["HeaderFilter"] = None,
+    ):
+        """Initialize the reader.
+
+        Args:
+            index_path: Location of the index (defaults to the mbox path plus INDEX_SUFFIX)
+            compact: Whether to produce lazily decoded CompactEmailData objects
+            content_options: How to extract the body of each message
+            header_filter: Filter selecting messages by their headers, if any
+        """
+        super().__init__(compact, content_options, header_filter)
+        self.index_path = index_path
+        self.rebuilt = False  # whether the last read had to discard the index
+
+    def read(self, path: Path) -> Iterator[EmailData]:
+        """Lazily read the emails appended to an mbox file since the last read.
+
+        The index is only updated once every new message has been consumed,
+        so an interrupted run is retried in full on the next read. With a
+        header filter, the index is left unchanged, since the messages the
+        filter rejected must still count as unread for later reads with
+        another filter or none.
+
+        Args:
+            path: Path of the mbox file to read
+
+        Yields:
+            EmailData objects for new messages, in mailbox order
+        """
+        index_path = self.index_path or MboxIndex.path_for(path)
+        index = MboxIndex.load(index_path) or MboxIndex()
+        yield from self.read_appended(path, index)
+        if self.header_filter is None:
+            index.save(index_path)
+
+    def read_appended(
+        self, path: Path, index: MboxIndex, hold_partial: bool = False
+    ) -> Iterator[EmailData]:
+        """Lazily read the emails appended to an mbox file past an index.
+
+        Used directly by long-running commands, which keep the index in memory
+        between reads. The index is updated in place as messages are read,
+        and its size once every new message has been consumed. If the file
+        was truncated or rewritten, the index is reset and rebuilt is set.
+
+        Args:
+            path: Path of the mbox file to read
+            index: Index of the messages read so far
+            hold_partial: Leave a last message that doesn't end with a newline
+                for the next read, as it may still be being written
+
+        Yields:
+            EmailData objects for new messages, in mailbox order
+        """
+        with open(path, "rb") as f:
+            if path.stat().st_size == 0:
+                self.rebuilt = index.size > 0
+                index.size = 0
+                index.entries.clear()
+                return
+            with _map(f) as mapped:
+                self.rebuilt = index.size > 0 and not index.is_valid_for(mapped)
+                if self.rebuilt:
+                    index.size = 0
+                    index.entries.clear()
+
+                size = len(mapped)
+                for start, end in iter_message_spans(mapped, index.size):
+                    if hold_partial and end == size and mapped[-1:] != b"\n":
+                        # resume at the From line of the unfinished message
+                        size = mapped.rfind(SEPARATOR, 0, start) + 1
+                        break
+                    with memoryview(mapped) as view, view[start:end] as data:
+                        digest = fingerprint(data)
+                    index.entries.append(IndexEntry(start, end - start, digest))
+                    if self.header_filter and not self.header_filter.accepts(
+                        mapped, start, end
+                    ):
+                        continue
+                    yield self.make_email(parse_mapped_message(mapped, start, end))
+
+                index.size = size
+
+
+def _map(f: BinaryIO) -> mmap.mmap:
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
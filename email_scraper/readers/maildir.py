@@ -0,0 +1,111 @@
+import os
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional
+
+from ..processors import EmailData, chunked, map_in_order
+from ..processors.body import DEFAULT_CONTENT_OPTIONS, ContentOptions
+from ..processors.compact import CompactEmailData
+from . import MailboxReader
+
+if TYPE_CHECKING:
+    from .filters import HeaderFilter
+
+MAILDIR_SUBDIRS = ("cur", "new", "tmp")
+FILES_PER_TASK = 256  # message files parsed per task sent to a worker
+
+
+class MaildirReader(MailboxReader):
+    """Reads a Maildir directory, optionally parsing its files in parallel.
+
+    Messages of the cur and new subdirectories are read in order of their
+    file names, which Maildir delivery agents start with the delivery time.
+    With several workers, batches of files are parsed in a process pool and
+    sent back without their raw_message, like ParallelMboxReader does.
+    """
+
+    name = "maildir"
+    description = "Read the message files of a Maildir directory"
+
+    def __init__(
+        self,
+        workers: Optional[int] = 1,
+        compact: bool = False,
+        content_options: ContentOptions = DEFAULT_CONTENT_OPTIONS,
+        header_filter: Optional["HeaderFilter"] = None,
+    ):
+        """Initialize the reader.
+
+        Args:
+            workers: Number of worker processes (None for the CPU count)
+            compact: Whether to produce CompactEmailData objects
+            content_options: How to extract the body of each message
+            header_filter: Filter selecting messages by their headers, if any
+        """
+        super().__init__(compact, content_options, header_filter)
+        self.workers = workers or os.cpu_count() or 1
+
+    def read(self, path: Path) -> Iterator[EmailData]:
+        """Lazily read the emails stored in a Maildir directory.
+
+        Args:
+            path: Path of the Maildir directory
+
+        Yields:
+            EmailData objects in delivery order
+        """
+        files = list_messages(path)
+        if self.workers == 1:
+            for file in files:
+                email = self.parse(file.read_bytes())
+                if email is not None:
+                    yield email
+            return
+
+        parse = partial(_parse_files, self.message_parser())
+        batches = chunked(files, FILES_PER_TASK)
+        for emails in map_in_order(parse, batches, self.workers):
+            for email in emails:
+                yield CompactEmailData.from_email(email) if self.compact else email
+
+    def split(self, path: Path) -> List[Callable[[], List[EmailData]]]:
+        """Split reading a Maildir directory into tasks parsing batches of files."""
+        parse = self.message_parser()
+        return [
+            partial(_parse_files, parse, batch)
+            for batch in chunked(list_messages(path), FILES_PER_TASK)
+        ]
+
+
+def is_maildir(path: Path) -> bool:
+    """Whether a path is a Maildir directory, with cur, new and tmp subdirectories."""
+    return all((path / subdir).is_dir() for subdir in MAILDIR_SUBDIRS)
+
+
+def list_messages(path: Path) -> List[Path]:
+    """List the message files of a Maildir directory in delivery order.
+
+    Args:
+        path: Path of the Maildir directory
+
+    Returns:
+        Paths of the files in cur and new, sorted by file name
+
+    Raises:
+        NotADirectoryError: If path is not a Maildir directory
+    """
+    if not is_maildir(path):
+        raise NotADirectoryError(f"Not a Maildir directory: {path}")
+    files = [
+        file
+        for subdir in ("cur", "new")
+        for file in (path / subdir).iterdir()
+        if file.is_file() and not file.name.startswith(".")
+    ]
+    return sorted(files, key=lambda file: file.name)
+
+
+def _parse_files(
+    parse: Callable[[List[bytes]], List[EmailData]], files: List[Path]
+) -> List[EmailData]:
+    return parse([file.read_bytes() for file in files])
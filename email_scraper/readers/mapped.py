@@ -0,0 +1,65 @@
+import mmap
+from email.message import Message
+from email.parser import Parser
+from email.policy import compat32
+from pathlib import Path
+from typing import Callable, Iterator, List
+
+from ..processors import EmailData
+from . import MailboxReader
+from .mbox import iter_message_spans, split_mbox
+
+
+class MmapMboxReader(MailboxReader):
+    """Reads an mbox file through a memory map.
+
+    Message boundaries are found with a byte search over the mapped file
+    instead of reading it line by line, and each message is decoded straight
+    from the mapping without first being copied into a bytes object.
+    """
+
+    name = "mmap"
+    description = "Scan a memory-mapped mbox file for message boundaries"
+
+    def read(self, path: Path) -> Iterator[EmailData]:
+        """Lazily read the emails stored in an mbox file.
+
+        Args:
+            path: Path of the mbox file to read
+
+        Yields:
+            EmailData objects in mailbox order
+        """
+        with open(path, "rb") as f:
+            if path.stat().st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for start, end in iter_message_spans(mapped):
+                    if self.header_filter and not self.header_filter.accepts(
+                        mapped, start, end
+                    ):
+                        continue
+                    yield self.make_email(parse_mapped_message(mapped, start, end))
+
+    def split(self, path: Path) -> List[Callable[[], List[EmailData]]]:
+        """Split reading an mbox file into tasks parsing byte ranges of it."""
+        return split_mbox(self.message_parser(), path)
+
+
+def parse_mapped_message(mapped: mmap.mmap, start: int, end: int) -> Message:
+    """Parse a message directly from a slice of a memory-mapped file.
+
+    This is equivalent to parse_message(mapped[start:end]), minus the copy.
+
+    Args:
+        mapped: Memory-mapped mbox file
+        start: Offset of the first byte of the message
+        end: Offset just past the last byte of the message
+
+    Returns:
+        Parsed email message
+    """
+    with memoryview(mapped) as view, view[start:end] as data:
+        # same decoding as BytesParser, which would require a bytes copy
+        text = str(data, "ascii", "surrogateescape")
+    return Parser(policy=compat32).parsestr(text)
@@ -0,0 +1,185 @@
+import mailbox
+import mmap
+from functools import partial
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple, Union
+
+from ..processors import EmailData
+from . import MailboxReader
+
+FROM_LINE = b"From "
+SEPARATOR = b"\nFrom "
+
+MIN_CHUNK_SIZE = 1 << 20  # don't split files into ranges smaller than 1 MiB
+SPLIT_SIZE = 1 << 22  # bytes of mbox parsed by each task of MailboxReader.split
+SCAN_BLOCK_SIZE = 1 << 16
+
+BytesLike = Union[bytes, mmap.mmap]
+
+
+class MboxReader(MailboxReader):
+    """Reads an mbox file sequentially using the standard library."""
+
+    name = "mbox"
+    description = "Read an mbox file one message at a time with mailbox.mbox"
+
+    def read(self, path: Path) -> Iterator[EmailData]:
+        """Lazily read the emails stored in an mbox file.
+
+        Args:
+            path: Path of the mbox file to read
+
+        Yields:
+            EmailData objects in mailbox order
+        """
+        mbox = mailbox.mbox(str(path))
+        try:
+            if self.header_filter is None:
+                for msg in mbox:
+                    yield self.make_email(msg)
+                return
+
+            # filter on the raw bytes, so only matching messages are parsed
+            for key in mbox.iterkeys():
+                email = self.parse(mbox.get_bytes(key))
+                if email is not None:
+                    yield email
+        finally:
+            mbox.close()
+
+    def split(self, path: Path) -> List[Callable[[], List[EmailData]]]:
+        """Split reading an mbox file into tasks parsing byte ranges of it."""
+        return split_mbox(self.message_parser(), path)
+
+
+def split_messages(data: bytes) -> Iterator[bytes]:
+    """Split a run of mbox data into raw messages.
+
+    The data must start at a From line (or be preceded only by junk, which is
+    skipped, as mailbox.mbox does). From lines are removed and the blank line
+    separating consecutive messages is dropped, so the yielded bytes match
+    what mailbox.mbox hands to the email parser.
+
+    Args:
+        data: Raw mbox bytes
+
+    Yields:
+        Raw bytes of each message, without its From line
+    """
+    for start, end in iter_message_spans(data):
+        yield data[start:end]
+
+
+def iter_message_spans(data: BytesLike, offset: int = 0) -> Iterator[Tuple[int, int]]:
+    """Locate the bodies of the messages in a run of mbox data.
+
+    Args:
+        data: Raw mbox data (bytes or a memory-mapped file)
+        offset: Position in data at which to start scanning
+
+    Yields:
+        (start, end) positions of each message, excluding its From line
+    """
+    if data[offset : offset + len(FROM_LINE)] == FROM_LINE:
+        from_pos = offset
+    else:
+        from_pos = data.find(SEPARATOR, offset)
+        from_pos = -1 if from_pos == -1 else from_pos + 1
+
+    while from_pos != -1:
+        body_start = data.find(b"\n", from_pos)
+        body_start = len(data) if body_start == -1 else body_start + 1
+
+        next_sep = data.find(SEPARATOR, body_start - 1)
+        next_from = -1 if next_sep == -1 else next_sep + 1
+        end = len(data) if next_from == -1 else next_from
+
+        # mailbox.mbox drops the blank line separating two messages
+        if end > body_start and data[end - 2 : end] == b"\n\n":
+            end -= 1
+
+        yield body_start, end
+        from_pos = next_from
+
+
+def read_message_bytes(path: Path, start: int, end: int) -> List[bytes]:
+    """Read and split the messages stored in a byte range of an mbox file."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return list(split_messages(data))
+
+
+def split_mbox(
+    parse: Callable[[List[bytes]], List[EmailData]], path: Path
+) -> List[Callable[[], List[EmailData]]]:
+    """Split parsing an mbox file into tasks over byte ranges of about SPLIT_SIZE.
+
+    Args:
+        parse: Picklable function parsing raw messages (see
+            MailboxReader.message_parser)
+        path: Path of the mbox file
+
+    Returns:
+        Picklable tasks, each parsing the messages of a range, in file order
+    """
+    count = -(-path.stat().st_size // SPLIT_SIZE)
+    return [
+        partial(parse_range, parse, path, start, end)
+        for start, end in split_ranges(path, count)
+    ]
+
+
+def parse_range(
+    parse: Callable[[List[bytes]], List[EmailData]], path: Path, start: int, end: int
+) -> List[EmailData]:
+    """Parse the messages stored in a byte range of an mbox file."""
+    return parse(read_message_bytes(path, start, end))
+
+
+def split_ranges(path: Path, count: int) -> List[Tuple[int, int]]:
+    """Split an mbox file into at most count byte ranges on From line boundaries.
+
+    Args:
+        path: Path of the mbox file to split
+        count: Desired number of ranges
+
+    Returns:
+        List of (start, end) byte offsets covering the whole file
+    """
+    size = path.stat().st_size
+    chunk_size = max(MIN_CHUNK_SIZE, -(-size // max(count, 1)))
+
+    bounds = [0]
+    with open(path, "rb") as f:
+        guess = chunk_size
+        while guess < size:
+            boundary = _next_from_line(f, guess)
+            if boundary is None:
+                break
+            if boundary > bounds[-1]:
+                bounds.append(boundary)
+            guess = boundary + chunk_size
+    bounds.append(size)
+
+    return list(zip(bounds, bounds[1:]))
+
+
+def _next_from_line(f: BinaryIO, pos: int) -> Optional[int]:
+    """Find the offset of the first From line starting after pos."""
+    # start one byte early so a separator straddling pos is still found
+    f.seek(pos - 1)
+    base = pos - 1
+    tail = b""
+    while True:
+        block = f.read(SCAN_BLOCK_SIZE)
+        if not block:
+            return None
+        data = tail + block
+        found = data.find(SEPARATOR)
+        if found != -1:
+            return base + found + 1
+        # keep enough bytes to match a separator split across blocks
+        keep = len(SEPARATOR) - 1
+        base += len(data) - keep
+        tail = data[-keep:]
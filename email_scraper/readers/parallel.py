@@ -0,0 +1,136 @@
+import os
+from functools import partial
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from ..processors import EmailData, chunked, map_in_order
+from ..processors.body import DEFAULT_CONTENT_OPTIONS, ContentOptions
+from ..processors.compact import CompactEmailData
+from . import MailboxReader
+from .mbox import parse_range, split_mbox, split_ranges
+
+if TYPE_CHECKING:
+    from .filters import HeaderFilter
+
+CHUNKS_PER_WORKER = 4  # more chunks than workers keeps the pool evenly loaded
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class ParallelMboxReader(MailboxReader):
+    """Parses an mbox file on several cores.
+
+    The file is split into byte ranges on From line boundaries and each range
+    is parsed in a worker process. Results are yielded in mailbox order.
+    Parsed emails are sent back without their raw_message, which is not
+    worth the cost of pickling between processes, so compact emails are
+    fully decoded rather than lazy.
+    """
+
+    name = "parallel"
+    description = "Parse an mbox file in a process pool, split on From line boundaries"
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        compact: bool = False,
+        content_options: ContentOptions = DEFAULT_CONTENT_OPTIONS,
+        header_filter: Optional["HeaderFilter"] = None,
+    ):
+        """Initialize the reader.
+
+        Args:
+            workers: Number of worker processes (defaults to the CPU count)
+            compact: Whether to produce CompactEmailData objects
+            content_options: How to extract the body of each message
+            header_filter: Filter selecting messages by their headers, if any
+        """
+        super().__init__(compact, content_options, header_filter)
+        self.workers = workers or os.cpu_count() or 1
+
+    def read(self, path: Path) -> Iterator[EmailData]:
+        """Lazily read the emails stored in an mbox file.
+
+        Args:
+            path: Path of the mbox file to read
+
+        Yields:
+            EmailData objects in mailbox order
+        """
+        emails = self._read_ranges(path)
+        if not self.compact:
+            yield from emails
+            return
+
+        # workers already decoded everything, so only compact the results
+        for email in emails:
+            yield CompactEmailData.from_email(email)
+
+    def map_chunks(
+        self, path: Path, func: Callable[[List[EmailData]], T], chunk_size: int
+    ) -> Iterator[T]:
+        """Apply a function to consecutive chunks of emails in worker processes.
+
+        Each worker parses a byte range and applies func to its emails there,
+        so only the (usually much smaller) results are sent back.
+
+        Args:
+            path: Path of the mbox file to read
+            func: Picklable function applied to each chunk
+            chunk_size: Maximum number of emails per chunk
+
+        Yields:
+            Result of func for each chunk, in mailbox order
+        """
+        parse = partial(parse_range, self.message_parser())
+        task = partial(_map_range, partial(_map_chunked, func, chunk_size), parse)
+        for results in self._map_ranges(path, task):
+            yield from results
+
+    def split(self, path: Path) -> List[Callable[[], List[EmailData]]]:
+        """Split reading an mbox file into tasks parsing byte ranges of it."""
+        return split_mbox(self.message_parser(), path)
+
+    def _read_ranges(self, path: Path) -> Iterator[EmailData]:
+        parse = partial(parse_range, self.message_parser())
+        for emails in self._map_ranges(path, parse):
+            yield from emails
+
+    def _map_ranges(
+        self, path: Path, task: Callable[[Path, int, int], R]
+    ) -> Iterator[R]:
+        """Run a task over each byte range of a file, yielding results in order."""
+        ranges = split_ranges(path, self.workers * CHUNKS_PER_WORKER)
+        workers = 1 if len(ranges) == 1 else self.workers
+        return map_in_order(partial(_run_range, task, path), ranges, workers)
+
+
+def _run_range(
+    task: Callable[[Path, int, int], R], path: Path, bounds: Tuple[int, int]
+) -> R:
+    return task(path, *bounds)
+
+
+def _map_chunked(
+    func: Callable[[List[EmailData]], T], chunk_size: int, emails: List[EmailData]
+) -> List[T]:
+    return [func(chunk) for chunk in chunked(emails, chunk_size)]
+
+
+def _map_range(
+    func: Callable[[List[EmailData]], List[T]],
+    parse: Callable[[Path, int, int], List[EmailData]],
+    path: Path,
+    start: int,
+    end: int,
+) -> List[T]:
+    return func(parse(path, start, end))
@@ -0,0 +1,283 @@
+"""Reading emails from several mailboxes as a single stream."""
+
+import copy
+import glob
+import heapq
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from datetime import timezone
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+)
+
+from ..processors import EmailData, map_in_order
+from ..processors.body import DEFAULT_CONTENT_OPTIONS, ContentOptions
+from ..processors.compact import CompactEmailData
+from . import MailboxReader, run_task
+from .compressed import CompressedMboxReader, is_compressed
+from .index import INDEX_SUFFIX
+from .maildir import MaildirReader, is_maildir
+from .mbox import MboxReader
+from .parallel import ParallelMboxReader
+
+if TYPE_CHECKING:
+    from .filters import HeaderFilter
+
+GLOB_CHARS = frozenset("*?[")
+
+T = TypeVar("T")
+
+
+class AutoReader(MailboxReader):
+    """Picks a reader for each mailbox from its path.
+
+    Maildir directories are read with MaildirReader, compressed files with
+    CompressedMboxReader, and other files as mbox files, in parallel if
+    there are several workers.
+    """
+
+    name = "auto"
+    description = "Pick the maildir, compressed or mbox reader from the path"
+
+    def __init__(
+        self,
+        workers: int = 1,
+        compact: bool = False,
+        content_options: ContentOptions = DEFAULT_CONTENT_OPTIONS,
+        header_filter: Optional["HeaderFilter"] = None,
+    ):
+        """Initialize the reader.
+
+        Args:
+            workers: Number of worker processes used to parse a mailbox
+            compact: Whether to produce CompactEmailData objects
+            content_options: How to extract the body of each message
+            header_filter: Filter selecting messages by their headers, if any
+        """
+        super().__init__(compact, content_options, header_filter)
+        self.workers = workers
+
+    def reader_for(self, path: Path) -> MailboxReader:
+        """Get the reader for a mailbox.
+
+        Args:
+            path: Path of the mailbox
+
+        Returns:
+            Reader suited to the format of the mailbox
+        """
+        options = self.content_options
+        header_filter = self.header_filter
+        if is_maildir(path):
+            return MaildirReader(self.workers, self.compact, options, header_filter)
+        if is_compressed(path):
+            return CompressedMboxReader(self.compact, options, header_filter)
+        if self.workers > 1:
+            return ParallelMboxReader(
+                self.workers, self.compact, options, header_filter
+            )
+        return MboxReader(self.compact, options, header_filter)
+
+    def read(self, path: Path) -> Iterator[EmailData]:
+        """Lazily read the emails of a mailbox with the reader suited to it.
+
+        Args:
+            path: Path of the mailbox to read
+
+        Yields:
+            EmailData objects in mailbox order
+        """
+        return self.reader_for(path).read(path)
+
+    def map_chunks(
+        self, path: Path, func: Callable[[List[EmailData]], T], chunk_size: int
+    ) -> Iterator[T]:
+        """Apply a function to chunks of emails with the reader suited to a mailbox."""
+        return self.reader_for(path).map_chunks(path, func, chunk_size)
+
+    def split(self, path: Path) -> List[Callable[[], List[EmailData]]]:
+        """Split reading a mailbox into tasks with the reader suited to it."""
+        return self.reader_for(path).split(path)
+
+
+def expand_sources(sources: Iterable[Union[str, Path]]) -> List[Path]:
+    """Expand files, directories and glob patterns into a list of mailbox files.
+
+    Directories are searched recursively, skipping hidden files and mbox
+    index sidecars, except for Maildir directories, which are mailboxes. Each
+    path is only listed once, in the order given, with the files of a
+    directory or pattern sorted by name.
+
+    Args:
+        sources: Paths of files or directories, or glob patterns
+
+    Returns:
+        Paths of the mailbox files to read
+
+    Raises:
+        FileNotFoundError: If a path does not exist or a pattern matches nothing
+    """
+    paths: List[Path] = []
+    for source in sources:
+        name = str(source)
+        if GLOB_CHARS.intersection(name) and not Path(name).exists():
+            matches = [Path(p) for p in sorted(glob.glob(name, recursive=True))]
+            if not matches:
+                raise FileNotFoundError(f"No files match {name}")
+        else:
+            matches = [Path(name)]
+
+        for match in matches:
+            if match.is_dir() and not is_maildir(match):
+                paths.extend(_find_mailboxes(match))
+            elif match.exists():
+                paths.append(match)
+            else:
+                raise FileNotFoundError(f"No such file or directory: {match}")
+
+    return list(dict.fromkeys(paths))
+
+
+def _find_mailboxes(directory: Path) -> Iterator[Path]:
+    for path in sorted(directory.iterdir()):
+        if path.name.startswith("."):
+            continue
+        if path.is_dir():
+            yield from [path] if is_maildir(path) else _find_mailboxes(path)
+        elif not path.name.endswith(INDEX_SUFFIX):
+            yield path
+
+
+def read_sources(
+    reader: MailboxReader,
+    paths: Sequence[Path],
+    workers: int = 1,
+    by_date: bool = False,
+) -> Iterator[EmailData]:
+    """Read the emails of several mailboxes as a single stream.
+
+    With several workers, mailboxes are split into parts (see
+    MailboxReader.split) parsed concurrently in a process pool, so reading is
+    spread evenly over the workers, however uneven the mailbox sizes. Only a
+    bounded window of parts is in flight at a time. Emails are sent back without their
+    raw_message, and reader must parse in a single process.
+
+    Args:
+        reader: Reader used for each mailbox
+        paths: Paths of the mailboxes, e.g. from expand_sources
+        workers: Number of processes parsing mailboxes
+        by_date: Merge the mailboxes by date instead of concatenating them.
+            Each mailbox is assumed to be in date order already, as exports
+            usually are, and emails without a valid date sort first.
+
+    Yields:
+        EmailData objects, mailbox by mailbox or in date order
+    """
+    if workers > 1 and len(paths) > 1:
+        emails = _read_concurrently(reader, paths, workers, by_date)
+        yield from _compacted(emails) if reader.compact else emails
+    elif by_date:
+        yield from heapq.merge(*[reader.read(path) for path in paths], key=_date_key)
+    else:
+        for path in paths:
+            yield from reader.read(path)
+
+
+def _read_concurrently(
+    reader: MailboxReader, paths: Sequence[Path], workers: int, by_date: bool
+) -> Iterator[EmailData]:
+    # workers decode everything, so only compact the results they send back
+    worker_reader = copy.copy(reader)
+    worker_reader.compact = False
+
+    if not by_date:
+        tasks = (task for path in paths for task in worker_reader.split(path))
+        for emails in map_in_order(run_task, tasks, workers):
+            yield from emails
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        scheduler = _PartScheduler(
+            executor, [worker_reader.split(path) for path in paths], workers * 2
+        )
+        sources = [scheduler.emails(source) for source in range(len(paths))]
+        yield from heapq.merge(*sources, key=_date_key)
+
+
+class _PartScheduler:
+    """Submits the parts of several mailboxes to one pool, a window at a time.
+
+    Free slots in the window go to the mailboxes in turn, so the first ones
+    start right away and later ones as their parts finish. A mailbox the merge
+    is waiting on gets its next part even when the window is full, so no more
+    than one part per mailbox goes over it.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        tasks: Sequence[Iterable[Callable[[], List[EmailData]]]],
+        window: int,
+    ) -> None:
+        self.executor = executor
+        self.window = window
+        self.tasks = [iter(source) for source in tasks]
+        self.pending: List[Deque[Future[List[EmailData]]]] = [deque() for _ in tasks]
+        self.active = list(range(len(tasks)))
+        self.in_flight = 0
+        self.turn = 0
+        self._fill()
+
+    def emails(self, source: int) -> Iterator[EmailData]:
+        """Yield the emails of one mailbox, part by part.
+
+        Args:
+            source: Position of the mailbox in the tasks
+
+        Yields:
+            The mailbox's emails, in order
+        """
+        while self.pending[source] or self._submit(source):
+            future = self.pending[source].popleft()
+            self.in_flight -= 1
+            self._fill()
+            yield from future.result()
+
+    def _fill(self) -> None:
+        while self.active and self.in_flight < self.window:
+            self.turn %= len(self.active)
+            if self._submit(self.active[self.turn]):
+                self.turn += 1
+
+    def _submit(self, source: int) -> bool:
+        for task in self.tasks[source]:
+            self.pending[source].append(self.executor.submit(run_task, task))
+            self.in_flight += 1
+            return True
+        if source in self.active:
+            self.active.remove(source)
+        return False
+
+
+def _compacted(emails: Iterable[EmailData]) -> Iterator[EmailData]:
+    for email in emails:
+        yield CompactEmailData.from_email(email)
+
+
+def _date_key(email: EmailData) -> float:
+    parsed = email.parsed_date
+    if parsed is None:
+        return float("-inf")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
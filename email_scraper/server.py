@@ -0,0 +1,394 @@
+"""Long-running server answering queries about a mailbox kept in memory.
+
+The server parses an mbox file once, then keeps its emails, statistics and
+classifications resident and answers each request from memory. Before
+answering, it checks whether the file grew and parses only the messages
+appended since, using an in-memory index (see readers.index). Requests are
+plain HTTP GETs, on localhost or on a Unix socket, answered with JSON:
+
+    /status     path, number of messages and bytes indexed
+    /stats      statistics (see processors.example)
+    /classify   classifications of every email, in mailbox order
+    /query      emails, with offset and limit query parameters for paging
+
+/stats, /classify and /query accept the filters of the read command as query
+parameters: since and until (ISO 8601 dates or times, UTC unless stated),
+from (repeated for several senders) and subject (a regular expression).
+"""
+
+import heapq
+import json
+import os
+import re
+import socketserver
+import threading
+from bisect import bisect_left
+from datetime import datetime, timezone
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .cache import MemoCache
+from .processors import EmailData
+from .processors.body import DEFAULT_CONTENT_OPTIONS, ContentOptions
+from .processors.classifier import EmailClassifier
+from .processors.example import ExampleProcessor
+from .readers.filters import HeaderFilter
+from .readers.index import IndexedMboxReader, MboxIndex
+from .timings import Timings
+from .wire import email_to_dict
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8642
+DEFAULT_QUERY_LIMIT = 100  # emails returned by /query without a limit parameter
+
+
+class MailboxService:
+    """Keeps the emails of an mbox file parsed, with their statistics and classifications.
+
+    The mbox is expected to only ever be appended to. Each refresh parses the
+    messages appended since the previous one and adds them to the running
+    statistics and classifications, and to indexes of the emails by date and
+    by sender, so that date and sender filters only check the emails they
+    may select. If the file was truncated or rewritten, everything is parsed
+    again. Methods are safe to call from several threads.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        content_options: ContentOptions = DEFAULT_CONTENT_OPTIONS,
+        approximate: bool = False,
+        memo: Optional[MemoCache] = None,
+        timings: Optional[Timings] = None,
+    ):
+        """Initialize the service, without reading the mailbox yet.
+
+        Args:
+            path: Path of the mbox file to serve
+            content_options: How to extract the body of each message
+            approximate: Use fixed-size sketches for sender and subject counts
+            memo: Memoized classifications to use and extend, if any
+            timings: Timings recording the read, index and process stages of
+                refreshes, if any. Requests are answered in several threads
+                and aren't timed.
+        """
+        self.path = path
+        self.reader = IndexedMboxReader(content_options=content_options)
+        self.index = MboxIndex()
+        self.statistics = ExampleProcessor(approximate=approximate)
+        self.classifier = EmailClassifier()
+        self.memo = memo
+        self.timings = timings or Timings("serve", enabled=False)
+        self.emails: List[EmailData] = []
+        self.classifications: List[Dict[str, Any]] = []
+        self._state = self.statistics.create_state()
+        # dates and positions of the emails with a valid date, sorted by date
+        self._by_date: List[Tuple[datetime, int]] = []
+        self._by_sender: Dict[str, List[int]] = {}  # positions of each sender's emails
+        self._stat: Optional[Tuple[int, int]] = None  # size and mtime when refreshed
+        self._lock = threading.Lock()
+
+    def refresh(self) -> int:
+        """Parse the messages appended to the mbox since the last refresh.
+
+        A last message that doesn't end with a newline is left for a later
+        refresh, as it may still be being written.
+
+        Returns:
+            Number of new messages
+        """
+        with self._lock:
+            stat = self.path.stat()
+            if (stat.st_size, stat.st_mtime_ns) == self._stat:
+                return 0
+
+            emails = []
+            indexed = self.index.size
+            appended = self.reader.read_appended(self.path, self.index, True)
+            for email in self.timings.iterate("read", appended):
+                email.raw_message = None  # only the extracted fields are served
+                emails.append(email)
+            read = self.timings.get("read")
+            size = self.index.size - (0 if self.reader.rebuilt else indexed)
+            read.bytes_read = (read.bytes_read or 0) + size
+            if self.reader.rebuilt:
+                self.emails = []
+                self.classifications = []
+                self._state = self.statistics.create_state()
+                self._by_date = []
+                self._by_sender = {}
+
+            with self.timings.stage("index"):
+                self._index(emails, len(self.emails))
+
+            with self.timings.processor(self.statistics.name):
+                self._state = self.statistics.update_batch(self._state, emails)
+            with self.timings.processor(self.classifier.name):
+                self.classifications.extend(
+                    self.classifier.iter_classifications(emails, memo=self.memo)
+                )
+            self.timings.get("process").messages += len(emails)
+            self.emails.extend(emails)
+            self._stat = (stat.st_size, stat.st_mtime_ns)
+            return len(emails)
+
+    def _index(self, emails: List[EmailData], first: int) -> None:
+        # add new emails to the sender and date indexes; dates are sorted once
+        # per refresh rather than inserted one by one, which would be
+        # quadratic on archives that aren't in date order
+        dated = []
+        for position, email in enumerate(emails, first):
+            self._by_sender.setdefault(str(email.sender), []).append(position)
+            date = email.parsed_date
+            if date is not None:
+                dated.append((_utc(date), position))
+        dated.sort()
+        if not dated:
+            return
+        if not self._by_date or dated[0] >= self._by_date[-1]:
+            # appended mail is usually the latest
+            self._by_date.extend(dated)
+        else:
+            self._by_date = list(heapq.merge(self._by_date, dated))
+
+    def status(self) -> Dict[str, Any]:
+        """Describe what the service holds."""
+        with self._lock:
+            return {
+                "path": str(self.path),
+                "messages": len(self.emails),
+                "indexed_bytes": self.index.size,
+            }
+
+    def stats(self, header_filter: Optional[HeaderFilter] = None) -> Dict[str, Any]:
+        """Get statistics over every email, or over the emails passing a filter."""
+        if header_filter is None:
+            with self._lock:
+                return self.statistics.finalize(self._state)
+        emails, _, positions = self._select(header_filter)
+        return self.statistics.process(emails[p] for p in positions)
+
+    def classify(self, header_filter: Optional[HeaderFilter] = None) -> Dict[str, Any]:
+        """Get the classifications of every email, or of the emails passing a filter."""
+        _, classifications, positions = self._select(header_filter)
+        return self.classifier.finalize([classifications[p] for p in positions])
+
+    def query(
+        self,
+        header_filter: Optional[HeaderFilter] = None,
+        offset: int = 0,
+        limit: int = DEFAULT_QUERY_LIMIT,
+    ) -> Dict[str, Any]:
+        """Get a page of the emails passing a filter, in mailbox order.
+
+        Args:
+            header_filter: Filter selecting emails, if any
+            offset: Number of matching emails skipped
+            limit: Maximum number of emails returned
+
+        Returns:
+            Total number of matching emails and the emails of the page
+        """
+        emails, _, positions = self._select(header_filter)
+        page = positions[offset : offset + limit]
+        return {
+            "total": len(positions),
+            "emails": [email_to_dict(emails[p]) for p in page],
+        }
+
+    def _select(
+        self, header_filter: Optional[HeaderFilter]
+    ) -> Tuple[List[EmailData], List[Dict[str, Any]], Sequence[int]]:
+        """Find the emails passing a filter.
+
+        Refreshes only ever append to the lists of emails and classifications
+        (or replace them), so the emails are checked against the filter
+        outside the lock, once the indexes have narrowed them down.
+
+        Returns:
+            Emails and their classifications, and the positions of the emails
+            passing the filter in them, in mailbox order
+        """
+        with self._lock:
+            emails, classifications = self.emails, self.classifications
+            candidates = self._candidates(header_filter)
+        if header_filter is None:
+            return emails, classifications, candidates
+        # subject patterns can only be checked email by email
+        positions = [p for p in candidates if header_filter.selects(emails[p])]
+        return emails, classifications, positions
+
+    def _candidates(self, header_filter: Optional[HeaderFilter]) -> Sequence[int]:
+        # positions of the emails the date and sender indexes can't rule out
+        selected: List[Set[int]] = []
+        if header_filter is not None and (
+            header_filter.since is not None or header_filter.until is not None
+        ):
+            since, until = header_filter.since, header_filter.until
+            start = 0 if since is None else bisect_left(self._by_date, (since,))
+            end = (
+                len(self._by_date)
+                if until is None
+                else bisect_left(self._by_date, (until,), start)
+            )
+            selected.append({p for _, p in self._by_date[start:end]})
+        if header_filter is not None and header_filter.senders:
+            selected.append(
+                {
+                    p
+                    for sender, positions in self._by_sender.items()
+                    if header_filter.selects_sender(sender)
+                    for p in positions
+                }
+            )
+        if not selected:
+            return range(len(self.emails))
+        return sorted(set.intersection(*selected))
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Answers GET requests with JSON from a MailboxService."""
+
+    protocol_version = "HTTP/1.1"  # keep connections open between queries
+
+    def __init__(self, *args: Any, service: MailboxService, **kwargs: Any):
+        """Initialize the handler, which handles the request right away."""
+        self.service = service
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self) -> None:
+        """Refresh the mailbox and answer a request."""
+        url = urlsplit(self.path)
+        routes: Dict[str, Callable[[Dict[str, List[str]]], Dict[str, Any]]] = {
+            "/status": lambda params: self.service.status(),
+            "/stats": lambda params: self.service.stats(parse_filter(params)),
+            "/classify": lambda params: self.service.classify(parse_filter(params)),
+            "/query": lambda params: self.service.query(
+                parse_filter(params),
+                _int_param(params, "offset", 0),
+                _int_param(params, "limit", DEFAULT_QUERY_LIMIT),
+            ),
+        }
+        route = routes.get(url.path.rstrip("/") or "/")
+        if route is None:
+            self._send(HTTPStatus.NOT_FOUND, {"error": f"No such path: {url.path}"})
+            return
+
+        try:
+            self.service.refresh()
+            result = route(parse_qs(url.query))
+        except ValueError as e:
+            self._send(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+        except OSError as e:
+            self._send(HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(e)})
+            return
+        except Exception as e:
+            # still answer, so the kept-alive connection isn't dropped
+            self.log_error("Error answering %s: %r", self.path, e)
+            self._send(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)})
+            return
+        self._send(HTTPStatus.OK, result)
+
+    def address_string(self) -> str:
+        """Client address for log messages, which is empty on Unix sockets."""
+        if isinstance(self.client_address, tuple):
+            return str(self.client_address[0])
+        return "unix"
+
+    def _send(self, status: HTTPStatus, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP server listening on a Unix socket, with a thread per connection."""
+
+    daemon_threads = True
+
+    def server_close(self) -> None:
+        """Close the socket and remove its file."""
+        super().server_close()
+        if isinstance(self.server_address, str):
+            try:
+                os.unlink(self.server_address)
+            except FileNotFoundError:
+                pass
+
+
+def make_server(
+    service: MailboxService,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: Optional[Path] = None,
+) -> socketserver.TCPServer:
+    """Create a server answering requests from a service.
+
+    Args:
+        service: Service holding the mailbox
+        host: Address to listen on
+        port: TCP port to listen on (0 picks a free one)
+        socket_path: Listen on this Unix socket instead of TCP, replacing a
+            stale socket file left by a previous server
+
+    Returns:
+        Server, to be run with serve_forever
+    """
+
+    def handler(*args: Any) -> RequestHandler:
+        return RequestHandler(*args, service=service)
+
+    if socket_path is None:
+        return ThreadingHTTPServer((host, port), handler)
+    if socket_path.is_socket():
+        socket_path.unlink()
+    return UnixHTTPServer(str(socket_path), handler)
+
+
+def parse_filter(params: Dict[str, List[str]]) -> Optional[HeaderFilter]:
+    """Build the header filter given by the query parameters of a request.
+
+    Raises:
+        ValueError: If a date or the subject pattern is invalid
+    """
+    since = _date_param(params, "since")
+    until = _date_param(params, "until")
+    senders = tuple(params.get("from", []))
+    subject = params.get("subject", [None])[-1]
+    if since is None and until is None and not senders and subject is None:
+        return None
+    try:
+        return HeaderFilter(since, until, senders, subject)
+    except re.error as e:
+        raise ValueError(f"Invalid subject pattern: {e}") from e
+
+
+def _date_param(params: Dict[str, List[str]], name: str) -> Optional[datetime]:
+    if name not in params:
+        return None
+    value = params[name][-1]
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as e:
+        raise ValueError(f"Invalid {name} date: {value!r}") from e
+
+
+def _int_param(params: Dict[str, List[str]], name: str, default: int) -> int:
+    if name not in params:
+        return default
+    value = params[name][-1]
+    if not value.isdigit():
+        raise ValueError(f"Invalid {name}: {value!r}")
+    return int(value)
+
+
+def _utc(date: datetime) -> datetime:
+    # naive dates are taken to be UTC, as by HeaderFilter
+    return date if date.tzinfo is not None else date.replace(tzinfo=timezone.utc)
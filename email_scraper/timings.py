@@ -0,0 +1,309 @@
+"""Per-stage timing, throughput and memory instrumentation.
+
+A Timings object records where a command spends its time. Stages are timed
+exclusively: time spent in a stage nested in another one (such as decoding
+the emails a processor is iterating over) is only counted for the inner
+stage, so the stage times of a command add up to its total time. A single
+stage can also be profiled with cProfile.
+"""
+
+import cProfile
+import io
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+KIB = 1024
+
+
+@dataclass
+class StageTiming:
+    """Measurements of one stage of a command.
+
+    Attributes:
+        name: Name of the stage
+        seconds: Wall time spent in the stage, excluding nested stages
+        messages: Number of messages (or records) the stage handled
+        bytes_read: Number of input bytes the stage read, if it reads input
+        peak_rss: Peak resident set size of the process when the stage ended
+    """
+
+    name: str
+    seconds: float = 0.0
+    messages: int = 0
+    bytes_read: Optional[int] = None
+    peak_rss: Optional[int] = None
+
+    @property
+    def messages_per_sec(self) -> Optional[float]:
+        """Throughput of the stage, if it handled messages."""
+        if not self.messages or not self.seconds:
+            return None
+        return self.messages / self.seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the measurements as a JSON-serializable dictionary."""
+        return {
+            "name": self.name,
+            "seconds": self.seconds,
+            "messages": self.messages,
+            "messages_per_sec": self.messages_per_sec,
+            "bytes_read": self.bytes_read,
+            "peak_rss_bytes": self.peak_rss,
+        }
+
+
+@dataclass
+class _Frame:
+    timing: StageTiming
+    start: float
+    nested: float = 0.0
+
+
+class Timings:
+    """Records per-stage and per-processor timings of a command.
+
+    A disabled Timings object measures nothing, so commands can be written
+    once and only pay for instrumentation when it is asked for.
+    """
+
+    def __init__(
+        self,
+        command: str,
+        enabled: bool = True,
+        profile_stage: Optional[str] = None,
+    ):
+        """Initialize the timings.
+
+        Args:
+            command: Name of the timed command
+            enabled: Whether to measure anything
+            profile_stage: Name of a stage to profile with cProfile, if any
+        """
+        self.command = command
+        self.enabled = enabled or profile_stage is not None
+        self.profile_stage = profile_stage
+        self.stages: Dict[str, StageTiming] = {}
+        self.processors: Dict[str, float] = {}
+        self.profiler = cProfile.Profile() if profile_stage else None
+        self._start = time.perf_counter()
+        self._stack: List[_Frame] = []
+        self._profiling = False
+
+    def get(self, name: str) -> StageTiming:
+        """Get the measurements of a stage, creating them if needed."""
+        if name not in self.stages:
+            self.stages[name] = StageTiming(name)
+        return self.stages[name]
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageTiming]:
+        """Time the code run in a with block as a stage.
+
+        Args:
+            name: Name of the stage
+
+        Yields:
+            Measurements of the stage, to record messages or bytes read
+        """
+        timing = self.get(name)
+        if not self.enabled:
+            yield timing
+            return
+
+        self._enter(timing)
+        try:
+            yield timing
+        finally:
+            self._exit()
+            timing.peak_rss = peak_rss()
+
+    @contextmanager
+    def processor(self, name: str) -> Iterator[StageTiming]:
+        """Time a processor, as part of the process stage.
+
+        Args:
+            name: Name of the processor
+
+        Yields:
+            Measurements of the process stage
+        """
+        with self.stage("process") as timing:
+            before = timing.seconds
+            yield timing
+        if self.enabled:
+            self.add_processor_time(name, timing.seconds - before)
+
+    def iterate(
+        self,
+        name: str,
+        items: Iterable[T],
+        size: Optional[Callable[[T], int]] = None,
+    ) -> Iterator[T]:
+        """Time the production of items by an iterable as a stage.
+
+        Only the time spent getting each item is counted, not the time the
+        consumer spends on it, which makes this suited to lazy readers and
+        decoders.
+
+        Args:
+            name: Name of the stage
+            items: Iterable whose production is timed
+            size: Number of messages an item stands for (1 by default)
+
+        Yields:
+            The items of the iterable
+        """
+        if not self.enabled:
+            yield from items
+            return
+
+        timing = self.get(name)
+        iterator = iter(items)
+        while True:
+            self._enter(timing)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                timing.peak_rss = peak_rss()
+                return
+            finally:
+                self._exit()
+            timing.messages += size(item) if size else 1
+            yield item
+
+    def count_bytes(self, name: str, stream: IO[bytes]) -> IO[bytes]:
+        """Count the bytes read from a stream as input of a stage.
+
+        Args:
+            name: Name of the stage reading the stream
+            stream: Binary stream to count
+
+        Returns:
+            Stream reading through the original one
+        """
+        if not self.enabled:
+            return stream
+        return io.BufferedReader(_CountingStream(stream, self.get(name)))
+
+    def add_processor_time(self, name: str, seconds: float) -> None:
+        """Add time spent in a processor, possibly measured in another process."""
+        self.processors[name] = self.processors.get(name, 0.0) + seconds
+
+    def report(self) -> Dict[str, Any]:
+        """Get the measurements as a JSON-serializable dictionary."""
+        return {
+            "command": self.command,
+            "total_seconds": time.perf_counter() - self._start,
+            "peak_rss_bytes": peak_rss(),
+            "peak_children_rss_bytes": peak_rss(children=True),
+            "stages": [timing.to_dict() for timing in self.stages.values()],
+            "processors": self.processors,
+        }
+
+    def write(self, destination: str) -> None:
+        """Write the report as a line of JSON.
+
+        Args:
+            destination: Path of the file to write, or - for stderr
+        """
+        report = json.dumps(self.report())
+        if destination == "-":
+            sys.stderr.write(report + "\n")
+        else:
+            Path(destination).write_text(report + "\n")
+
+    def dump_profile(self, path: Path) -> bool:
+        """Write the cProfile statistics of the profiled stage.
+
+        Args:
+            path: Path of the file to write, readable with pstats or snakeviz
+
+        Returns:
+            Whether the profiled stage ran, and statistics were written
+        """
+        if self.profiler is None or self.profile_stage not in self.stages:
+            return False
+        self.profiler.dump_stats(path)
+        return True
+
+    def _enter(self, timing: StageTiming) -> None:
+        self._stack.append(_Frame(timing, time.perf_counter()))
+        self._update_profiler()
+
+    def _exit(self) -> None:
+        frame = self._stack.pop()
+        elapsed = time.perf_counter() - frame.start
+        frame.timing.seconds += elapsed - frame.nested
+        if self._stack:
+            self._stack[-1].nested += elapsed
+        self._update_profiler()
+
+    def _update_profiler(self) -> None:
+        # like stage times, the profile excludes stages nested in the profiled one
+        if self.profiler is None:
+            return
+        profiling = (
+            bool(self._stack) and self._stack[-1].timing.name == self.profile_stage
+        )
+        if profiling and not self._profiling:
+            self.profiler.enable()
+        elif self._profiling and not profiling:
+            self.profiler.disable()
+        self._profiling = profiling
+
+
+class _CountingStream(io.RawIOBase):
+    def __init__(self, stream: IO[bytes], timing: StageTiming):
+        self._stream = stream
+        self._timing = timing
+        timing.bytes_read = timing.bytes_read or 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        # like read1, return what is available rather than wait for a full buffer
+        read = getattr(self._stream, "read1", self._stream.read)
+        data = read(len(buffer))
+        buffer[: len(data)] = data
+        self._timing.bytes_read = (self._timing.bytes_read or 0) + len(data)
+        return len(data)
+
+
+def peak_rss(children: bool = False) -> Optional[int]:
+    """Peak resident set size of this process or of its finished children.
+
+    Args:
+        children: Whether to measure child processes such as reader workers
+
+    Returns:
+        Peak RSS in bytes, or None on platforms without getrusage
+    """
+    try:
+        import resource  # noqa: PLC0415 not available on Windows
+    except ImportError:
+        return None
+
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    maxrss = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return maxrss if sys.platform == "darwin" else maxrss * KIB
+
+
+def input_size(path: Path) -> int:
+    """Size in bytes of a mailbox file, or of the files in a mailbox directory."""
+    if not path.is_dir():
+        return path.stat().st_size
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
@@ -0,0 +1,402 @@
+"""Wire formats used to pipe data between CLI commands.
+
+Commands exchange data either as a single JSON document (the original format,
+e.g. a JSON array of emails) or as NDJSON, with one JSON value per line. Both
+are read and written incrementally so that every stage of a pipeline only holds
+one record in memory at a time.
+
+Emails can also be exchanged in a binary format, which starts with
+BINARY_MAGIC and is made of chunks of length-prefixed records:
+
+    chunk:  <record count: u32> <payload size: u32> <records>
+    record: <byte length of each field: 5 x u32> <UTF-8 fields>
+
+Fields are stored in EMAIL_FIELDS order, with headers as a JSON object, and
+the stream ends with an empty chunk. Since every field is length-prefixed,
+readers can skip the fields they don't need without decoding them.
+"""
+
+import codecs
+import json
+import struct
+from typing import IO, Any, Collection, Dict, Iterable, Iterator, List
+
+from .processors import EmailData
+
+# fields of an email record on the wire, in output order
+EMAIL_FIELDS = ("sender", "subject", "date", "content", "headers")
+
+WIRE_FORMATS = ("json", "ndjson")
+BINARY_FORMAT = "binary"
+
+# a NUL byte can't start a JSON document, which makes the format detectable
+BINARY_MAGIC = b"\x00ESB\x01"
+BINARY_CHUNK_RECORDS = 1000  # records per chunk of binary output
+BINARY_CHUNK_BYTES = 1 << 20  # payload bytes after which a chunk is closed early
+
+READ_CHUNK_SIZE = 1 << 16  # bytes read from the input per refill
+# values up to this many characters are decoded as soon as a line of input ends
+EAGER_DECODE_SIZE = 1 << 20
+WRITE_BUFFER_SIZE = 1 << 16  # characters buffered before each write
+
+_WHITESPACE = " \t\r\n"
+_decoder = json.JSONDecoder()
+_CHUNK = struct.Struct("<II")
+_RECORD = struct.Struct(f"<{len(EMAIL_FIELDS)}I")
+
+
+def email_to_dict(email: EmailData) -> Dict[str, Any]:
+    """Convert an email into its wire representation.
+
+    Args:
+        email: Email to convert
+
+    Returns:
+        Dictionary with one entry per field in EMAIL_FIELDS
+    """
+    return {
+        "sender": email.sender,
+        "subject": email.subject,
+        "date": email.date,
+        "content": email.content,
+        "headers": email.headers,
+    }
+
+
+def email_from_dict(data: Dict[str, Any]) -> EmailData:
+    """Build an email from its wire representation.
+
+    Args:
+        data: Dictionary produced by email_to_dict
+
+    Returns:
+        EmailData object
+    """
+    return EmailData(
+        sender=data["sender"],
+        subject=data["subject"],
+        date=data["date"],
+        content=data["content"],
+        headers=data["headers"],
+    )
+
+
+def write_records(
+    records: Iterable[Any], stream: IO[str], wire_format: str = "ndjson"
+) -> None:
+    """Serialize records to a text stream without materializing the output.
+
+    Args:
+        records: Iterable of JSON-serializable records
+        stream: Text stream to write to
+        wire_format: "json" for a single JSON array, "ndjson" for one record per line
+
+    Raises:
+        ValueError: If wire_format is not supported
+    """
+    if wire_format not in WIRE_FORMATS:
+        raise ValueError(f"Unsupported wire format: {wire_format}")
+
+    as_array = wire_format == "json"
+    separator = "," if as_array else "\n"
+    buffer: List[str] = ["["] if as_array else []
+    buffered = 0
+    first = True
+
+    for record in records:
+        encoded = json.dumps(record, ensure_ascii=False)
+        if as_array and not first:
+            buffer.append(separator)
+        buffer.append(encoded)
+        if not as_array:
+            buffer.append(separator)
+        buffered += len(encoded) + 1
+        first = False
+
+        if buffered >= WRITE_BUFFER_SIZE:
+            stream.write("".join(buffer))
+            buffer.clear()
+            buffered = 0
+
+    if as_array:
+        buffer.append("]")
+    stream.write("".join(buffer))
+    stream.flush()
+
+
+def iter_json_values(stream: IO[bytes]) -> Iterator[Any]:
+    """Incrementally decode a stream of concatenated JSON values.
+
+    NDJSON is a special case of this, as is a single (possibly pretty-printed)
+    JSON document. Values are yielded as soon as they are complete.
+
+    Args:
+        stream: Binary stream containing UTF-8 encoded JSON
+
+    Yields:
+        Each top-level JSON value in the stream
+    """
+    scanner = _JsonScanner(stream)
+    while scanner.peek():
+        yield scanner.decode()
+
+
+def iter_records(stream: IO[bytes]) -> Iterator[Any]:
+    """Incrementally decode records from a JSON array or an NDJSON stream.
+
+    A top-level JSON array is unpacked and its elements yielded one by one,
+    without loading the whole array into memory.
+
+    Args:
+        stream: Binary stream containing UTF-8 encoded JSON
+
+    Yields:
+        Each record in the stream
+
+    Raises:
+        ValueError: If a JSON array in the input is malformed
+    """
+    return _iter_records(_JsonScanner(stream))
+
+
+def read_emails(
+    stream: IO[bytes], fields: Collection[str] = EMAIL_FIELDS
+) -> Iterator[EmailData]:
+    """Incrementally read emails in any wire format, detected from the input.
+
+    Args:
+        stream: Binary stream of JSON, NDJSON or binary encoded emails
+        fields: Fields that will be used; in binary input the others are
+            skipped without being decoded and left empty
+
+    Yields:
+        Each email in the stream
+    """
+    prefix = stream.read(len(BINARY_MAGIC))
+    if prefix == BINARY_MAGIC:
+        yield from iter_binary_emails(stream, fields, check_magic=False)
+        return
+
+    for record in _iter_records(_JsonScanner(stream, prefix)):
+        yield email_from_dict(record)
+
+
+def read_values(stream: IO[bytes]) -> Iterator[Any]:
+    """Incrementally decode top-level JSON values, or emails in binary input.
+
+    Args:
+        stream: Binary stream of concatenated JSON values or binary encoded emails
+
+    Yields:
+        Each top-level JSON value, or each email as returned by email_to_dict
+    """
+    prefix = stream.read(len(BINARY_MAGIC))
+    if prefix == BINARY_MAGIC:
+        for email in iter_binary_emails(stream, check_magic=False):
+            yield email_to_dict(email)
+        return
+
+    scanner = _JsonScanner(stream, prefix)
+    while scanner.peek():
+        yield scanner.decode()
+
+
+def write_binary_emails(emails: Iterable[EmailData], stream: IO[bytes]) -> None:
+    """Serialize emails to a binary stream in the binary wire format.
+
+    Args:
+        emails: Emails to write
+        stream: Binary stream to write to
+    """
+    stream.write(BINARY_MAGIC)
+    chunk: List[bytes] = []
+    count = size = 0
+    for email in emails:
+        values = [
+            _encode(email.sender),
+            _encode(email.subject),
+            _encode(email.date),
+            _encode(email.content),
+            _encode(json.dumps(email.headers, ensure_ascii=False)),
+        ]
+        chunk.append(_RECORD.pack(*map(len, values)))
+        chunk.extend(values)
+        count += 1
+        size += _RECORD.size + sum(map(len, values))
+
+        if count >= BINARY_CHUNK_RECORDS or size >= BINARY_CHUNK_BYTES:
+            stream.write(_CHUNK.pack(count, size) + b"".join(chunk))
+            chunk.clear()
+            count = size = 0
+
+    if count:
+        stream.write(_CHUNK.pack(count, size) + b"".join(chunk))
+    stream.write(_CHUNK.pack(0, 0))
+    stream.flush()
+
+
+def iter_binary_emails(
+    stream: IO[bytes],
+    fields: Collection[str] = EMAIL_FIELDS,
+    check_magic: bool = True,
+) -> Iterator[EmailData]:
+    """Incrementally read emails from the binary wire format.
+
+    Args:
+        stream: Binary stream written by write_binary_emails
+        fields: Fields to decode; the others are skipped and left empty
+        check_magic: Whether the stream still starts with BINARY_MAGIC
+
+    Yields:
+        Each email in the stream
+
+    Raises:
+        ValueError: If the input is not in the binary format or is truncated
+    """
+    if check_magic and stream.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+        raise ValueError("Input is not in the binary wire format")
+
+    wanted = [name in fields for name in EMAIL_FIELDS]
+    while True:
+        count, size = _CHUNK.unpack(_read_exactly(stream, _CHUNK.size))
+        if not count:
+            return
+
+        with memoryview(_read_exactly(stream, size)) as payload:
+            offset = 0
+            for _ in range(count):
+                lengths = _RECORD.unpack_from(payload, offset)
+                offset += _RECORD.size
+                values = []
+                for length, decode in zip(lengths, wanted):
+                    end = offset + length
+                    values.append(_decode(payload[offset:end]) if decode else "")
+                    offset = end
+
+                sender, subject, date, content, headers = values
+                yield EmailData(
+                    sender=sender,
+                    subject=subject,
+                    date=date,
+                    content=content,
+                    headers=json.loads(headers) if headers else {},
+                )
+
+
+def _encode(value: str) -> bytes:
+    # emails decoded with surrogateescape may contain lone surrogates
+    return str(value).encode("utf-8", "surrogatepass")
+
+
+def _decode(data: memoryview) -> str:
+    return str(data, "utf-8", "surrogatepass")
+
+
+def _read_exactly(stream: IO[bytes], size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated binary input")
+    return data
+
+
+def _iter_records(scanner: "_JsonScanner") -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array, or each top-level value."""
+    if scanner.peek() != "[":
+        while scanner.peek():
+            yield scanner.decode()
+        return
+
+    scanner.advance()
+    if scanner.peek() == "]":
+        scanner.advance()
+        return
+
+    while True:
+        if not scanner.peek():
+            raise ValueError("Unterminated JSON array in input")
+        yield scanner.decode()
+
+        char = scanner.peek()
+        if char == "]":
+            scanner.advance()
+            return
+        if char != ",":
+            raise ValueError("Malformed JSON array in input")
+        scanner.advance()
+
+
+class _JsonScanner:
+    """Buffered reader that decodes JSON values from a text stream."""
+
+    def __init__(self, stream: IO[bytes], prefix: bytes = b""):
+        self._stream = stream
+        # read1 returns what is available instead of waiting for a full chunk,
+        # so values piped one at a time are decoded as soon as they arrive
+        self._read = getattr(stream, "read1", stream.read)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        # bytes already read from the stream, e.g. to detect its format
+        self._buf = self._decoder.decode(prefix)
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int) -> None:
+        data = self._read(size)
+        more = self._decoder.decode(data, final=not data)
+        self._buf = self._buf[self._pos :] + more
+        self._pos = 0
+        self._eof = not data
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ("" at EOF)."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if self._eof:
+                return ""
+            self._fill(READ_CHUNK_SIZE)
+
+    def advance(self) -> None:
+        """Consume the character returned by the last peek."""
+        self._pos += 1
+
+    def decode(self) -> Any:
+        """Decode the JSON value starting at the current position."""
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+                end = -1
+
+            # a value that ends exactly at the end of the buffer may be
+            # truncated (e.g. a number), so only trust it once more input or
+            # EOF has been seen
+            if end != -1 and (end < len(self._buf) or self._eof):
+                self._pos = end
+                return value
+
+            self._read_more()
+
+    def _read_more(self) -> None:
+        # read at least as much as is already buffered so that a large value is
+        # re-decoded a logarithmic number of times, but stop at the end of a
+        # line for small values, which may be complete (such as NDJSON records
+        # written one at a time), rather than wait for input that follows them
+        target = max(READ_CHUNK_SIZE, len(self._buf) - self._pos)
+        eager = len(self._buf) - self._pos < EAGER_DECODE_SIZE
+        pieces = [self._buf[self._pos :]]
+        while target > 0:
+            data = self._read(target)
+            pieces.append(self._decoder.decode(data, final=not data))
+            target -= len(data)
+            if not data:
+                self._eof = True
+                break
+            if eager and data.endswith(b"\n"):
+                break
+        # joined once, as reads from a pipe return at most a few pages each
+        self._buf = "".join(pieces)
+        self._pos = 0
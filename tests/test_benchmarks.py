@@ -0,0 +1,56 @@
+import mailbox
+
+from click.testing import CliRunner
+
+from benchmarks.__main__ import main
+from benchmarks.suite import find_regressions, make_stages
+from benchmarks.synthetic import MailboxSpec, generate_mbox
+
+
+def test_generate_mbox_is_deterministic(tmp_path):
+    """test that equal specs give identical, parseable mailboxes"""
+    spec = MailboxSpec(messages=50, body_size=300, attachment_size=500)
+    first, second = tmp_path / "first.mbox", tmp_path / "second.mbox"
+    size = generate_mbox(first, spec)
+    generate_mbox(second, spec)
+
+    assert size == first.stat().st_size
+    assert first.read_bytes() == second.read_bytes()
+    assert len(mailbox.mbox(str(first))) == spec.messages
+
+    generate_mbox(second, MailboxSpec(messages=50, body_size=300, seed=1))
+    assert first.read_bytes() != second.read_bytes()
+
+
+def test_stages_handle_every_message(tmp_path):
+    """test that each benchmark stage processes the whole mailbox"""
+    path = tmp_path / "synthetic.mbox"
+    generate_mbox(path, MailboxSpec(messages=20, body_size=200))
+
+    stages = make_stages(path)
+    assert list(stages) == ["read", "stats", "classify", "format"]
+    assert all(stage() == 20 for stage in stages.values())
+
+
+def test_find_regressions():
+    """test that only stages slower than the threshold are reported"""
+    baseline = {"stages": {"read": {"messages_per_sec": 1000.0}}}
+    slower = {"stages": {"read": {"messages_per_sec": 850.0}}}
+    much_slower = {"stages": {"read": {"messages_per_sec": 700.0}}}
+
+    assert find_regressions(slower, baseline, 0.2) == []
+    assert len(find_regressions(much_slower, baseline, 0.2)) == 1
+
+
+def test_benchmark_command(tmp_path):
+    """test a small benchmark run saving and comparing a baseline"""
+    baseline = tmp_path / "baseline.json"
+    options = ["-n", "20", "--body-size", "200", "--repeat", "1"]
+    runner = CliRunner()
+
+    result = runner.invoke(main, [*options, "--baseline", baseline, "--save-baseline"])
+    assert result.exit_code == 0
+    assert baseline.exists()
+
+    result = runner.invoke(main, [*options, "--baseline", baseline, "--threshold", "1"])
+    assert result.exit_code == 0
@@ -0,0 +1,121 @@
+import json
+import mailbox
+import os
+from email.message import EmailMessage
+
+import pytest
+
+from email_scraper.cache import MemoCache, ResultCache, mbox_fingerprint
+from email_scraper.processors import Pipeline
+from email_scraper.processors.classifier import EmailClassifier
+from email_scraper.processors.example import ExampleProcessor
+from email_scraper.readers.mbox import MboxReader
+
+
+class CountingReader(MboxReader):
+    """sequential mbox reader that counts how often it is used."""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def read(self, path):
+        self.reads += 1
+        return super().read(path)
+
+
+@pytest.fixture
+def sample_mbox(tmp_path):
+    """create a temporary mbox file with a few messages."""
+    mbox_path = tmp_path / "cache.mbox"
+    mbox = mailbox.mbox(str(mbox_path))
+    for i in range(3):
+        msg = EmailMessage()
+        msg["From"] = f"sender{i}@example.com"
+        msg["Subject"] = "Job offer" if i else "Hello"
+        msg["Date"] = f"Mon, 0{i + 2} Jan 2023 10:00:00 +0000"
+        msg.set_content(f"Body of message {i}")
+        mbox.add(msg)
+    mbox.close()
+    return mbox_path
+
+
+def test_pipeline_reuses_cached_results(sample_mbox, tmp_path):
+    """test that cached processors are skipped and the mbox is not reread."""
+    cache = ResultCache(tmp_path / "cache")
+    reader = CountingReader()
+    processors = [ExampleProcessor(), EmailClassifier()]
+
+    first = Pipeline(processors, reader=reader, cache=cache).process(sample_mbox)
+    second = Pipeline(processors, reader=reader, cache=cache).process(sample_mbox)
+    assert reader.reads == 1
+    assert json.loads(json.dumps(first)) == second
+    assert list(second) == ["example", "classifier"]
+
+    # a different config is a different entry
+    approximate = [ExampleProcessor(approximate=True), EmailClassifier()]
+    Pipeline(approximate, reader=reader, cache=cache).process(sample_mbox)
+    assert reader.reads == 2
+
+    with open(sample_mbox, "a") as f:
+        f.write("From someone\nSubject: appended\n\nbody\n")
+    results = Pipeline(processors, reader=reader, cache=cache).process(sample_mbox)
+    assert results["example"]["total_messages"] == 4
+
+
+def test_fingerprint_samples_contents(tmp_path):
+    """test that the fingerprint changes with contents, size and mtime."""
+    path = tmp_path / "big.mbox"
+    data = bytearray(b"a" * 5_000_000)
+    path.write_bytes(data)
+    original = mbox_fingerprint(path)
+    stat = path.stat()
+
+    data[-1:] = b"b"
+    path.write_bytes(data)
+    assert mbox_fingerprint(path) != original
+
+    # restoring the contents and mtime restores the fingerprint
+    data[-1:] = b"a"
+    path.write_bytes(data)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert mbox_fingerprint(path) == original
+
+
+def test_cache_evicts_least_recently_used(sample_mbox, tmp_path):
+    """test that the cache stays under its size cap, dropping old entries."""
+    first, second, third = (ExampleProcessor(capacity=n) for n in range(3))
+    for processor in (first, second, third):
+        processor.approximate = True  # so that capacity is part of the config
+
+    entry_size = len(json.dumps({"n": 0}))
+    cache = ResultCache(tmp_path / "cache", max_bytes=2 * entry_size)
+    fingerprint = cache.fingerprint(sample_mbox)
+    cache.put(fingerprint, first, {"n": 1})
+    cache.put(fingerprint, second, {"n": 2})
+
+    # using the first entry makes the second the least recently used
+    assert cache.get(fingerprint, first) == {"n": 1}
+    cache.put(fingerprint, third, {"n": 3})
+    assert cache.get(fingerprint, first) == {"n": 1}
+    assert cache.get(fingerprint, second) is None
+    assert cache.get(fingerprint, third) == {"n": 3}
+
+
+def test_memo_cache_keeps_recent_entries(tmp_path):
+    """test that memos persist their most recently used entries per config."""
+    memo = MemoCache(EmailClassifier(), tmp_path, max_entries=2)
+    for key in "abc":
+        memo.put(key, {"key": key})
+    assert memo.get("a") == {"key": "a"}
+    memo.save()
+
+    reloaded = MemoCache(EmailClassifier(), tmp_path)
+    assert reloaded.get("a") == {"key": "a"}
+    assert reloaded.get("b") is None
+    assert reloaded.get("c") == {"key": "c"}
+
+    class Stricter(EmailClassifier):
+        CONFIDENCE_THRESHOLD = 0.5
+
+    assert MemoCache(Stricter(), tmp_path).entries == {}
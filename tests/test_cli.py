@@ -0,0 +1,336 @@
+import gzip
+import io
+import os
+import json
+import mailbox
+import select
+import subprocess
+import sys
+from email.message import EmailMessage
+
+import pytest
+from click.testing import CliRunner
+
+from email_scraper.cache import CACHE_DIR_ENV
+from email_scraper.cli import main
+from email_scraper.wire import iter_json_values
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """keep cached results of the run command out of the user cache."""
+    directory = tmp_path / "cache"
+    monkeypatch.setenv(CACHE_DIR_ENV, str(directory))
+    return directory
+
+
+@pytest.fixture
+def sample_mbox(tmp_path):
+    """create a temporary mbox file with a few messages."""
+    mbox_path = tmp_path / "cli.mbox"
+    mbox = mailbox.mbox(str(mbox_path))
+    for i, subject in enumerate(["Thank you for applying", "Job offer", "Hello"]):
+        msg = EmailMessage()
+        msg.add_header("from", f"sender{i % 2}@example.com")
+        msg.add_header("subject", subject)
+        msg.add_header("date", f"Mon, 0{i + 2} Jan 2023 10:00:00 +0000")
+        msg.set_content(f"Body of message {i}")
+        mbox.add(msg)
+    mbox.close()
+    return mbox_path
+
+
+@pytest.mark.parametrize("wire_format", ["json", "ndjson", "binary"])
+def test_read_stats_pipeline(sample_mbox, wire_format):
+    """test piping read output into stats in every wire format."""
+    runner = CliRunner()
+    read = runner.invoke(main, ["read", str(sample_mbox), "-o", wire_format])
+    assert read.exit_code == 0
+
+    stats = runner.invoke(main, ["stats"], input=read.stdout_bytes)
+    assert stats.exit_code == 0
+    results = json.loads(stats.stdout)
+    assert results["total_messages"] == 3
+    assert results["unique_senders"] == 2
+
+
+def test_classify_ndjson_and_format(sample_mbox):
+    """test streaming classification output through the format command."""
+    runner = CliRunner()
+    read = runner.invoke(main, ["read", str(sample_mbox), "-o", "ndjson"])
+
+    classify = runner.invoke(main, ["classify", "-o", "ndjson"], input=read.stdout)
+    assert classify.exit_code == 0
+    lines = classify.stdout.splitlines()
+    assert len(lines) == 3
+    assert json.loads(lines[0])["category"] == "Application confirmation"
+
+    formatted = runner.invoke(main, ["format", "-f", "json"], input=classify.stdout)
+    assert formatted.exit_code == 0
+    documents = list(iter_json_values(io.BytesIO(formatted.stdout_bytes)))
+    assert [d["subject"] for d in documents] == [
+        "Thank you for applying",
+        "Job offer",
+        "Hello",
+    ]
+
+
+def test_classify_workers_and_memo(sample_mbox, cache_dir):
+    """test that classify gives the same results with workers and memoized texts."""
+    runner = CliRunner()
+    read = runner.invoke(main, ["read", str(sample_mbox), "-o", "ndjson"])
+    expected = runner.invoke(main, ["classify", "--no-cache"], input=read.stdout)
+    assert expected.exit_code == 0
+    assert not cache_dir.exists()
+
+    for args in (["-w", "2"], ["-w", "2"], []):
+        result = runner.invoke(main, ["classify", *args], input=read.stdout)
+        assert result.exit_code == 0
+        assert json.loads(result.stdout) == json.loads(expected.stdout)
+    assert len(list(cache_dir.glob("memo-*.json"))) == 1
+
+
+def test_classify_binary_input(sample_mbox):
+    """test that classify reads binary input like JSON input."""
+    runner = CliRunner()
+    read_json = runner.invoke(main, ["read", str(sample_mbox)])
+    read_binary = runner.invoke(main, ["read", str(sample_mbox), "-o", "binary"])
+    assert len(read_binary.stdout_bytes) < len(read_json.stdout_bytes)
+
+    expected = runner.invoke(main, ["classify"], input=read_json.stdout)
+    result = runner.invoke(main, ["classify"], input=read_binary.stdout_bytes)
+    assert result.exit_code == 0
+    assert json.loads(result.stdout) == json.loads(expected.stdout)
+
+    formatted = runner.invoke(main, ["format"], input=read_binary.stdout_bytes)
+    documents = list(iter_json_values(io.BytesIO(formatted.stdout_bytes)))
+    assert [d["subject"] for d in documents] == [
+        "Thank you for applying",
+        "Job offer",
+        "Hello",
+    ]
+
+
+def test_run_matches_piped_commands(sample_mbox, tmp_path):
+    """test that run gives the same results as piping read into processors."""
+    runner = CliRunner()
+    read = runner.invoke(main, ["read", str(sample_mbox)])
+    stats = json.loads(runner.invoke(main, ["stats"], input=read.stdout).stdout)
+    classify = json.loads(runner.invoke(main, ["classify"], input=read.stdout).stdout)
+
+    output = tmp_path / "results.json"
+    args = ["run", str(sample_mbox), "-p", "statistics", "-p", "classifier"]
+    result = runner.invoke(main, [*args, "-o", str(output)])
+    assert result.exit_code == 0
+
+    results = json.loads(output.read_text())
+    assert results == {"example": stats, "classifier": classify}
+
+
+def test_run_caches_results(sample_mbox, cache_dir, tmp_path):
+    """test that run reuses cached results unless --no-cache is given."""
+    runner = CliRunner()
+    first = runner.invoke(main, ["run", str(sample_mbox), "-p", "classifier"])
+    assert first.exit_code == 0
+    assert len(list(cache_dir.glob("*.json"))) == 1
+
+    # an unparseable file with the same size and mtime still gets a new fingerprint
+    stat = sample_mbox.stat()
+    sample_mbox.write_bytes(b"x" * stat.st_size)
+    os.utime(sample_mbox, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    changed = runner.invoke(main, ["run", str(sample_mbox), "-p", "classifier"])
+    assert json.loads(changed.stdout) != json.loads(first.stdout)
+
+    uncached = runner.invoke(main, ["run", str(sample_mbox), "--no-cache"])
+    assert uncached.exit_code == 0
+    assert len(list(cache_dir.glob("*.json"))) == 2
+
+
+def test_run_indexed_reader_bypasses_cache(sample_mbox, cache_dir):
+    """test that results of the indexed reader aren't shared with the full reader."""
+    runner = CliRunner()
+    args = ["run", str(sample_mbox), "-p", "statistics"]
+    totals = []
+    for reader in ["mbox", "indexed", "indexed", "mbox"]:
+        result = runner.invoke(main, [*args, "-r", reader, "-f", "json"])
+        assert result.exit_code == 0
+        totals.append(json.loads(result.stdout)["example"]["total_messages"])
+
+    assert totals == [3, 3, 0, 3]
+    assert len(list(cache_dir.glob("*.json"))) == 1
+
+
+def test_windows_command(sample_mbox):
+    """test counting emails read from stdin per weekly window."""
+    runner = CliRunner()
+    read = runner.invoke(main, ["read", str(sample_mbox), "-o", "binary"])
+
+    result = runner.invoke(
+        main, ["windows", "--window", "1w", "--rolling", "0"], input=read.stdout_bytes
+    )
+    assert result.exit_code == 0
+    results = json.loads(result.stdout)
+    assert "rolling" not in results
+    [window] = results["windows"]
+    assert window["start"] == "2023-01-02T00:00:00+00:00"
+    assert window["messages"] == 3
+    assert window["top_senders"] == {"sender0@example.com": 2, "sender1@example.com": 1}
+    assert window["categories"] == {
+        "Application confirmation": 1,
+        "Offer": 1,
+        "Other": 1,
+    }
+
+    invalid = runner.invoke(
+        main, ["windows", "--window", "1y"], input=read.stdout_bytes
+    )
+    assert invalid.exit_code == 2
+
+
+def test_read_header_filters(sample_mbox):
+    """test that read only outputs the messages matching the header filters."""
+    runner = CliRunner()
+    args = ["read", str(sample_mbox), "-o", "ndjson"]
+    for extra, expected in [
+        (["--since", "2023-01-03"], ["Job offer", "Hello"]),
+        (["--until", "2023-01-03T10:00:00"], ["Thank you for applying"]),
+        (["--from", "sender1@example.com"], ["Job offer"]),
+        (["--subject-match", "^(job|hello)", "--from", "sender0"], ["Hello"]),
+    ]:
+        result = runner.invoke(main, [*args, *extra])
+        assert result.exit_code == 0
+        subjects = [json.loads(line)["subject"] for line in result.stdout.splitlines()]
+        assert subjects == expected
+
+    invalid = runner.invoke(main, [*args, "--subject-match", "("])
+    assert invalid.exit_code == 2
+
+
+def test_read_several_mailboxes(sample_mbox, tmp_path):
+    """test that read concatenates or merges several mailboxes."""
+    other = tmp_path / "other.mbox"
+    mbox = mailbox.mbox(str(other))
+    msg = EmailMessage()
+    msg.add_header("from", "sender9@example.com")
+    msg.add_header("subject", "Earliest")
+    msg.add_header("date", "Sun, 01 Jan 2023 10:00:00 +0000")
+    mbox.add(msg)
+    mbox.close()
+
+    runner = CliRunner()
+    args = ["read", str(sample_mbox), str(tmp_path / "oth*.mbox"), "-o", "ndjson"]
+    for extra, first in [([], "Thank you for applying"), (["--by-date"], "Earliest")]:
+        result = runner.invoke(main, [*args, "-w", "2", *extra])
+        assert result.exit_code == 0
+        subjects = [json.loads(line)["subject"] for line in result.stdout.splitlines()]
+        assert len(subjects) == 4
+        assert subjects[0] == first
+
+
+def test_timings_report(sample_mbox, tmp_path):
+    """test writing a timings report of the stages of a command."""
+    report_path = tmp_path / "timings.json"
+    runner = CliRunner()
+    result = runner.invoke(
+        main, ["run", str(sample_mbox), "--no-cache", "--timings", str(report_path)]
+    )
+    assert result.exit_code == 0
+    assert json.loads(result.stdout)["example"]["total_messages"] == 3
+
+    report = json.loads(report_path.read_text())
+    assert report["command"] == "run"
+    assert [stage["name"] for stage in report["stages"]] == [
+        "read",
+        "process",
+        "format",
+    ]
+    assert "example" in report["processors"]
+
+
+def test_format_classifications_as_csv(sample_mbox):
+    """test streaming classifications through the csv formatter."""
+    runner = CliRunner()
+    read = runner.invoke(main, ["read", str(sample_mbox), "-o", "ndjson"])
+    classify = runner.invoke(main, ["classify", "-o", "ndjson"], input=read.stdout)
+
+    formatted = runner.invoke(main, ["format", "-f", "csv"], input=classify.stdout)
+    assert formatted.exit_code == 0
+    lines = formatted.stdout.splitlines()
+    assert lines[0] == "subject,category,confidence,matched_keywords"
+    assert len(lines) == 4
+
+
+# writes a watch-like update, then a second one once a line is written to its stdin
+SLOW_PRODUCER = """
+import json, sys
+for subject in ["First", "Second"]:
+    record = {"subject": subject, "category": "Other", "confidence": 1.0,
+              "matched_keywords": []}
+    print(json.dumps({"classifier": {"classifications": [record]}}), flush=True)
+    if subject == "First":
+        sys.stdin.readline()
+"""
+
+
+@pytest.mark.parametrize(
+    "args", [["-f", "ndjson"], ["-f", "csv"], ["-f", "json", "--timings=-"]]
+)
+def test_format_streams_values_from_a_pipe(args):
+    """test that format writes each piped value before the producer exits."""
+    producer = subprocess.Popen(
+        [sys.executable, "-c", SLOW_PRODUCER],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+    consumer = subprocess.Popen(
+        [sys.executable, "-m", "email_scraper.cli", "format", *args],
+        stdin=producer.stdout,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    producer.stdout.close()
+    try:
+        ready, _, _ = select.select([consumer.stdout], [], [], 10)
+        assert ready, "nothing was written while the producer was still running"
+        assert producer.poll() is None
+        first = os.read(consumer.stdout.fileno(), 1 << 16).decode()
+        assert "First" in first
+        assert "Second" not in first
+
+        producer.stdin.write(b"\n")
+        producer.stdin.close()
+        rest, _ = consumer.communicate(timeout=10)
+        assert "Second" in rest
+        assert consumer.returncode == 0
+    finally:
+        producer.kill()
+        consumer.kill()
+
+
+def test_read_compressed_with_workers(sample_mbox, tmp_path):
+    """test that workers don't replace the compressed reader with the parallel one."""
+    compressed = tmp_path / "cli.mbox.gz"
+    compressed.write_bytes(gzip.compress(sample_mbox.read_bytes()))
+
+    runner = CliRunner()
+    for reader in ["compressed", "auto"]:
+        args = ["read", str(compressed), "-r", reader, "-w", "2", "-o", "ndjson"]
+        result = runner.invoke(main, args)
+        assert result.exit_code == 0
+        assert len(result.stdout.splitlines()) == 3
+
+
+def test_read_indexed_rejects_workers(sample_mbox):
+    """test that the indexed reader refuses workers rather than skip its index."""
+    runner = CliRunner()
+    args = ["read", str(sample_mbox), "-r", "indexed", "-o", "ndjson"]
+    result = runner.invoke(main, [*args, "-w", "2"])
+    assert result.exit_code == 2
+    assert "--workers" in result.output
+    assert not sample_mbox.with_name("cli.mbox.idx").exists()
+
+    result = runner.invoke(main, args)
+    assert result.exit_code == 0
+    assert len(result.stdout.splitlines()) == 3
+    assert sample_mbox.with_name("cli.mbox.idx").exists()
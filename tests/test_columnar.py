@@ -0,0 +1,109 @@
+import mailbox
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from email_scraper.processors import EmailData, Pipeline
+from email_scraper.processors.activity import ActivityProcessor
+from email_scraper.processors.columnar import EmailBatch, StringColumn
+from email_scraper.readers.parallel import ParallelMboxReader
+
+DATES = [
+    "Mon, 02 Jan 2023 23:30:00 -0200",
+    "Tue, 03 Jan 2023 00:15:00 +0000",
+    "Tue, 03 Jan 2023 09:00:00 -0000",
+    "not a date",
+    "",
+]
+
+
+@pytest.fixture
+def sample_emails():
+    """create emails with a mix of senders, timezones and bad dates."""
+    return [
+        EmailData(
+            sender=f"sender{i % 3}@example.com" if i % 4 else "",
+            subject=f"Subject {i % 2}",
+            date=DATES[i % len(DATES)],
+            content="",
+            headers={},
+        )
+        for i in range(40)
+    ]
+
+
+def test_string_column_encoding():
+    """test that strings are dictionary-encoded in order of appearance."""
+    column = StringColumn.encode(["b", "a", "b", "c", "b"])
+    assert column.values == ["b", "a", "c"]
+    assert column.codes.tolist() == [0, 1, 0, 2, 0]
+    assert column.counts() == {"b": 3, "a": 1, "c": 1}
+
+
+def test_email_batch_columns(sample_emails):
+    """test that timestamps and offsets reproduce the parsed dates."""
+    batch = EmailBatch.from_emails(sample_emails)
+    assert len(batch) == len(sample_emails)
+
+    for row, email in enumerate(sample_emails):
+        parsed = email.parsed_date
+        assert bool(batch.dated[row]) == (parsed is not None)
+        if parsed is None:
+            with pytest.raises(ValueError):
+                batch.datetime_at(row)
+            continue
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        assert batch.datetime_at(row) == parsed
+        assert batch.datetime_at(row).utcoffset() == parsed.utcoffset()
+
+
+def test_activity_matches_python_counts(sample_emails):
+    """test vectorized counts against a plain loop over the emails."""
+    senders = Counter(e.sender for e in sample_emails if e.sender)
+    days: Counter[str] = Counter()
+    hours: Counter[str] = Counter()
+    for email in sample_emails:
+        if parsed := email.parsed_date:
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            utc = parsed.astimezone(timezone.utc)
+            days[utc.date().isoformat()] += 1
+            hours[f"{utc.hour:02d}"] += 1
+
+    results = ActivityProcessor().process(sample_emails)
+
+    assert results["total_messages"] == len(sample_emails)
+    assert results["messages_per_sender"] == dict(senders)
+    assert results["messages_per_day"] == dict(sorted(days.items()))
+    assert results["messages_per_hour"] == {
+        f"{hour:02d}": hours[f"{hour:02d}"] for hour in range(24)
+    }
+
+
+def test_columnar_pipeline_with_parallel_reader(tmp_path, sample_emails):
+    """test that partial counts over separate chunks merge correctly."""
+    base = datetime(2023, 1, 1, tzinfo=timezone(timedelta(hours=-7)))
+    path = tmp_path / "test.mbox"
+    mbox = mailbox.mbox(str(path))
+    for i in range(50):
+        msg = EmailMessage()
+        msg["From"] = f"sender{i % 7}@example.com"
+        msg["Subject"] = f"Subject {i}"
+        msg["Date"] = (base + timedelta(hours=5 * i)).strftime(
+            "%a, %d %b %Y %H:%M:%S %z"
+        )
+        msg.set_content("body\n" * 50)
+        mbox.add(msg)
+    mbox.close()
+
+    emails = list(mailbox.mbox(str(path)))
+    expected = ActivityProcessor().process([EmailData.from_message(m) for m in emails])
+
+    reader = ParallelMboxReader(workers=2)
+    results = Pipeline([ActivityProcessor()], reader=reader, chunk_size=8).process(path)
+    assert results["activity"] == expected
@@ -1,7 +1,13 @@
+import csv
+import io
 import json
 
 import pytest
 
+from email_scraper.formatters.classifications import (
+    CsvClassificationFormatter,
+    NdjsonClassificationFormatter,
+)
 from email_scraper.formatters.json import JsonFormatter
 
 
@@ -42,3 +48,67 @@ def test_json_formatter_save(sample_results, tmp_path):
     with open(output_path) as f:
         saved_data = json.load(f)
     assert saved_data == sample_results
+
+
+@pytest.fixture
+def classifications():
+    """create sample classifier results."""
+    return [
+        {
+            "subject": "Job offer",
+            "category": "Offer",
+            "confidence": 1.0,
+            "matched_keywords": ["offer", "compensation"],
+        },
+        {
+            "subject": "Hello, again",
+            "category": "Human Review Needed",
+            "confidence": 0.0,
+            "matched_keywords": [],
+        },
+    ]
+
+
+def test_json_formatter_streams_chunks(sample_results):
+    """test that the json formatter writes the same document it formats."""
+    formatter = JsonFormatter()
+    assert len(list(formatter.iter_chunks(sample_results))) > 1
+
+    stream = io.StringIO()
+    formatter.write(sample_results, stream)
+    assert stream.getvalue() == formatter.format(sample_results)
+    assert stream.getvalue() == json.dumps(sample_results, indent=2) + "\n"
+
+
+def test_csv_formatter(classifications):
+    """test csv output of classifier results, alone or with other processors."""
+    formatter = CsvClassificationFormatter()
+    output = formatter.format({"classifications": classifications})
+    assert formatter.format({"classifier": {"classifications": classifications}}) == (
+        output
+    )
+
+    rows = list(csv.DictReader(io.StringIO(output)))
+    assert [row["subject"] for row in rows] == ["Job offer", "Hello, again"]
+    assert rows[0]["matched_keywords"] == "offer;compensation"
+    assert rows[1]["confidence"] == "0.0"
+
+
+def test_classification_formatters_write_one_table(classifications):
+    """test that streamed classification records form a single table."""
+    stream = io.StringIO()
+    CsvClassificationFormatter().write_values(iter(classifications), stream)
+    lines = stream.getvalue().splitlines()
+    assert lines[0] == "subject,category,confidence,matched_keywords"
+    assert len(lines) == 3
+
+    stream = io.StringIO()
+    NdjsonClassificationFormatter().write_values(iter(classifications), stream)
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert records == classifications
+
+
+def test_classification_formatter_requires_classifications(sample_results):
+    """test that results without classifications are rejected."""
+    with pytest.raises(ValueError):
+        CsvClassificationFormatter().format(sample_results)
@@ -0,0 +1,65 @@
+import subprocess
+import sys
+from importlib import metadata
+
+import pytest
+
+from email_scraper import plugins
+from email_scraper.formatters.json import JsonFormatter
+from email_scraper.plugins import FORMATTERS, PROCESSORS, READERS, PluginSpec, Registry
+
+# modules that commands import when they need them, not at startup
+DEFERRED_MODULES = (
+    "rich",
+    "mailbox",
+    "numpy",
+    "concurrent.futures",
+    "importlib.metadata",
+    "email.message",
+    "email_scraper.cache",
+    "email_scraper.processors.classifier",
+    "email_scraper.formatters.json",
+    "email_scraper.readers.sources",
+)
+
+
+@pytest.mark.parametrize("registry", [PROCESSORS, FORMATTERS, READERS])
+def test_builtin_descriptions_match_classes(registry):
+    """test that descriptions known up front are those of the classes."""
+    for name in registry:
+        assert registry.describe(name) == registry[name].description
+
+
+def test_registry_imports_components_when_used(monkeypatch):
+    """test that components are imported on first lookup, and plugins discovered."""
+    entry_point = metadata.EntryPoint(
+        "plugin", "email_scraper.formatters.json:JsonFormatter", "test.group"
+    )
+    monkeypatch.setattr(metadata, "entry_points", lambda group: [entry_point])
+    registry = Registry("test.group")
+    registry.add("lazy", PluginSpec("email_scraper.no_such_module:Missing", "Lazy"))
+    registry.add("absent", PluginSpec("x:X", "Absent", requires=("no_such_module",)))
+
+    assert "lazy" in registry
+    assert registry.describe("lazy") == "Lazy"
+    with pytest.raises(ImportError):
+        registry["lazy"]
+
+    assert "absent" not in registry
+    assert list(registry) == ["lazy", "plugin"]
+    assert registry.describe("plugin") == JsonFormatter.description
+    assert registry["plugin"] is JsonFormatter
+
+    registry["lazy"] = JsonFormatter
+    assert registry["lazy"] is JsonFormatter
+    assert plugins.FORMATTERS["json"] is JsonFormatter
+
+
+def test_cli_defers_heavy_imports():
+    """test that importing the cli leaves components and slow modules unimported."""
+    code = "import sys, email_scraper.cli; print('\\n'.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    imported = set(result.stdout.splitlines())
+    assert imported.isdisjoint(DEFERRED_MODULES)
@@ -1,13 +1,23 @@
 import mailbox
-from datetime import datetime, timedelta
+import re
+import sys
+from datetime import datetime, timedelta, timezone
 from email.message import EmailMessage
-from email.utils import format_datetime
+from email.parser import BytesParser
+from email.policy import compat32
+from email.utils import format_datetime, parsedate_to_datetime
 
 import pytest
 
+from email_scraper.cache import MemoCache
 from email_scraper.processors import EmailData, Pipeline
+from email_scraper.processors.body import ContentOptions, extract_body
 from email_scraper.processors.classifier import EmailClassifier
+from email_scraper.processors.compact import CompactEmailData
+from email_scraper.processors.dates import parse_date
 from email_scraper.processors.example import ExampleProcessor
+from email_scraper.processors.keywords import KeywordMatcher
+from email_scraper.processors.windows import WindowProcessor, parse_duration
 
 
 @pytest.fixture
@@ -96,6 +106,34 @@ def test_pipeline_processing(sample_mbox):
     assert (end_date - start_date) == timedelta(days=1)
 
 
+def test_pipeline_watch_streams_deltas(sample_mbox):
+    """test that watching an mbox reports new classifications and running statistics."""
+    pipeline = Pipeline([ExampleProcessor(), EmailClassifier()])
+    updates = pipeline.watch(sample_mbox, interval=0.01)
+
+    first = next(updates)
+    assert first["update"] == {"messages": 2, "total_messages": 2, "rebuilt": False}
+    assert len(first["classifier"]["classifications"]) == 2
+
+    mbox = mailbox.mbox(str(sample_mbox))
+    msg = EmailMessage()
+    msg.add_header("from", "sender1@example.com")
+    msg.add_header("subject", "Job offer")
+    mbox.add(msg)
+    mbox.close()
+
+    second = next(updates)
+    assert second["update"] == {"messages": 1, "total_messages": 3, "rebuilt": False}
+    assert second["example"]["top_senders"]["sender1@example.com"] == 2
+    assert [c["category"] for c in second["classifier"]["classifications"]] == ["Offer"]
+
+    sample_mbox.write_bytes(sample_mbox.read_bytes().replace(b"Job offer", b"Job"))
+    third = next(updates)
+    assert third["update"] == {"messages": 3, "total_messages": 3, "rebuilt": True}
+    assert third["example"]["total_messages"] == 3
+    updates.close()
+
+
 def test_email_data_creation(sample_dates):
     """test emaildata creation and date parsing."""
     date1, _ = sample_dates
@@ -252,3 +290,293 @@ def test_classify_processor(sample_classify_emails):
             "chat about your application",
         ]
     )
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_classify_batches_with_memo(sample_classify_emails, tmp_path, workers):
+    """test that pooled, memoized classification matches serial classification."""
+    classifier = EmailClassifier()
+    # templated copies differing only in case share a memo entry
+    shouted = EmailData(
+        sender="x@example.com",
+        subject=sample_classify_emails[0].subject.upper(),
+        date="",
+        content=sample_classify_emails[0].content.upper(),
+        headers={},
+    )
+    emails = [*sample_classify_emails, shouted, *sample_classify_emails]
+    expected = list(classifier.iter_classifications(emails))
+
+    memo = MemoCache(classifier, tmp_path)
+    assert list(classifier.iter_classifications(emails, workers, memo)) == expected
+    assert (memo.hits, memo.misses) == (0, 6)
+    memo.save()
+
+    memo = MemoCache(classifier, tmp_path)
+    assert list(classifier.iter_classifications(emails, workers, memo)) == expected
+    assert (memo.hits, memo.misses) == (6, 0)
+
+
+def test_keyword_matcher_matches_re_search():
+    """test that the single-pass matcher agrees with one re.search per keyword."""
+    keywords = [
+        "interview",
+        "interview request",
+        "inter",
+        "codeSignal",
+        "CODESIGNAL",
+        "offer",
+        "job offer",
+        "sk",
+        "café",
+    ]
+    texts = [
+        "",
+        "Your INTERVIEW request for the job OFFER",
+        "Try CodeSignal: \u0131nterv\u0131ew \u212a \u017fk \u0130nter",
+        "Interviewing at the café, CAFÉ",
+        "inte rview jo b offe",
+    ]
+    matcher = KeywordMatcher(keywords)
+
+    for text in texts:
+        expected = {k for k in keywords if re.search(re.escape(k), text, re.IGNORECASE)}
+        assert matcher.find(text) == expected, text
+
+
+def test_parse_date_matches_parsedate_to_datetime():
+    """test that the date fast path agrees with the standard parser."""
+    dates = [
+        "Mon, 02 Jan 2023 10:00:00 +0000",
+        "Mon, 02 Jan 2023 10:00:00 -0000",
+        "2 jan 2023 10:00 +0530 (IST)",
+        "Tue,3 FEB 2023 23:59:59 -0800",
+        "  Wed, 31 Dec 1999 01:02:03 +0000 extra tokens",
+        "Wed, 31 Feb 2023 01:02:03 +0000",
+        "Wed, 01 Mar 2023 25:00:00 +0000",
+        "Wed, 01 Mar 2023 01:00:00 +2400",
+        "Wed, 01 Mar 2023 01:00:00 +0000(UTC)",
+        "Wed, 01 Mar 2023 01:00:00 GMT",
+        "Wed, 01 Mar 23 01:00:00 +0100",
+        "Wed, 01 March 2023 01:00:00 +0100",
+        "not a date",
+    ]
+
+    for value in dates:
+        try:
+            expected = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            expected = None
+        result = parse_date(value)
+        assert result == expected, value
+        assert getattr(result, "tzinfo", None) == getattr(expected, "tzinfo", None)
+
+
+def test_parsed_date_is_cached():
+    """test that an email parses its date once and notices a new date."""
+    email = EmailData(
+        sender="a@example.com",
+        subject="Hi",
+        date="Mon, 02 Jan 2023 10:00:00 +0000",
+        content="",
+        headers={},
+    )
+    assert email.parsed_date is email.parsed_date
+
+    email.date = "Tue, 03 Jan 2023 10:00:00 +0000"
+    assert email.parsed_date.day == 3
+
+    email.date = ""
+    assert email.parsed_date is None
+
+
+def test_compact_email_data_is_lazy(sample_mbox):
+    """test that compact emails decode lazily and release their source."""
+    mbox = mailbox.mbox(str(sample_mbox))
+    messages = list(mbox)
+    mbox.close()
+
+    emails = [CompactEmailData.from_message(msg) for msg in messages]
+    results = ExampleProcessor().process(emails)
+    assert results["total_messages"] == 2
+    assert all(e._content is None and e._headers is None for e in emails)
+
+    expected = EmailData.from_message(messages[0])
+    compact = emails[0]
+    assert compact.content == expected.content
+    assert compact._source is not None
+    assert compact.headers == expected.headers
+    assert compact._source is None
+    assert compact.raw_message is None
+    assert not hasattr(compact, "__dict__")
+
+    copy = CompactEmailData.from_email(expected)
+    assert copy.sender is sys.intern(str(expected.sender))
+    assert copy.raw_message is messages[0]
+
+
+@pytest.mark.parametrize(
+    "processor_cls", [ExampleProcessor, EmailClassifier, WindowProcessor]
+)
+def test_incremental_merge_matches_process(processor_cls, sample_classify_emails):
+    """test that merging partial states over shards gives the same results."""
+    processor = processor_cls()
+    emails = sample_classify_emails
+
+    partials = [
+        processor.update_batch(processor.create_state(), emails[i : i + 2])
+        for i in range(0, len(emails), 2)
+    ]
+    state = processor.create_state()
+    for partial in partials:
+        state = processor.merge(state, partial)
+
+    assert processor.finalize(state) == processor_cls().process(emails)
+
+
+def dated_email(day, hour=10, sender="a@example.com", subject="Hello"):
+    """create an email sent on a day of January 2024 (the 1st is a Monday)."""
+    date = format_datetime(datetime(2024, 1, day, hour, tzinfo=timezone.utc))
+    return EmailData(sender, subject, date, "", {})
+
+
+def test_window_processor_counts_windows():
+    """test tumbling and rolling window counts over out-of-order dates."""
+    emails = [
+        dated_email(3, subject="Job offer"),
+        dated_email(1, sender="b@example.com"),
+        dated_email(3, hour=23, sender="b@example.com"),
+        dated_email(1),
+        EmailData("a@example.com", "Undated", "", "", {}),
+    ]
+    results = WindowProcessor(rolling=2, retention=None).process(emails)
+
+    assert results["total_messages"] == 5
+    assert results["undated_messages"] == 1
+    assert results["expired_messages"] == 0
+    assert [(w["start"][:10], w["messages"]) for w in results["windows"]] == [
+        ("2024-01-01", 2),
+        ("2024-01-03", 2),
+    ]
+    assert results["windows"][0]["top_senders"] == {
+        "a@example.com": 1,
+        "b@example.com": 1,
+    }
+    assert results["windows"][1]["categories"] == {"Offer": 1, "Other": 1}
+    assert [
+        (w["start"][:10], w["end"][:10], w["messages"]) for w in results["rolling"]
+    ] == [
+        ("2023-12-31", "2024-01-02", 2),
+        ("2024-01-01", "2024-01-03", 2),
+        ("2024-01-02", "2024-01-04", 2),
+    ]
+
+    weekly = WindowProcessor(parse_duration("1w"), None, categories=False)
+    results = weekly.process(emails)
+    assert results["windows"] == [
+        {
+            "start": "2024-01-01T00:00:00+00:00",
+            "end": "2024-01-08T00:00:00+00:00",
+            "messages": 4,
+            "top_senders": {"a@example.com": 2, "b@example.com": 2},
+        }
+    ]
+    assert "rolling" not in results
+
+
+def test_window_processor_retention():
+    """test that only recent windows are kept, whatever the order of shards."""
+    processor = WindowProcessor(rolling=2, retention=3, categories=False)
+    emails = [dated_email(day) for day in [10, 2, 9, 8, 11, 7, 1, 11]]
+
+    results = processor.process(emails)
+    assert [w["start"][:10] for w in results["windows"]] == [
+        "2024-01-09",
+        "2024-01-10",
+        "2024-01-11",
+    ]
+    assert results["expired_messages"] == 4
+    assert [(w["start"][:10], w["messages"]) for w in results["rolling"]] == [
+        ("2024-01-09", 2),
+        ("2024-01-10", 3),
+    ]
+
+    state = processor.create_state()
+    for i in reversed(range(0, len(emails), 3)):
+        partial = processor.update_batch(processor.create_state(), emails[i : i + 3])
+        state = processor.merge(state, partial)
+    assert processor.finalize(state) == results
+
+
+def test_window_processor_future_outlier():
+    """test that a message dated far in the future doesn't expire the others."""
+    emails = [dated_email(day) for day in range(1, 20)]
+    date = format_datetime(datetime(2099, 1, 1, tzinfo=timezone.utc))
+    emails.insert(5, EmailData("a@example.com", "Misdated", date, "", {}))
+
+    results = WindowProcessor(rolling=None, categories=False).process(emails)
+    assert results["expired_messages"] == 0
+    assert len(results["windows"]) == 20
+    assert results["windows"][-1]["start"][:4] == "2099"
+
+
+def test_parse_duration():
+    """test parsing window sizes."""
+    assert parse_duration("90m") == timedelta(minutes=90)
+    assert parse_duration("2W") == timedelta(weeks=2)
+    for text in ["", "0d", "1y", "d"]:
+        with pytest.raises(ValueError):
+            parse_duration(text)
+
+
+def parse_bytes(message):
+    """round trip a message through bytes, as readers parse it."""
+    return BytesParser(policy=compat32).parsebytes(message.as_bytes())
+
+
+@pytest.fixture
+def multipart_message():
+    """create a message with text and html bodies, an attachment and a forward."""
+    forwarded = EmailMessage()
+    forwarded["Subject"] = "Forwarded"
+    forwarded.set_content("forwarded body")
+
+    msg = EmailMessage()
+    msg["Subject"] = "Offer"
+    msg.set_content("Caf\u00e9 offer \u2713\n", charset="utf-8", cte="base64")
+    msg.add_alternative("<p>Caf&eacute; <b>offer</b></p>", subtype="html")
+    msg.add_attachment(b"%PDF" * 1000, maintype="application", subtype="pdf")
+    msg.add_attachment(forwarded)
+    return parse_bytes(msg)
+
+
+def test_extract_body_decodes_text_and_skips_attachments(multipart_message):
+    """test that only the text/plain part is decoded, using its charset."""
+    content = EmailData.from_message(multipart_message).content
+    assert content == "Caf\u00e9 offer \u2713\n"
+
+
+def test_extract_body_html_fallback():
+    """test converting html to text for messages without a text/plain part."""
+    msg = EmailMessage()
+    msg.set_content(
+        "<html><head><style>p {}</style></head><body><p>Job&nbsp;offer</p>"
+        "<p>Next   steps</p><script>x()</script></body></html>",
+        subtype="html",
+        cte="quoted-printable",
+    )
+    msg = parse_bytes(msg)
+
+    assert extract_body(msg) == "Job offer\nNext steps"
+    assert extract_body(msg, ContentOptions(html_fallback=False)) == ""
+
+
+def test_extract_body_byte_limit():
+    """test that bodies are cut at the byte limit without splitting characters."""
+    msg = EmailMessage()
+    msg.set_content("\u00e9" * 5000, charset="utf-8", cte="quoted-printable")
+    msg = parse_bytes(msg)
+
+    assert extract_body(msg, ContentOptions(max_bytes=None)) == "\u00e9" * 5000 + "\n"
+    # 2-byte characters, so the last byte of a 101-byte limit is dropped
+    assert extract_body(msg, ContentOptions(max_bytes=101)) == "\u00e9" * 50
@@ -0,0 +1,453 @@
+import bz2
+import gzip
+import io
+import lzma
+import mailbox
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import format_datetime
+
+import pytest
+
+from email_scraper.processors import EmailData, Pipeline
+from email_scraper.processors.body import ContentOptions
+from email_scraper.processors.classifier import EmailClassifier
+from email_scraper.processors.compact import CompactEmailData
+from email_scraper.processors.example import ExampleProcessor
+from email_scraper.readers import maildir as maildir_reader
+from email_scraper.readers import mbox as mbox_reader
+from email_scraper.readers import sources
+from email_scraper.readers.compressed import CompressedMboxReader, iter_stream_messages
+from email_scraper.readers.filters import HeaderFilter
+from email_scraper.readers.index import IndexedMboxReader, MboxIndex
+from email_scraper.readers.maildir import MaildirReader
+from email_scraper.readers.mapped import MmapMboxReader
+from email_scraper.readers.mbox import MboxReader, split_messages
+from email_scraper.readers.parallel import ParallelMboxReader, split_ranges
+from email_scraper.readers.sources import AutoReader, expand_sources, read_sources
+from email_scraper.wire import email_to_dict
+
+
+@pytest.fixture
+def large_mbox(tmp_path):
+    """create an mbox file with enough varied messages to split into ranges."""
+    mbox_path = tmp_path / "large.mbox"
+    mbox = mailbox.mbox(str(mbox_path))
+    base_date = datetime(2023, 1, 1, 10, 0, 0)
+
+    for i in range(60):
+        msg = EmailMessage()
+        msg.add_header("from", f"sender{i % 7}@example.com")
+        msg.add_header("subject", f"Subject {i}")
+        msg.add_header("date", format_datetime(base_date + timedelta(hours=i)))
+        body = f"Message {i}\n" + "From the desk of someone\n" * (i % 3)
+        if i % 5 == 0:
+            body += "\n\n"
+        msg.set_content(body)
+        mbox.add(msg)
+    mbox.close()
+
+    return mbox_path
+
+
+def expected_emails(path):
+    """load emails with mailbox.mbox as the reference implementation."""
+    return [email_to_dict(e) for e in MboxReader().read(path)]
+
+
+def test_split_messages_matches_mailbox(large_mbox):
+    """test that raw message splitting agrees with mailbox.mbox."""
+    reference = mailbox.mbox(str(large_mbox))
+    expected = [reference.get_bytes(key) for key in reference.keys()]
+    reference.close()
+
+    assert list(split_messages(large_mbox.read_bytes())) == expected
+
+
+def test_split_ranges_on_from_lines(large_mbox, monkeypatch):
+    """test that byte ranges cover the file and start on From lines."""
+    monkeypatch.setattr(mbox_reader, "MIN_CHUNK_SIZE", 512)
+    data = large_mbox.read_bytes()
+    ranges = split_ranges(large_mbox, 8)
+
+    assert len(ranges) > 1
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert data[start : start + 5] == mbox_reader.FROM_LINE
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_parallel_reader_preserves_order(large_mbox, monkeypatch, workers):
+    """test that the parallel reader yields the same emails in the same order."""
+    monkeypatch.setattr(mbox_reader, "MIN_CHUNK_SIZE", 512)
+    emails = list(ParallelMboxReader(workers).read(large_mbox))
+
+    assert [email_to_dict(e) for e in emails] == expected_emails(large_mbox)
+    assert all(e.raw_message is None for e in emails)
+
+
+def test_mmap_reader_matches_mailbox(large_mbox):
+    """test that the memory-mapped reader is a drop-in for mailbox.mbox."""
+    emails = list(MmapMboxReader().read(large_mbox))
+
+    assert [email_to_dict(e) for e in emails] == expected_emails(large_mbox)
+    assert emails[0].raw_message is not None
+
+
+def test_mmap_reader_empty_file(tmp_path):
+    """test that an empty file yields no emails."""
+    path = tmp_path / "empty.mbox"
+    path.touch()
+    assert list(MmapMboxReader().read(path)) == []
+
+
+def append_message(path, subject):
+    """append a single message to an existing mbox file."""
+    mbox = mailbox.mbox(str(path))
+    msg = EmailMessage()
+    msg.add_header("from", "late@example.com")
+    msg.add_header("subject", subject)
+    msg.set_content("Appended message")
+    mbox.add(msg)
+    mbox.close()
+
+
+def test_indexed_reader_reads_only_appended(large_mbox):
+    """test that later runs only parse messages appended since the last one."""
+    reader = IndexedMboxReader()
+    first = [email_to_dict(e) for e in reader.read(large_mbox)]
+    assert first == expected_emails(large_mbox)
+    assert MboxIndex.path_for(large_mbox).exists()
+
+    assert list(reader.read(large_mbox)) == []
+
+    append_message(large_mbox, "New 1")
+    append_message(large_mbox, "New 2")
+    assert [e.subject for e in reader.read(large_mbox)] == ["New 1", "New 2"]
+    assert not reader.rebuilt
+
+    index = MboxIndex.load(MboxIndex.path_for(large_mbox))
+    assert index.size == large_mbox.stat().st_size
+    assert len(index.entries) == 62
+
+
+def test_indexed_reader_detects_rewrite(large_mbox):
+    """test that a rewritten or truncated mbox is read again in full."""
+    reader = IndexedMboxReader()
+    list(reader.read(large_mbox))
+
+    data = large_mbox.read_bytes()
+    large_mbox.write_bytes(data.replace(b"Message 0", b"Massage 0", 1))
+    assert len(list(reader.read(large_mbox))) == 60
+    assert reader.rebuilt
+
+    large_mbox.write_bytes(data[: len(data) // 2])
+    assert len(list(reader.read(large_mbox))) > 0
+    assert reader.rebuilt
+
+
+def test_indexed_reader_filtered_run(large_mbox):
+    """test that a filtered run doesn't mark the messages it rejected as read."""
+    unmatched = HeaderFilter(senders=("nobody-matches",))
+    filtered = IndexedMboxReader(header_filter=unmatched)
+    assert list(filtered.read(large_mbox)) == []
+
+    reader = IndexedMboxReader()
+    assert len(list(reader.read(large_mbox))) == 60
+    assert list(filtered.read(large_mbox)) == []
+    assert list(reader.read(large_mbox)) == []
+
+    append_message(large_mbox, "New")
+    late = IndexedMboxReader(header_filter=HeaderFilter(senders=("late@",)))
+    assert [e.subject for e in late.read(large_mbox)] == ["New"]
+    assert [e.subject for e in reader.read(large_mbox)] == ["New"]
+
+
+def test_indexed_reader_interrupted_run(large_mbox):
+    """test that the index is only saved once every message was consumed."""
+    reader = IndexedMboxReader()
+    emails = reader.read(large_mbox)
+    next(emails)
+    emails.close()
+
+    assert len(list(reader.read(large_mbox))) == 60
+
+
+def test_indexed_reader_holds_partial_message(large_mbox):
+    """test that a message still being written is read once it is complete."""
+    reader = IndexedMboxReader()
+    index = MboxIndex()
+    assert len(list(reader.read_appended(large_mbox, index, hold_partial=True))) == 60
+
+    with open(large_mbox, "ab") as f:
+        f.write(
+            b"From late@example.com Mon Jan  2 10:00:00 2023\nSubject: Late\n\nPart"
+        )
+    assert list(reader.read_appended(large_mbox, index, hold_partial=True)) == []
+    assert len(index.entries) == 60
+
+    with open(large_mbox, "ab") as f:
+        f.write(b"ial body\n")
+    emails = list(reader.read_appended(large_mbox, index, hold_partial=True))
+    assert [(e.subject, e.content) for e in emails] == [("Late", "Partial body\n")]
+    assert index.size == large_mbox.stat().st_size
+    assert not reader.rebuilt
+
+
+@pytest.mark.parametrize("reader_cls", [MboxReader, MmapMboxReader, ParallelMboxReader])
+def test_compact_readers(large_mbox, reader_cls):
+    """test that every reader can produce compact emails with the same data."""
+    emails = list(reader_cls(compact=True).read(large_mbox))
+
+    assert all(isinstance(e, CompactEmailData) for e in emails)
+    assert [email_to_dict(e) for e in emails] == expected_emails(large_mbox)
+
+
+def test_pipeline_merges_parallel_partials(large_mbox, monkeypatch):
+    """test that per-worker partial states combine into the sequential result."""
+    monkeypatch.setattr(mbox_reader, "MIN_CHUNK_SIZE", 512)
+    processors = [ExampleProcessor(), EmailClassifier()]
+
+    expected = Pipeline(processors, chunk_size=7).process(large_mbox)
+    results = Pipeline(processors, reader=ParallelMboxReader(3)).process(large_mbox)
+
+    assert results == expected
+    assert results["example"]["total_messages"] == 60
+    assert len(results["classifier"]["classifications"]) == 60
+
+
+@pytest.fixture
+def monthly_mboxes(tmp_path):
+    """split the messages of three months into one mbox per month."""
+    directory = tmp_path / "exports"
+    directory.mkdir()
+    base_date = datetime(2023, 1, 1, 10, 0, 0)
+    for month in range(3):
+        mbox = mailbox.mbox(str(directory / f"2023-0{month + 1}.mbox"))
+        for i in range(10):
+            msg = EmailMessage()
+            msg.add_header("from", f"sender{i % 3}@example.com")
+            msg.add_header("subject", f"Month {month} message {i}")
+            # months overlap, so merging by date interleaves them
+            date = base_date + timedelta(days=10 * month + 3 * i)
+            msg.add_header("date", format_datetime(date))
+            msg.set_content(f"Message {i}")
+            mbox.add(msg)
+        mbox.close()
+    (directory / "2023-01.mbox.idx").write_bytes(b"not a mailbox")
+    return directory
+
+
+def test_expand_sources(monthly_mboxes):
+    """test that directories and globs expand to sorted mailbox files."""
+    names = ["2023-01.mbox", "2023-02.mbox", "2023-03.mbox"]
+    assert [p.name for p in expand_sources([monthly_mboxes])] == names
+
+    pattern = str(monthly_mboxes / "*-0[23].mbox")
+    paths = expand_sources([pattern, monthly_mboxes / "2023-02.mbox"])
+    assert [p.name for p in paths] == names[1:]
+
+    with pytest.raises(FileNotFoundError):
+        expand_sources([monthly_mboxes / "missing.mbox"])
+    with pytest.raises(FileNotFoundError):
+        expand_sources([str(monthly_mboxes / "*.gz")])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_read_sources(monthly_mboxes, workers, monkeypatch):
+    """test concatenating and merging several mailboxes, split into parts."""
+    monkeypatch.setattr(mbox_reader, "MIN_CHUNK_SIZE", 512)
+    monkeypatch.setattr(mbox_reader, "SPLIT_SIZE", 512)
+    paths = expand_sources([monthly_mboxes])
+    assert len(MboxReader().split(paths[0])) > 1
+    expected = [e for path in paths for e in expected_emails(path)]
+    pipeline = Pipeline([], reader=MboxReader())
+
+    emails = pipeline.iter_emails(paths, workers=workers)
+    assert [email_to_dict(e) for e in emails] == expected
+
+    merged = pipeline.load_emails(paths, workers=workers, by_date=True)
+    assert sorted(map(email_to_dict, merged), key=str) == sorted(expected, key=str)
+    dates = [e.parsed_date for e in merged]
+    assert dates == sorted(dates)
+    assert dates != [e.parsed_date for e in pipeline.load_emails(paths)]
+
+
+class InlineExecutor:
+    """run tasks on submit, counting the parts submitted but not yet taken."""
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.in_flight = 0
+        self.peak = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def submit(self, func, *args):
+        executor = self
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+
+        class Taken(Future):
+            def result(self, timeout=None):
+                executor.in_flight -= 1
+                return super().result(timeout)
+
+        future = Taken()
+        future.set_result(func(*args))
+        return future
+
+
+def test_read_sources_by_date_bounds_parts(monthly_mboxes, monkeypatch):
+    """test that merging many mailboxes keeps about two parts per worker in flight."""
+    monkeypatch.setattr(mbox_reader, "MIN_CHUNK_SIZE", 512)
+    monkeypatch.setattr(mbox_reader, "SPLIT_SIZE", 512)
+    executors = []
+    monkeypatch.setattr(
+        sources,
+        "ProcessPoolExecutor",
+        lambda max_workers: executors.append(InlineExecutor(max_workers))
+        or executors[-1],
+    )
+    paths = expand_sources([monthly_mboxes]) * 4
+
+    merged = list(read_sources(MboxReader(), paths, workers=2, by_date=True))
+    dates = [e.parsed_date for e in merged]
+    assert len(merged) == 120 and dates == sorted(dates)
+    assert executors[0].in_flight == 0
+    assert executors[0].peak <= 2 * 2 + 1 < len(paths)
+
+
+def test_read_sources_compact(monthly_mboxes):
+    """test that compact readers get compact emails from worker processes."""
+    paths = expand_sources([monthly_mboxes])
+    emails = list(read_sources(MboxReader(compact=True), paths, workers=2))
+    assert all(isinstance(e, CompactEmailData) for e in emails)
+    assert [email_to_dict(e) for e in emails] == [
+        e for path in paths for e in expected_emails(path)
+    ]
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 64, 1 << 20])
+def test_stream_splitting_matches_split_messages(large_mbox, block_size):
+    """test that splitting a stream block by block agrees with whole-file splitting."""
+    data = b"junk before the first message\n" + large_mbox.read_bytes()
+    stream = io.BytesIO(data)
+    assert list(iter_stream_messages(stream, block_size)) == list(split_messages(data))
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".bz2", ".xz", ".zst"])
+def test_compressed_reader(large_mbox, suffix):
+    """test that compressed mboxes read like the uncompressed file."""
+    data = large_mbox.read_bytes()
+    path = large_mbox.with_name(f"large.mbox{suffix}")
+    if suffix == ".zst":
+        zstandard = pytest.importorskip("zstandard")
+        path.write_bytes(zstandard.ZstdCompressor().compress(data))
+    else:
+        module = {".gz": gzip, ".bz2": bz2, ".xz": lzma}[suffix]
+        path.write_bytes(module.compress(data))
+
+    emails = CompressedMboxReader().read(path)
+    assert [email_to_dict(e) for e in emails] == expected_emails(large_mbox)
+    assert isinstance(AutoReader().reader_for(path), CompressedMboxReader)
+
+
+@pytest.fixture
+def sample_maildir(tmp_path, large_mbox):
+    """copy the messages of the large mbox into a Maildir."""
+    path = tmp_path / "Maildir"
+    for subdir in ("cur", "new", "tmp"):
+        (path / subdir).mkdir(parents=True)
+    for i, data in enumerate(split_messages(large_mbox.read_bytes())):
+        # read messages are moved to cur and get an info suffix
+        name = f"{1700000000 + i}.M{i}P1.host"
+        target = path / "cur" / f"{name}:2,S" if i % 2 else path / "new" / name
+        target.write_bytes(data)
+    return path
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_maildir_reader(sample_maildir, monkeypatch, workers):
+    """test that Maildir messages are read in delivery order."""
+    monkeypatch.setattr(maildir_reader, "FILES_PER_TASK", 7)
+    reference = mailbox.Maildir(str(sample_maildir))
+    expected = sorted(
+        (email_to_dict(EmailData.from_message(m)) for m in reference),
+        key=lambda e: int(e["subject"].split()[1]),
+    )
+    assert expected == expected_emails(sample_maildir.parent / "large.mbox")
+
+    reader = MaildirReader(workers, compact=workers > 1)
+    emails = list(reader.read(sample_maildir))
+    assert [email_to_dict(e) for e in emails] == expected
+    assert all(isinstance(e, CompactEmailData) for e in emails) == (workers > 1)
+
+    assert expand_sources([sample_maildir.parent]) == [
+        sample_maildir,
+        sample_maildir.parent / "large.mbox",
+    ]
+    assert isinstance(AutoReader().reader_for(sample_maildir), MaildirReader)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("workers", [1, 3])
+def test_readers_apply_content_options(large_mbox, monkeypatch, workers, compact):
+    """test that the content byte limit reaches readers and their workers."""
+    monkeypatch.setattr(mbox_reader, "MIN_CHUNK_SIZE", 512)
+    options = ContentOptions(max_bytes=8)
+    reader = AutoReader(workers, compact, options)
+    emails = list(reader.read(large_mbox))
+
+    assert len(emails) == 60
+    assert [e.content for e in emails[:2]] == ["Message ", "Message "]
+
+
+def test_header_filter_accepts():
+    """test that header filters match senders, subjects and dates."""
+    data = (
+        b"From: Jane <JANE@example.com>\n"
+        b"Subject: =?utf-8?q?Caf=C3=A9_interview?=\n"
+        b"Date: Mon, 02 Jan 2023 10:00:00 +0100\n"
+        b"\n"
+        b"Body\n"
+    )
+    since = datetime(2023, 1, 2, 9)
+    assert HeaderFilter(senders=("jane@",)).accepts(data)
+    assert HeaderFilter(subject_pattern="^café").accepts(data)
+    assert HeaderFilter(since=since).accepts(data)
+    assert not HeaderFilter(until=since).accepts(data)
+    assert not HeaderFilter(senders=("john",)).accepts(data)
+    assert not HeaderFilter(since=since).accepts(b"Subject: no date\n\nBody\n")
+
+
+@pytest.mark.parametrize(
+    "make_reader",
+    [
+        lambda f, tmp_path: MboxReader(header_filter=f),
+        lambda f, tmp_path: MmapMboxReader(header_filter=f),
+        lambda f, tmp_path: ParallelMboxReader(3, header_filter=f),
+        lambda f, tmp_path: IndexedMboxReader(tmp_path / "idx", header_filter=f),
+        lambda f, tmp_path: CompressedMboxReader(header_filter=f),
+        lambda f, tmp_path: AutoReader(1, True, header_filter=f),
+    ],
+)
+def test_readers_apply_header_filter(large_mbox, monkeypatch, tmp_path, make_reader):
+    """test that readers only parse the messages passing the header filter."""
+    monkeypatch.setattr(mbox_reader, "MIN_CHUNK_SIZE", 512)
+    header_filter = HeaderFilter(
+        since=datetime(2023, 1, 1, 20),
+        until=datetime(2023, 1, 2, 10),
+        senders=("SENDER1@",),
+    )
+    emails = list(make_reader(header_filter, tmp_path).read(large_mbox))
+
+    assert [e.subject for e in emails] == ["Subject 15", "Subject 22"]
+    assert emails[0].content.startswith("Message 15\n")
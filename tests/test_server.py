@@ -0,0 +1,183 @@
+import json
+import mailbox
+import socket
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime
+from email.message import EmailMessage
+
+import pytest
+
+from email_scraper.readers.filters import HeaderFilter
+from email_scraper.server import MailboxService, make_server
+
+
+def add_messages(path, subjects, sender="sender@example.com"):
+    """append messages with the given subjects to an mbox file."""
+    mbox = mailbox.mbox(str(path))
+    for subject in subjects:
+        msg = EmailMessage()
+        msg.add_header("from", sender)
+        msg.add_header("subject", subject)
+        msg.add_header("date", "Mon, 02 Jan 2023 10:00:00 +0000")
+        msg.set_content(f"Body of {subject}")
+        mbox.add(msg)
+    mbox.close()
+
+
+@pytest.fixture
+def service(tmp_path):
+    """create a service over an mbox with a job offer and a rejection."""
+    path = tmp_path / "served.mbox"
+    add_messages(path, ["Job offer", "Unfortunately"], "hr@example.com")
+    service = MailboxService(path)
+    assert service.refresh() == 2
+    return service
+
+
+@pytest.fixture
+def server(service):
+    """run a server for the service on a free localhost port."""
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path):
+    """send a GET request to a server and decode its JSON response."""
+    host, port = server.server_address[:2]
+    with urllib.request.urlopen(f"http://{host}:{port}{path}") as response:
+        return json.load(response)
+
+
+def test_service_reads_appended_messages(service):
+    """test that refreshes only parse new messages, and restart after a rewrite."""
+    assert service.refresh() == 0
+
+    add_messages(service.path, ["Hello"], "friend@example.com")
+    assert service.refresh() == 1
+    assert service.stats()["total_messages"] == 3
+    assert [c["category"] for c in service.classify()["classifications"]] == [
+        "Offer",
+        "Rejection",
+        "Other",
+    ]
+
+    friend = HeaderFilter(senders=("friend",))
+    assert service.stats(friend)["total_messages"] == 1
+    assert service.query(friend)["emails"][0]["subject"] == "Hello"
+
+    service.path.write_bytes(service.path.read_bytes().replace(b"Job offer", b"Job"))
+    assert service.refresh() == 3
+    assert service.status()["messages"] == 3
+
+
+def test_service_indexes_match_filters(tmp_path):
+    """test that date and sender indexes select the same emails as a full scan."""
+    path = tmp_path / "indexed.mbox"
+    mbox = mailbox.mbox(str(path))
+    for i in range(30):
+        msg = EmailMessage()
+        msg.add_header("from", f"sender{i % 4}@example.com")
+        msg.add_header("subject", f"Message {i}")
+        # out of order, in different time zones, with a few invalid dates
+        day = (i * 7) % 30 + 1
+        date = f"{day:02d} Jan 2023 10:00:00" + (" -0500" if i % 5 else " +0200")
+        msg.add_header("date", "soon" if i % 9 == 0 else date)
+        msg.set_content(f"Body {i}")
+        mbox.add(msg)
+    mbox.close()
+
+    service = MailboxService(path)
+    service.refresh()
+    every = service.query(limit=30)["emails"]
+    assert len(every) == 30
+    filters = [
+        HeaderFilter(since=datetime(2023, 1, 10)),
+        HeaderFilter(until=datetime(2023, 1, 20, 8)),
+        HeaderFilter(since=datetime(2023, 1, 5), senders=("SENDER1", "sender2@")),
+        HeaderFilter(senders=("sender3",), subject_pattern="1$"),
+    ]
+    for header_filter in filters:
+        expected = [
+            e["subject"]
+            for e, email in zip(every, service.emails)
+            if header_filter.selects(email)
+        ]
+        page = service.query(header_filter, limit=30)
+        assert [e["subject"] for e in page["emails"]] == expected
+        assert page["total"] == service.stats(header_filter)["total_messages"]
+        classifications = service.classify(header_filter)["classifications"]
+        assert [c["subject"] for c in classifications] == expected
+
+    # appended mail older than the latest is merged into the date index
+    add_messages(path, ["Late"], "late@example.com")
+    assert service.refresh() == 1
+    until = HeaderFilter(until=datetime(2023, 1, 3))
+    expected = [e.subject for e in service.emails if until.selects(e)]
+    assert "Late" in expected
+    page = service.query(until, limit=30)["emails"]
+    assert [e["subject"] for e in page] == expected
+
+    path.write_bytes(path.read_bytes().replace(b"Message 0", b"Rewritten"))
+    service.refresh()
+    assert service.query(HeaderFilter(senders=("sender0",)))["total"] == 8
+
+
+def test_server_answers_queries(server, service):
+    """test the JSON answers of the server, refreshed with appended mail."""
+    assert get(server, "/status")["messages"] == 2
+    assert get(server, "/stats")["top_senders"] == {"hr@example.com": 2}
+
+    add_messages(service.path, ["Hello"], "friend@example.com")
+    page = get(server, "/query?from=example.com&offset=1&limit=1")
+    assert page["total"] == 3
+    assert [e["subject"] for e in page["emails"]] == ["Unfortunately"]
+
+    classifications = get(server, "/classify?subject=^hel")["classifications"]
+    assert [c["subject"] for c in classifications] == ["Hello"]
+    assert get(server, "/stats?since=2023-01-03")["total_messages"] == 0
+
+    for path, status in [("/stats?since=soon", 400), ("/missing", 404)]:
+        with pytest.raises(urllib.error.HTTPError) as error:
+            get(server, path)
+        assert error.value.code == status
+
+
+def test_server_answers_unexpected_errors(server, service, monkeypatch):
+    """test that unexpected errors are answered with a 500 and a JSON error."""
+
+    def fail(header_filter=None):
+        raise TypeError("can't compare offset-naive and offset-aware datetimes")
+
+    monkeypatch.setattr(service, "stats", fail)
+    with pytest.raises(urllib.error.HTTPError) as error:
+        get(server, "/stats")
+    assert error.value.code == 500
+    assert "offset-naive" in json.load(error.value)["error"]
+    assert get(server, "/status")["messages"] == 2
+
+
+def test_server_on_unix_socket(service, tmp_path):
+    """test that the server can listen on a Unix socket, and removes it."""
+    socket_path = tmp_path / "server.sock"
+    server = make_server(service, socket_path=socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(str(socket_path))
+            client.sendall(b"GET /status HTTP/1.1\r\nConnection: close\r\n\r\n")
+            response = b"".join(iter(lambda: client.recv(4096), b""))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200")
+    assert json.loads(body)["messages"] == 2
+    assert not socket_path.exists()
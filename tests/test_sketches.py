@@ -0,0 +1,63 @@
+from email_scraper.processors import EmailData
+from email_scraper.processors.example import ExampleProcessor
+from email_scraper.processors.sketches import HyperLogLog, SpaceSaving
+
+
+def test_hyperloglog_estimate_and_merge():
+    """test that distinct counts are within a few standard errors."""
+    first, second = HyperLogLog(12), HyperLogLog(12)
+    for i in range(20000):
+        first.add(f"sender{i}@example.com")
+        second.add(f"sender{i + 10000}@example.com")
+
+    tolerance = 4 * first.relative_error
+    assert abs(first.count() - 20000) <= 20000 * tolerance
+
+    first.merge(second)
+    assert abs(first.count() - 30000) <= 30000 * tolerance
+
+    small = HyperLogLog(12)
+    for sender in ["a", "b", "a", "c"]:
+        small.add(sender)
+    assert small.count() == 3
+
+
+def test_space_saving_bounds():
+    """test that heavy hitters are tracked with valid error bounds."""
+    items = [f"heavy{i}" for i in range(5) for _ in range(200 - i)]
+    items += [f"rare{i}" for i in range(3000)]
+
+    first, second = SpaceSaving(50), SpaceSaving(50)
+    for item in items[::2]:
+        first.add(item)
+    for item in items[1::2]:
+        second.add(item)
+    first.merge(second)
+
+    top = first.most_common(5)
+    assert [item for item, _ in top] == [f"heavy{i}" for i in range(5)]
+    for item, count in top:
+        true_count = items.count(item)
+        assert true_count <= count <= true_count + first.errors[item]
+    assert first.total == len(items)
+
+
+def test_approximate_statistics():
+    """test that the approximate mode is exact for small inputs and reports bounds."""
+    emails = [
+        EmailData(
+            sender=f"sender{i % 3}@example.com",
+            subject=f"Subject {i % 2}",
+            date="Mon, 02 Jan 2023 10:00:00 +0000",
+            content="",
+            headers={},
+        )
+        for i in range(12)
+    ]
+    exact = ExampleProcessor().process(emails)
+    approximate = ExampleProcessor(approximate=True).process(emails)
+
+    bounds = approximate.pop("error_bounds")
+    assert approximate == exact
+    assert bounds["top_senders"] == 0
+    assert 0 < bounds["unique_senders"] < 0.01
@@ -0,0 +1,117 @@
+import io
+import mailbox
+import time
+from email.message import EmailMessage
+
+import pytest
+
+from email_scraper.processors import Pipeline
+from email_scraper.processors.classifier import EmailClassifier
+from email_scraper.processors.example import ExampleProcessor
+from email_scraper.readers.parallel import ParallelMboxReader
+from email_scraper.server import MailboxService
+from email_scraper.timings import Timings
+
+
+@pytest.fixture
+def sample_mbox(tmp_path):
+    """create a temporary mbox file with a few messages."""
+    mbox_path = tmp_path / "timings.mbox"
+    mbox = mailbox.mbox(str(mbox_path))
+    for i in range(5):
+        msg = EmailMessage()
+        msg["From"] = f"sender{i % 2}@example.com"
+        msg["Subject"] = "Job offer"
+        msg["Date"] = f"Mon, 0{i + 2} Jan 2023 10:00:00 +0000"
+        msg.set_content(f"Body of message {i}")
+        mbox.add(msg)
+    mbox.close()
+    return mbox_path
+
+
+def slow_items(count, delay):
+    """yield count items, sleeping before each one."""
+    for i in range(count):
+        time.sleep(delay)
+        yield i
+
+
+def test_nested_stages_are_exclusive():
+    """test that time spent in a nested stage only counts for that stage."""
+    timings = Timings("test")
+    with timings.stage("outer"):
+        items = list(timings.iterate("inner", slow_items(3, 0.02)))
+
+    inner, outer = timings.stages["inner"], timings.stages["outer"]
+    assert items == [0, 1, 2]
+    assert inner.messages == 3
+    assert inner.seconds >= 0.06
+    assert outer.seconds < inner.seconds
+
+
+def test_disabled_timings_measure_nothing():
+    """test that disabled timings pass iterables and streams through."""
+    timings = Timings("test", enabled=False)
+    stream = io.BytesIO(b"data")
+    assert timings.count_bytes("read", stream) is stream
+    with timings.stage("outer"):
+        assert list(timings.iterate("inner", [1, 2])) == [1, 2]
+    assert all(timing.seconds == 0 for timing in timings.stages.values())
+
+
+def test_count_bytes():
+    """test counting the bytes read from a stream."""
+    timings = Timings("test")
+    stream = timings.count_bytes("decode", io.BytesIO(b"x" * 10000))
+    assert len(stream.read()) == 10000
+    assert timings.stages["decode"].bytes_read == 10000
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_pipeline_timings(sample_mbox, workers):
+    """test that the pipeline records its read and process stages."""
+    timings = Timings("run")
+    reader = ParallelMboxReader(workers)
+    processors = [ExampleProcessor(), EmailClassifier()]
+    results = Pipeline(processors, reader=reader, timings=timings).process(sample_mbox)
+
+    report = timings.report()
+    stages = {stage["name"]: stage for stage in report["stages"]}
+    assert results["example"]["total_messages"] == 5
+    assert stages["read"]["messages"] == 5
+    assert stages["read"]["bytes_read"] == sample_mbox.stat().st_size
+    assert stages["process"]["messages"] == 5
+    assert set(report["processors"]) == {"example", "classifier"}
+
+
+def test_watch_and_serve_timings(sample_mbox):
+    """test that watching and serving time the reading and processing of new mail."""
+    processors = [ExampleProcessor(), EmailClassifier()]
+    timings = Timings("watch")
+    pipeline = Pipeline(processors, timings=timings)
+    update = next(pipeline.watch(sample_mbox, interval=0.01))
+    assert update["update"]["messages"] == 5
+
+    service_timings = Timings("serve")
+    service = MailboxService(sample_mbox, timings=service_timings)
+    assert service.refresh() == 5
+
+    for timings in [timings, service_timings]:
+        report = timings.report()
+        stages = {stage["name"]: stage for stage in report["stages"]}
+        assert stages["read"]["messages"] == 5
+        assert stages["read"]["bytes_read"] == sample_mbox.stat().st_size
+        assert stages["process"]["messages"] == 5
+        assert set(report["processors"]) == {"example", "classifier"}
+
+
+def test_profile_single_stage(tmp_path):
+    """test that only the profiled stage is written to the profile."""
+    timings = Timings("test", enabled=False, profile_stage="inner")
+    assert timings.enabled
+    list(timings.iterate("inner", slow_items(2, 0)))
+
+    path = tmp_path / "inner.prof"
+    assert timings.dump_profile(path)
+    assert path.stat().st_size > 0
+    assert not Timings("test", profile_stage="other").dump_profile(path)
@@ -0,0 +1,126 @@
+import io
+import json
+
+import pytest
+
+from email_scraper import wire
+from email_scraper.processors import EmailData
+from email_scraper.wire import (
+    email_from_dict,
+    email_to_dict,
+    iter_binary_emails,
+    iter_json_values,
+    iter_records,
+    read_emails,
+    write_binary_emails,
+    write_records,
+)
+
+
+@pytest.fixture
+def sample_records():
+    """create email records with multi-byte and escaped characters."""
+    return [
+        {
+            "sender": f"sender{i}@example.com",
+            "subject": f'Subject {i} – café "quoted"',
+            "date": "Mon, 02 Jan 2023 10:00:00 +0000",
+            "content": "line one\nline two ]} ," * (i + 1),
+            "headers": {"From": f"sender{i}@example.com"},
+        }
+        for i in range(5)
+    ]
+
+
+@pytest.mark.parametrize("wire_format", ["json", "ndjson"])
+def test_round_trip(sample_records, wire_format, monkeypatch):
+    """test that records survive writing and incremental reading."""
+    monkeypatch.setattr(wire, "READ_CHUNK_SIZE", 7)
+    out = io.StringIO()
+    write_records(iter(sample_records), out, wire_format)
+
+    if wire_format == "json":
+        assert json.loads(out.getvalue()) == sample_records
+    else:
+        assert len(out.getvalue().splitlines()) == len(sample_records)
+
+    stream = io.BytesIO(out.getvalue().encode("utf-8"))
+    assert list(iter_records(stream)) == sample_records
+
+
+def test_iter_records_is_lazy(sample_records):
+    """test that records are yielded before the input is complete."""
+
+    class TruncatedStream(io.BytesIO):
+        def read(self, size=-1):
+            data = super().read(size)
+            if not data:
+                raise AssertionError("read past the first record")
+            return data
+
+    first_line = json.dumps(sample_records[0]) + "\n"
+    records = iter_records(TruncatedStream(first_line.encode("utf-8") + b"{"))
+    assert next(records) == sample_records[0]
+
+
+def test_iter_records_empty_and_malformed():
+    """test edge cases of the array reader."""
+    assert list(iter_records(io.BytesIO(b" [ ] "))) == []
+    assert list(iter_records(io.BytesIO(b""))) == []
+    with pytest.raises(ValueError):
+        list(iter_records(io.BytesIO(b"[1, 2")))
+
+
+def test_iter_json_values_pretty_document():
+    """test that a pretty-printed document is read as a single value."""
+    document = {"classifications": [{"category": "Offer", "confidence": 1.0}]}
+    stream = io.BytesIO(json.dumps(document, indent=4).encode("utf-8"))
+    assert list(iter_json_values(stream)) == [document]
+
+
+def test_email_dict_round_trip():
+    """test conversion between EmailData and its wire representation."""
+    email = EmailData(
+        sender="a@example.com",
+        subject="Hello",
+        date="",
+        content="body",
+        headers={"Subject": "Hello"},
+    )
+    assert email_from_dict(email_to_dict(email)) == email
+
+
+def test_binary_round_trip(sample_records, monkeypatch):
+    """test that emails survive the binary format across several chunks."""
+    monkeypatch.setattr(wire, "BINARY_CHUNK_RECORDS", 2)
+    emails = [email_from_dict(r) for r in sample_records]
+    emails[0].subject = "undecodable \udcff byte"
+
+    out = io.BytesIO()
+    write_binary_emails(iter(emails), out)
+    assert list(iter_binary_emails(io.BytesIO(out.getvalue()))) == emails
+
+    skipped = list(iter_binary_emails(io.BytesIO(out.getvalue()), ("subject",)))
+    assert [e.subject for e in skipped] == [e.subject for e in emails]
+    assert all(e.content == "" and e.headers == {} for e in skipped)
+
+    with pytest.raises(ValueError):
+        list(iter_binary_emails(io.BytesIO(out.getvalue()[:-3])))
+    with pytest.raises(ValueError):
+        list(iter_binary_emails(io.BytesIO(b"[]")))
+
+
+@pytest.mark.parametrize("wire_format", ["json", "ndjson", "binary"])
+def test_read_emails_detects_format(sample_records, wire_format):
+    """test that emails are read back from any wire format."""
+    emails = [email_from_dict(r) for r in sample_records]
+    if wire_format == "binary":
+        out = io.BytesIO()
+        write_binary_emails(emails, out)
+        data = out.getvalue()
+    else:
+        text = io.StringIO()
+        write_records(sample_records, text, wire_format)
+        data = text.getvalue().encode("utf-8")
+
+    assert list(read_emails(io.BytesIO(data))) == emails